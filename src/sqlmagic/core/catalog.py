@@ -0,0 +1,69 @@
+import logging
+from typing import Dict, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hot metadata queries prepared once per pooled connection: name -> (types, sql)
+CATALOG_STATEMENTS: Dict[str, Tuple[str, str]] = {
+    "sqlmagic_tables": (
+        "text, integer, integer",
+        "SELECT table_name, table_type, count(*) OVER () FROM information_schema.tables WHERE table_schema = $1 ORDER BY table_name LIMIT $2 OFFSET $3",
+    ),
+    "sqlmagic_columns": (
+        "text",
+        "SELECT column_name, data_type, is_nullable FROM information_schema.columns WHERE table_name = $1 ORDER BY ordinal_position",
+    ),
+    "sqlmagic_column_count": (
+        "text",
+        "SELECT COUNT(*) FROM information_schema.columns WHERE table_name = $1",
+    ),
+    "sqlmagic_numeric_columns": (
+        "text",
+        "SELECT column_name FROM information_schema.columns WHERE table_name = $1 AND data_type IN ('integer', 'bigint', 'numeric', 'real', 'double precision')",
+    ),
+}
+
+
+def prepare_catalog_statements(conn) -> Set[str]:
+    """PREPARE the catalog statements on a fresh connection"""
+    prepared = set()
+    cursor = conn.cursor()
+    for name, (types, sql) in CATALOG_STATEMENTS.items():
+        signature = f"({types})" if types else ""
+        try:
+            cursor.execute(f"PREPARE {name}{signature} AS {sql}")
+            prepared.add(name)
+        except Exception as e:
+            logger.warning(f"Could not prepare {name}: {e}")
+            conn.rollback()
+    conn.commit()
+    return prepared
+
+
+def _to_placeholders(sql: str, count: int) -> str:
+    for i in range(count, 0, -1):
+        sql = sql.replace(f"${i}", "%s")
+    return sql
+
+
+# The same statements with driver placeholders, as sent when not PREPAREd
+CATALOG_QUERIES = frozenset(
+    _to_placeholders(sql, len(types.split(",")) if types else 0)
+    for types, sql in CATALOG_STATEMENTS.values()
+)
+
+
+def catalog_statement(conn, name: str, params: Sequence = ()) -> Tuple[str, Sequence]:
+    """SQL and parameters for a catalog statement, using the prepared plan when available"""
+    prepared = getattr(conn, "prepared_statements", None)
+    if isinstance(prepared, set) and name in prepared:
+        placeholders = ", ".join(["%s"] * len(params))
+        statement = f"EXECUTE {name}({placeholders})" if params else f"EXECUTE {name}"
+        return statement, tuple(params)
+    return _to_placeholders(CATALOG_STATEMENTS[name][1], len(params)), tuple(params)
+
+
+def execute_catalog(cursor, name: str, params: Sequence = ()):
+    """Run a catalog statement, using the prepared plan when available"""
+    sql, params = catalog_statement(cursor.connection, name, params)
+    cursor.execute(sql, params if params else None)
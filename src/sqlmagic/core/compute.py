@@ -0,0 +1,155 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def correlation_matrix(data: np.ndarray) -> np.ndarray:
+    """Pearson correlation between the columns of a 2-D array"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.corrcoef(data, rowvar=False)
+
+
+def zscore_outliers(values: np.ndarray, threshold: float = 3.0) -> int:
+    """Count values whose absolute z-score exceeds the threshold"""
+    std = values.std()
+    if std == 0:
+        return 0
+    return int((np.abs(values - values.mean()) > threshold * std).sum())
+
+
+def top_correlations(
+    data: np.ndarray, k: int = 20, threshold: float = 0.5, block_size: int = 256
+) -> Tuple[List[Tuple[int, int, float]], int]:
+    """Top-k column pairs by |r| above a threshold, computed blockwise in float32.
+
+    Returns the pairs sorted by |r| and the total number of pairs above the
+    threshold.
+    """
+    rows, cols = data.shape
+    z = np.empty((rows, cols), dtype=np.float32)
+    for start in range(0, cols, block_size):
+        chunk = data[:, start : start + block_size]
+        z[:, start : start + block_size] = chunk - chunk.mean(axis=0)
+    norms = np.linalg.norm(z, axis=0)
+    norms[norms == 0] = np.inf  # constant columns correlate with nothing
+    z /= norms
+
+    best_r = np.empty(0, dtype=np.float32)
+    best_i = np.empty(0, dtype=np.int64)
+    best_j = np.empty(0, dtype=np.int64)
+    total = 0
+    for start in range(0, cols, block_size):
+        stop = min(start + block_size, cols)
+        r = z[:, start:stop].T @ z[:, start:]
+        # keep only pairs (i, j) with j > i
+        r[np.tril_indices(stop - start, m=r.shape[1])] = 0
+        hits = np.flatnonzero(np.abs(r) > threshold)
+        total += hits.size
+        if hits.size > k:
+            hits = hits[np.argpartition(-np.abs(r.flat[hits]), k - 1)[:k]]
+        block_i, block_j = np.unravel_index(hits, r.shape)
+        best_r = np.concatenate([best_r, r.flat[hits]])
+        best_i = np.concatenate([best_i, block_i + start])
+        best_j = np.concatenate([best_j, block_j + start])
+        if best_r.size > k:
+            keep = np.argpartition(-np.abs(best_r), k - 1)[:k]
+            best_r, best_i, best_j = best_r[keep], best_i[keep], best_j[keep]
+
+    order = np.argsort(-np.abs(best_r))
+    pairs = [(int(best_i[n]), int(best_j[n]), float(best_r[n])) for n in order]
+    return pairs, total
+
+
+def _run_shared(
+    func: Callable, name: str, shape: Tuple[int, ...], dtype: str, args: tuple
+) -> Any:
+    shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    result = func(array, *args)
+    # Never hand back a view of the segment, it is unlinked by the parent
+    if isinstance(result, np.ndarray):
+        result = np.array(result)
+    del array
+    shm.close()
+    return result
+
+
+class ComputeBackend:
+    """Runs the numeric stage of analytics inline or in worker processes.
+
+    Arrays are allocated in shared memory so workers attach to them instead
+    of receiving a pickled copy.
+    """
+
+    MIN_OFFLOAD_ELEMENTS = 100_000
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._segments: Dict[int, shared_memory.SharedMemory] = {}
+
+    def configure(self, workers: int):
+        if workers != self.workers:
+            self.shutdown()
+            self.workers = workers
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started {self.workers} analytics worker processes")
+        return self._executor
+
+    def _offloads(self, size: int) -> bool:
+        return self.workers > 0 and size >= self.MIN_OFFLOAD_ELEMENTS
+
+    @contextmanager
+    def shared_array(self, shape: Tuple[int, ...], dtype=np.float64):
+        """Allocate an array the workers can read without copying"""
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        if not self._offloads(size):
+            yield np.empty(shape, dtype=dtype)
+            return
+        shm = shared_memory.SharedMemory(create=True, size=size * dtype.itemsize)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        key = id(array)
+        self._segments[key] = shm
+        try:
+            yield array
+        finally:
+            del self._segments[key]
+            del array
+            shm.unlink()
+            try:
+                shm.close()
+            except BufferError:
+                pass  # caller still holds the array; the mapping goes with it
+
+    def run(self, func: Callable, array: np.ndarray, *args) -> Any:
+        """Apply func(array, *args), in a worker when the array is shared"""
+        shm = self._segments.get(id(array))
+        if shm is None:
+            return func(array, *args)
+        future = self.executor.submit(
+            _run_shared, func, shm.name, array.shape, array.dtype.str, args
+        )
+        return future.result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+compute = ComputeBackend()
@@ -1,23 +1,105 @@
+import json
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ConnectionProfile:
+    host: str
+    database: str
+    username: str
+    password: str = ""
+    port: int = 5432
+    replicas: List[str] = field(default_factory=list)
+    min_connections: int = 1
+    password_env: Optional[str] = None
+
+    def resolve_password(self) -> str:
+        if self.password_env:
+            return os.getenv(self.password_env, self.password)
+        return self.password
+
+
+def load_profiles(path: str) -> Dict[str, ConnectionProfile]:
+    """Load named connection profiles from a JSON file"""
+    with open(path) as f:
+        data = json.load(f)
+    return {name: ConnectionProfile(**values) for name, values in data.items()}
 
 
 @dataclass
 class Config:
     log_level: str = "INFO"
     max_connections: int = 10
+    db_driver: str = "psycopg2"
     query_timeout: int = 30
     max_rows_limit: int = 10000
     chart_width: int = 10
     chart_height: int = 6
+    chart_dpi: int = 100
+    max_replica_lag: float = 5.0
+    replica_check_interval: float = 5.0
+    interactive_reserved: int = 2
+    bulk_concurrency: int = 6
+    worker_threads: int = 32
+    transport: str = "stdio"
+    http_host: str = "0.0.0.0"
+    http_port: int = 8000
+    analytics_workers: int = 0
+    scan_parallelism: int = 4
+    slow_query_ms: float = 1000.0
+    query_stats_max: int = 1000
+    max_result_bytes: int = 64 * 2**20
+    server_result_bytes: int = 512 * 2**20
+    export_dir: str = "exports"
+    snapshot_dir: str = "snapshots"
+    snapshot_ttl: float = 3600.0
+    snapshot_max_rows: int = 10_000_000
+    loop_watchdog: bool = False
+    stall_threshold_ms: float = 100.0
+    profile_calls: str = "off"
+    profile_dir: str = "profiles"
+    profile_keep: int = 50
+    profiles: Dict[str, ConnectionProfile] = field(default_factory=dict)
 
     @classmethod
     def from_env(cls):
+        profiles_file = os.getenv("PROFILES_FILE")
         return cls(
             log_level=os.getenv("LOG_LEVEL", "INFO"),
             max_connections=int(os.getenv("MAX_CONNECTIONS", "10")),
+            db_driver=os.getenv("DB_DRIVER", "psycopg2"),
             query_timeout=int(os.getenv("QUERY_TIMEOUT", "30")),
             max_rows_limit=int(os.getenv("MAX_ROWS_LIMIT", "10000")),
             chart_width=int(os.getenv("CHART_WIDTH", "10")),
             chart_height=int(os.getenv("CHART_HEIGHT", "6")),
+            chart_dpi=int(os.getenv("CHART_DPI", "100")),
+            max_replica_lag=float(os.getenv("MAX_REPLICA_LAG", "5.0")),
+            replica_check_interval=float(os.getenv("REPLICA_CHECK_INTERVAL", "5.0")),
+            interactive_reserved=int(os.getenv("INTERACTIVE_RESERVED", "2")),
+            bulk_concurrency=int(os.getenv("BULK_CONCURRENCY", "6")),
+            worker_threads=int(os.getenv("WORKER_THREADS", "32")),
+            transport=os.getenv("MCP_TRANSPORT", "stdio"),
+            http_host=os.getenv("HTTP_HOST", "0.0.0.0"),
+            http_port=int(os.getenv("HTTP_PORT", "8000")),
+            analytics_workers=int(os.getenv("ANALYTICS_WORKERS", "0")),
+            scan_parallelism=int(os.getenv("SCAN_PARALLELISM", "4")),
+            slow_query_ms=float(os.getenv("SLOW_QUERY_MS", "1000")),
+            query_stats_max=int(os.getenv("QUERY_STATS_MAX", "1000")),
+            max_result_bytes=int(os.getenv("MAX_RESULT_BYTES", str(64 * 2**20))),
+            server_result_bytes=int(
+                os.getenv("SERVER_RESULT_BYTES", str(512 * 2**20))
+            ),
+            export_dir=os.getenv("EXPORT_DIR", "exports"),
+            snapshot_dir=os.getenv("SNAPSHOT_DIR", "snapshots"),
+            snapshot_ttl=float(os.getenv("SNAPSHOT_TTL", "3600")),
+            snapshot_max_rows=int(os.getenv("SNAPSHOT_MAX_ROWS", "10000000")),
+            loop_watchdog=os.getenv("LOOP_WATCHDOG", "false").lower()
+            in ("1", "true", "yes"),
+            stall_threshold_ms=float(os.getenv("STALL_THRESHOLD_MS", "100")),
+            profile_calls=os.getenv("PROFILE_CALLS", "off").lower(),
+            profile_dir=os.getenv("PROFILE_DIR", "profiles"),
+            profile_keep=int(os.getenv("PROFILE_KEEP", "50")),
+            profiles=load_profiles(profiles_file) if profiles_file else {},
         )
@@ -1,19 +1,84 @@
 import logging
+import threading
+import time
 from contextlib import contextmanager
-from typing import Any, Dict
-
-from psycopg2 import pool
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
+from ..utils.metrics import metrics
+from .drivers import Driver, Psycopg2Driver, Statement
 from .exceptions import ConnectionError
+from .scheduler import LaneScheduler
+from .schema_index import schema_indexes
 
 logger = logging.getLogger(__name__)
 
+# Set per network client so that connection names are private to a session
+client_scope: ContextVar[Optional[str]] = ContextVar("client_scope", default=None)
+
+ROLE_AND_LAG_QUERY = """
+SELECT pg_is_in_recovery(),
+       CASE
+           WHEN NOT pg_is_in_recovery() THEN 0
+           WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+           ELSE COALESCE(
+               EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+           )
+       END
+"""
+
+# Seconds to wait for a replica to accept a connection; an unreachable
+# replica must not stall connect or a lag probe for the OS TCP timeout
+REPLICA_CONNECT_TIMEOUT = 3
+
+
+@dataclass
+class HostNode:
+    """A single server behind a named connection"""
+
+    host: str
+    port: int
+    pool: Any
+    is_replica: bool = False
+    lag: Optional[float] = None
+    checked_at: float = 0.0
+    in_use: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+def parse_host(spec: str, default_port: int) -> Tuple[str, int]:
+    host, sep, port = spec.rpartition(":")
+    if not sep:
+        return spec, default_port
+    return host, int(port)
+
 
 class ConnectionManager:
-    def __init__(self, max_connections: int = 10):
-        self.pools: Dict[str, pool.SimpleConnectionPool] = {}
+    def __init__(
+        self,
+        max_connections: int = 10,
+        max_replica_lag: float = 5.0,
+        lag_check_interval: float = 5.0,
+        interactive_reserved: int = 2,
+        bulk_concurrency: int = 6,
+        driver: Optional[Driver] = None,
+    ):
+        self.driver = driver or Psycopg2Driver()
+        self.pools: Dict[str, Any] = {}
+        self.replicas: Dict[str, List[HostNode]] = {}
+        self.schedulers: Dict[str, LaneScheduler] = {}
         self.connection_info: Dict[str, Dict[str, Any]] = {}
+        self.shared: set = set()
         self.max_connections = max_connections
+        self.max_replica_lag = max_replica_lag
+        self.lag_check_interval = lag_check_interval
+        self.interactive_reserved = interactive_reserved
+        self.bulk_concurrency = bulk_concurrency
+        self._lock = threading.Lock()
 
     def connect(
         self,
@@ -23,62 +88,225 @@ class ConnectionManager:
         database: str,
         username: str,
         password: str,
+        replicas: Optional[List[str]] = None,
+        min_connections: int = 1,
     ):
+        scope = client_scope.get()
+        key = name if scope is None else f"{scope}:{name}"
         try:
-            conn_pool = pool.SimpleConnectionPool(
-                1,
-                self.max_connections,
-                host=host,
-                port=port,
-                database=database,
-                user=username,
-                password=password,
+            conn_pool = self._create_pool(
+                host, port, database, username, password, min_connections
             )
-            self.pools[name] = conn_pool
-            self.connection_info[name] = {"host": host, "database": database}
-            logger.info(f"Connected to {database} as {name}")
         except Exception as e:
             logger.error(f"Connection failed: {e}")
             raise ConnectionError(f"Failed to connect: {e}")
 
-    def get_connection(self, name: str):
-        if name not in self.pools:
-            raise ConnectionError(f"Connection {name} not found")
-        return self.pools[name].getconn()
+        nodes = []
+        for spec in replicas or []:
+            replica_host, replica_port = parse_host(spec, port)
+            try:
+                replica_pool = self._create_pool(
+                    replica_host,
+                    replica_port,
+                    database,
+                    username,
+                    password,
+                    min_connections,
+                    connect_timeout=REPLICA_CONNECT_TIMEOUT,
+                )
+            except Exception as e:
+                logger.warning(f"Replica {spec} unavailable for {name}: {e}")
+                continue
+            node = HostNode(replica_host, replica_port, replica_pool, is_replica=True)
+            self._probe(node)
+            nodes.append(node)
+
+        self._disconnect_key(key)
+        self.pools[key] = conn_pool
+        self.replicas[key] = nodes
+        if scope is None:
+            self.shared.add(key)
+        self.connection_info[key] = {
+            "host": host,
+            "database": database,
+            "replicas": [node.label for node in nodes],
+        }
+        metrics.record_connection()
+        logger.info(f"Connected to {database} as {name} ({len(nodes)} replicas)")
+
+    def _create_pool(
+        self,
+        host: str,
+        port: int,
+        database: str,
+        username: str,
+        password: str,
+        min_connections: int = 1,
+        **options,
+    ):
+        return self.driver.create_pool(
+            min(min_connections, self.max_connections),
+            self.max_connections,
+            host=host,
+            port=port,
+            database=database,
+            user=username,
+            password=password,
+            **options,
+        )
+
+    def _probe(self, node: HostNode):
+        """Refresh the role and replication lag of a replica"""
+        conn = None
+        try:
+            conn = node.pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute(ROLE_AND_LAG_QUERY)
+            in_recovery, lag = cursor.fetchone()
+            conn.rollback()
+            node.is_replica = bool(in_recovery)
+            node.lag = float(lag)
+        except Exception as e:
+            logger.warning(f"Replica probe failed for {node.label}: {e}")
+            node.lag = None
+        finally:
+            node.checked_at = time.monotonic()
+            if conn:
+                node.pool.putconn(conn)
+
+    def _route(self, name: str, read_only: bool) -> Optional[HostNode]:
+        """Pick the least-loaded replica within the lag budget, if any"""
+        if not read_only:
+            return None
+        candidates = []
+        for node in self.replicas.get(name, []):
+            if (
+                node.is_replica
+                and node.lag is not None
+                and node.lag <= self.max_replica_lag
+                and node.in_use < self.max_connections
+            ):
+                candidates.append(node)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda node: (node.in_use, node.lag))
+
+    def resolve(self, name: str) -> str:
+        """Map a client-visible connection name to its pool key"""
+        scope = client_scope.get()
+        if scope is None:
+            return name
+        key = f"{scope}:{name}"
+        if key not in self.pools and name in self.shared:
+            return name
+        return key
+
+    def has_connection(self, name: str) -> bool:
+        return self.resolve(name) in self.pools
+
+    def scheduler(self, name: str) -> LaneScheduler:
+        key = self.resolve(name)
+        if key not in self.schedulers:
+            self.schedulers[key] = LaneScheduler(
+                self.max_connections, self.interactive_reserved, self.bulk_concurrency
+            )
+        return self.schedulers[key]
+
+    def get_connection(self, name: str, read_only: bool = False):
+        return self.get_connection_context(name, read_only=read_only)
 
     def return_connection(self, name: str, conn):
-        if name in self.pools and conn:
-            self.pools[name].putconn(conn)
+        key = self.resolve(name)
+        if key in self.pools and conn:
+            self.pools[key].putconn(conn)
 
     @contextmanager
-    def get_connection_context(self, name: str):
-        if name not in self.pools:
+    def get_connection_context(self, name: str, read_only: bool = False):
+        key = self.resolve(name)
+        if key not in self.pools:
             raise ConnectionError(f"Connection {name} not found")
+        if read_only:
+            # Claim expired replicas under the lock so that one caller probes each
+            # while the others keep routing on the previous reading
+            with self._lock:
+                now = time.monotonic()
+                expired = [
+                    replica
+                    for replica in self.replicas.get(key, [])
+                    if now - replica.checked_at > self.lag_check_interval
+                ]
+                for replica in expired:
+                    replica.checked_at = now
+            for replica in expired:
+                self._probe(replica)
+        with self._lock:
+            node = self._route(key, read_only)
+            if node:
+                node.in_use += 1
+        conn_pool = node.pool if node else self.pools[key]
+        metrics.record_route(key, f"replica {node.label}" if node else "primary")
         conn = None
         try:
-            conn = self.pools[name].getconn()
+            conn = conn_pool.getconn()
             yield conn
         finally:
             if conn:
-                self.pools[name].putconn(conn)
+                conn_pool.putconn(conn)
+            if node:
+                with self._lock:
+                    node.in_use -= 1
 
     def disconnect(self, name: str):
-        if name in self.pools:
-            self.pools[name].closeall()
-            del self.pools[name]
-            del self.connection_info[name]
-            logger.info(f"Disconnected {name}")
+        self._disconnect_key(self.resolve(name))
+
+    def disconnect_scope(self, scope: str):
+        """Close every connection opened by one network client"""
+        prefix = f"{scope}:"
+        for key in [key for key in self.pools if key.startswith(prefix)]:
+            self._disconnect_key(key)
+
+    def _disconnect_key(self, key: str):
+        if key in self.pools:
+            self.pools[key].closeall()
+            for node in self.replicas.pop(key, []):
+                node.pool.closeall()
+            self.schedulers.pop(key, None)
+            schema_indexes.discard(key)
+            self.shared.discard(key)
+            del self.pools[key]
+            del self.connection_info[key]
+            logger.info(f"Disconnected {key}")
 
     def list_connections(self):
-        return self.connection_info.copy()
+        scope = client_scope.get()
+        if scope is None:
+            return self.connection_info.copy()
+        prefix = f"{scope}:"
+        visible = {
+            key: info
+            for key, info in self.connection_info.items()
+            if key in self.shared
+        }
+        for key, info in self.connection_info.items():
+            if key.startswith(prefix):
+                visible[key[len(prefix) :]] = info
+        return visible
+
+    def replica_status(self, name: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "host": node.label,
+                "is_replica": node.is_replica,
+                "lag": node.lag,
+                "in_use": node.in_use,
+            }
+            for node in self.replicas.get(self.resolve(name), [])
+        ]
 
     def is_connected(self, name: str) -> bool:
-        if name not in self.pools:
-            return False
-        try:
-            with self.get_connection_context(name) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1")
-                return True
-        except Exception:
-            return False
+        # No round trip: a dead server surfaces as an error from the tool's own query
+        return self.resolve(name) in self.pools
+
+    def run_batch(self, conn, statements: List[Statement]) -> List[List[tuple]]:
+        """Send independent statements together when the driver can pipeline them"""
+        return self.driver.run_batch(conn, statements)
@@ -0,0 +1,203 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Any, List, Mapping, Sequence, Tuple
+
+from psycopg2 import extensions, pool
+from psycopg2.extensions import QueryCanceledError
+
+from ..utils.querylog import query_log
+from .catalog import CATALOG_QUERIES, prepare_catalog_statements
+from .exceptions import ConnectionError
+
+try:  # Optional psycopg 3 backend
+    import psycopg
+    import psycopg_pool
+except ImportError:
+    psycopg = None
+    psycopg_pool = None
+
+logger = logging.getLogger(__name__)
+
+Statement = Tuple[str, Sequence[Any]]
+
+# Raised when statement_timeout cancels a query, whichever driver is in use
+QUERY_CANCELED: Tuple[type, ...] = (QueryCanceledError,)
+if psycopg is not None:
+    QUERY_CANCELED += (psycopg.errors.QueryCanceled,)
+
+
+def _bind(params):
+    """Statement parameters as the drivers take them: a mapping, a tuple or None"""
+    if not params:
+        return None
+    return params if isinstance(params, Mapping) else tuple(params)
+
+
+def _query_text(query, context) -> str:
+    if isinstance(query, bytes):
+        return query.decode(errors="replace")
+    if not isinstance(query, str):
+        return query.as_string(context)
+    return query
+
+
+class InstrumentedCursor(extensions.cursor):
+    """Cursor that records every statement in the query log"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            query_log.record(
+                _query_text(query, self), time.perf_counter() - start, error=True
+            )
+            raise
+        query_log.record(
+            _query_text(query, self), time.perf_counter() - start, self.rowcount
+        )
+        return result
+
+
+def plain_cursor(conn):
+    """A cursor whose statements stay out of the query log, for the server's own work"""
+    if isinstance(conn, extensions.connection):
+        return conn.cursor(cursor_factory=extensions.cursor)
+    if psycopg is not None and isinstance(conn, psycopg.Connection):
+        return psycopg.Cursor(conn)
+    return conn.cursor()
+
+
+class WarmConnection(extensions.connection):
+    """Connection that prepares the hot catalog statements when opened"""
+
+    def __init__(self, dsn, *args, **kwargs):
+        super().__init__(dsn, *args, **kwargs)
+        self.prepared_statements = prepare_catalog_statements(self)
+        self.cursor_factory = InstrumentedCursor
+
+
+class Driver(ABC):
+    """How ConnectionManager opens pools and sends statements to the server"""
+
+    name = ""
+
+    @abstractmethod
+    def create_pool(self, min_connections: int, max_connections: int, **params):
+        """A pool with getconn/putconn/closeall"""
+        pass
+
+    @abstractmethod
+    def run_batch(self, conn, statements: Sequence[Statement]) -> List[List[tuple]]:
+        """Run independent statements and return the rows of each"""
+        pass
+
+
+class Psycopg2Driver(Driver):
+    """Default backend; statements in a batch take one round trip each"""
+
+    name = "psycopg2"
+
+    def create_pool(self, min_connections: int, max_connections: int, **params):
+        return pool.ThreadedConnectionPool(
+            min_connections,
+            max_connections,
+            connection_factory=WarmConnection,
+            **params,
+        )
+
+    def run_batch(self, conn, statements: Sequence[Statement]) -> List[List[tuple]]:
+        cursor = conn.cursor()
+        results = []
+        for sql, params in statements:
+            cursor.execute(sql, _bind(params))
+            results.append(cursor.fetchall())
+        return results
+
+
+class Psycopg3Pool:
+    """psycopg_pool.ConnectionPool behind the psycopg2 pool interface"""
+
+    def __init__(self, min_connections: int, max_connections: int, **params):
+        if params.get("database"):
+            params["dbname"] = params.pop("database")
+        self.pool = psycopg_pool.ConnectionPool(
+            min_size=min_connections,
+            max_size=max_connections,
+            kwargs={**params, "cursor_factory": InstrumentedCursor3},
+            open=True,
+        )
+
+    def getconn(self):
+        return self.pool.getconn()
+
+    def putconn(self, conn):
+        self.pool.putconn(conn)
+
+    def closeall(self):
+        self.pool.close()
+
+
+class Psycopg3Driver(Driver):
+    """psycopg 3 backend: a batch is pipelined and costs one round trip.
+
+    Catalog statements are prepared on a connection the first time they run
+    there (prepare=True), inside pipelines too, instead of up front.
+    """
+
+    name = "psycopg"
+
+    def __init__(self):
+        if psycopg is None or psycopg_pool is None:
+            raise ConnectionError(
+                "DB_DRIVER=psycopg needs the psycopg and psycopg_pool packages"
+            )
+
+    def create_pool(self, min_connections: int, max_connections: int, **params):
+        return Psycopg3Pool(min_connections, max_connections, **params)
+
+    def run_batch(self, conn, statements: Sequence[Statement]) -> List[List[tuple]]:
+        with conn.pipeline():
+            cursors = []
+            for sql, params in statements:
+                cursor = conn.cursor()
+                cursor.execute(sql, _bind(params))
+                cursors.append(cursor)
+            # The first fetch syncs the pipeline, sending every statement at once
+            return [cursor.fetchall() for cursor in cursors]
+
+
+if psycopg is not None:
+
+    class InstrumentedCursor3(psycopg.Cursor):
+        """psycopg 3 cursor that records every statement in the query log"""
+
+        def execute(self, query, params=None, **kwargs):
+            if (
+                kwargs.get("prepare") is None
+                and isinstance(query, str)
+                and query in CATALOG_QUERIES
+            ):
+                kwargs["prepare"] = True
+            start = time.perf_counter()
+            try:
+                result = super().execute(query, params, **kwargs)
+            except Exception:
+                query_log.record(
+                    _query_text(query, self), time.perf_counter() - start, error=True
+                )
+                raise
+            query_log.record(
+                _query_text(query, self), time.perf_counter() - start, self.rowcount
+            )
+            return result
+
+
+DRIVERS = {driver.name: driver for driver in (Psycopg2Driver, Psycopg3Driver)}
+
+
+def get_driver(name: str) -> Driver:
+    if name not in DRIVERS:
+        raise ConnectionError(f"Unknown driver {name}; use one of {', '.join(DRIVERS)}")
+    return DRIVERS[name]()
@@ -0,0 +1,123 @@
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Rows per FETCH when streaming results through a budget
+FETCH_BATCH = 500
+# Rows per batch whose size is measured; the rest are extrapolated
+SIZE_SAMPLE = 32
+
+
+def format_bytes(nbytes: float) -> str:
+    for unit in ("bytes", "KB", "MB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} GB"
+
+
+def estimate_rows_bytes(rows: Sequence[tuple]) -> int:
+    """Approximate decoded size of a batch of rows from a sample of them"""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // SIZE_SAMPLE)
+    sample = rows[::step]
+    sampled = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in sample
+    )
+    return sampled * len(rows) // len(sample)
+
+
+class Lease:
+    """Bytes reserved by one tool call, capped per call and server-wide"""
+
+    def __init__(self, budget: "MemoryBudget", limit: int):
+        self.budget = budget
+        self.limit = limit
+        self.reserved = 0
+
+    def grow(self, nbytes: int) -> Optional[str]:
+        """Reserve more bytes; returns why not when a cap would be exceeded"""
+        if self.reserved + nbytes > self.limit:
+            return f"result exceeds {format_bytes(self.limit)} per call"
+        if not self.budget.reserve(nbytes):
+            return "server result memory is in use by other calls"
+        self.reserved += nbytes
+        return None
+
+    def shrink(self, nbytes: int):
+        """Give back bytes no longer held, e.g. a batch already written out"""
+        nbytes = min(nbytes, self.reserved)
+        self.budget.release(nbytes)
+        self.reserved -= nbytes
+
+
+class MemoryBudget:
+    """Server-wide cap on result memory held by concurrent tool calls"""
+
+    def __init__(self, capacity: int = 512 * 2**20):
+        self.capacity = capacity
+        self.used = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def configure(self, capacity: int):
+        self.capacity = capacity
+
+    def reserve(self, nbytes: int) -> bool:
+        with self._lock:
+            if self.used + nbytes > self.capacity:
+                return False
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def available(self) -> int:
+        with self._lock:
+            return self.capacity - self.used
+
+    def release(self, nbytes: int):
+        with self._lock:
+            self.used -= nbytes
+
+    @contextmanager
+    def lease(self, limit: int) -> Iterator[Lease]:
+        lease = Lease(self, limit)
+        try:
+            yield lease
+        finally:
+            self.release(lease.reserved)
+
+
+def fetch_within(
+    cursor, max_rows: int, lease: Lease, batch_size: int = FETCH_BATCH
+) -> Tuple[List[tuple], Optional[str]]:
+    """Fetch up to max_rows in batches, stopping early when the lease is full.
+
+    Returns the rows and the reason they were truncated, if they were.
+    """
+    rows: List[tuple] = []
+    while len(rows) < max_rows:
+        wanted = min(batch_size, max_rows - len(rows))
+        batch = cursor.fetchmany(wanted)
+        if not batch:
+            break
+        nbytes = estimate_rows_bytes(batch)
+        refused = lease.grow(nbytes)
+        if refused:
+            # Keep the prefix of the batch that still fits
+            per_row = max(1, nbytes // len(batch))
+            room = min(lease.limit - lease.reserved, lease.budget.available())
+            keep = max(0, room) // per_row
+            if keep and lease.grow(keep * per_row) is None:
+                rows.extend(batch[:keep])
+            return rows, refused
+        rows.extend(batch)
+        if len(batch) < wanted:
+            break
+    return rows, None
+
+
+memory_budget = MemoryBudget()
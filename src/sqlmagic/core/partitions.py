@@ -0,0 +1,231 @@
+import logging
+import queue
+import threading
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+from .scheduler import BULK
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Tables below this planner estimate are scanned as one range
+PARALLEL_MIN_ROWS = 1_000_000
+
+# Everything needed to split a table, in one catalog round trip
+SCAN_PLAN_QUERY = """
+SELECT current_setting('server_version_num')::int, c.relpages, greatest(c.reltuples, 0)::float8,
+       c.relkind = 'p',
+       ARRAY(SELECT i.inhrelid::regclass::text FROM pg_inherits i WHERE i.inhparent = c.oid ORDER BY 1),
+       (SELECT a.attname
+        FROM pg_index x
+        JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = x.indkey[0]
+        WHERE x.indrelid = c.oid AND x.indisprimary AND x.indnatts = 1
+          AND a.atttypid IN ('int2'::regtype, 'int4'::regtype, 'int8'::regtype))
+FROM pg_class c
+WHERE c.oid = to_regclass(%s)
+"""
+
+# TID range scans, which make ctid ranges cheap, arrived in PostgreSQL 14
+TID_RANGE_SCAN_VERSION = 140000
+
+
+@dataclass
+class ScanRange:
+    source: str
+    label: str
+
+
+def plan_ranges(
+    cursor, table_name: str, parts: int, min_rows: float = PARALLEL_MIN_ROWS
+) -> List[ScanRange]:
+    """Split a table into ranges usable as `FROM {source}`.
+
+    Native partitions are used as they are. Inheritance children are too,
+    next to the parent's own rows (ONLY), which a legacy parent may hold.
+    Otherwise the heap is split by ctid page ranges (PostgreSQL 14+) or by
+    integer primary key ranges.
+    """
+    whole = [ScanRange(table_name, "whole table")]
+    if parts < 2:
+        return whole
+    cursor.execute(SCAN_PLAN_QUERY, (table_name,))
+    row = cursor.fetchone()
+    if not row:
+        return whole
+    version, pages, rows, partitioned, children, key = row
+    if children:
+        ranges = [ScanRange(child, f"partition {child}") for child in children]
+        if not partitioned:
+            ranges.insert(0, ScanRange(f"ONLY {table_name}", f"parent {table_name}"))
+        return ranges
+    if rows < min_rows:
+        return whole
+    if version >= TID_RANGE_SCAN_VERSION and pages >= parts:
+        bounds = [pages * i // parts for i in range(parts)]
+        ranges = []
+        for i, low in enumerate(bounds):
+            condition = f"ctid >= '({low},0)'::tid"
+            if i + 1 < parts:
+                # The last range is open: the table may have grown since ANALYZE
+                condition += f" AND ctid < '({bounds[i + 1]},0)'::tid"
+            source = f"(SELECT * FROM {table_name} WHERE {condition}) AS r"
+            ranges.append(ScanRange(source, f"pages {low}+"))
+        return ranges
+    if key:
+        cursor.execute(f"SELECT min({key}), max({key}) FROM {table_name}")
+        low, high = cursor.fetchone()
+        if low is not None and high > low:
+            step = (high - low) // parts + 1
+            ranges = []
+            for start in range(low, high + 1, step):
+                condition = f"{key} >= {start} AND {key} < {start + step}"
+                source = f"(SELECT * FROM {table_name} WHERE {condition}) AS r"
+                ranges.append(ScanRange(source, f"{key} {start}..{start + step - 1}"))
+            return ranges
+    return whole
+
+
+def parallel_scan(
+    connection_manager,
+    connection_name: str,
+    conn,
+    ranges: Sequence[ScanRange],
+    scan: Callable[[Any, str], T],
+    workers: int,
+    read_only: bool = True,
+) -> List[T]:
+    """Run scan(cursor, source) for every range, one connection per worker.
+
+    The caller's connection is always a worker. Up to workers - 1 more are
+    taken, each only while the connection's scheduler has a free BULK slot
+    for it, so a scan never eats into the interactive reserve. The workers
+    share the ranges from a queue. Each worker reads in its own snapshot, so
+    concurrent writes may be counted in one range and not another. Results
+    keep the range order.
+    """
+    if len(ranges) == 1:
+        return [scan(conn.cursor(), ranges[0].source)]
+
+    scheduler = connection_manager.scheduler(connection_name)
+    with ExitStack() as stack:
+        connections = [conn]
+        for _ in range(min(workers, len(ranges)) - 1):
+            if not scheduler.try_acquire_threadsafe(BULK):
+                logger.debug(
+                    f"Parallel scan limited to {len(connections)} connections by lanes"
+                )
+                break
+            stack.callback(scheduler.release_threadsafe, BULK)
+            try:
+                connections.append(
+                    stack.enter_context(
+                        connection_manager.get_connection(
+                            connection_name, read_only=read_only
+                        )
+                    )
+                )
+            except Exception as e:
+                logger.debug(
+                    f"Parallel scan limited to {len(connections)} connections: {e}"
+                )
+                break
+
+        pending: queue.Queue = queue.Queue()
+        for index, scan_range in enumerate(ranges):
+            pending.put((index, scan_range))
+        results: List[Optional[T]] = [None] * len(ranges)
+        errors: List[Exception] = []
+
+        def work(worker_conn):
+            cursor = worker_conn.cursor()
+            while not errors:
+                try:
+                    index, scan_range = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    results[index] = scan(cursor, scan_range.source)
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [
+            threading.Thread(
+                target=work, args=(worker_conn,), name=f"sqlmagic-scan-{i}"
+            )
+            for i, worker_conn in enumerate(connections[1:], 1)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            work(conn)
+        finally:
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+    return results
+
+
+def moments_select(columns: Sequence[str]) -> str:
+    """Select list for count, means and co-moments of columns over non-null rows"""
+    exprs = ["count(*)"]
+    exprs += [f"coalesce(avg({col})::float8, 0)" for col in columns]
+    for i, x in enumerate(columns):
+        for y in columns[i:]:
+            exprs.append(f"coalesce(regr_sxy({y}, {x}), 0)")
+    return ", ".join(exprs)
+
+
+@dataclass
+class Moments:
+    """Count, means and co-moment matrix; partial results merge exactly"""
+
+    n: float
+    mean: np.ndarray
+    comoment: np.ndarray
+
+    @classmethod
+    def from_row(cls, row: Sequence, k: int) -> "Moments":
+        mean = np.asarray(row[1 : k + 1], dtype=float)
+        comoment = np.zeros((k, k))
+        comoment[np.triu_indices(k)] = row[k + 1 :]
+        comoment = comoment + np.triu(comoment, 1).T
+        return cls(float(row[0]), mean, comoment)
+
+    def merge(self, other: "Moments") -> "Moments":
+        """Chan et al. pairwise update of the co-moments"""
+        n = self.n + other.n
+        if not other.n:
+            return self
+        if not self.n:
+            return other
+        delta = other.mean - self.mean
+        mean = self.mean + delta * (other.n / n)
+        comoment = (
+            self.comoment
+            + other.comoment
+            + np.outer(delta, delta) * (self.n * other.n / n)
+        )
+        return Moments(n, mean, comoment)
+
+    @property
+    def std(self) -> np.ndarray:
+        """Population standard deviation of each column"""
+        return np.sqrt(np.maximum(np.diag(self.comoment), 0.0) / max(self.n, 1.0))
+
+    def correlation(self) -> np.ndarray:
+        scale = np.sqrt(np.maximum(np.diag(self.comoment), 0.0))
+        scale[scale == 0] = np.inf  # constant columns correlate with nothing
+        return self.comoment / np.outer(scale, scale)
+
+
+def merge_moments(parts: Sequence[Moments]) -> Moments:
+    total = parts[0]
+    for part in parts[1:]:
+        total = total.merge(part)
+    return total
@@ -0,0 +1,134 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# PostgreSQL type OIDs that map onto NumPy dtypes
+FLOAT_OIDS = {700, 701}
+INT_OIDS = {20, 21, 23, 26}
+BOOL_OIDS = {16}
+
+
+def _column_kind(type_code) -> Optional[str]:
+    if type_code in FLOAT_OIDS:
+        return "f"
+    if type_code in INT_OIDS:
+        return "i"
+    if type_code in BOOL_OIDS:
+        return "b"
+    return None
+
+
+def _make_column(values: Sequence, kind: Optional[str]):
+    if kind == "f":
+        return np.array(values, dtype=np.float64)  # NULL becomes NaN
+    if kind in ("i", "b") and None not in values:
+        return np.array(values, dtype=np.int64 if kind == "i" else np.bool_)
+    return list(values)
+
+
+class Row:
+    """Read-only view of one row of a ColumnarResult"""
+
+    __slots__ = ("_result", "_index")
+
+    def __init__(self, result: "ColumnarResult", index: int):
+        self._result = result
+        self._index = index
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._result.position(key)
+        value = self._result.data[key][self._index]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __len__(self) -> int:
+        return len(self._result.columns)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self[i] for i in range(len(self)))
+
+    def keys(self) -> List[str]:
+        return self._result.columns
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._result.columns, self))
+
+    def __repr__(self) -> str:
+        return f"Row({self.as_dict()!r})"
+
+
+class ColumnarResult:
+    """Query result stored column by column.
+
+    Column names are held once; integer, float and boolean columns are NumPy
+    arrays and everything else (or anything containing NULL ints) a list.
+    """
+
+    __slots__ = ("columns", "data", "_positions")
+
+    def __init__(self, columns: List[str], data: List[Any]):
+        self.columns = columns
+        self.data = data
+        self._positions: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_rows(
+        cls,
+        columns: List[str],
+        rows: Sequence[Sequence],
+        kinds: Optional[Sequence[Optional[str]]] = None,
+    ) -> "ColumnarResult":
+        """Transpose tuple rows; kinds are "f", "i", "b" or None per column"""
+        kinds = kinds or [None] * len(columns)
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        return cls(
+            list(columns),
+            [_make_column(column, kind) for column, kind in zip(values, kinds)],
+        )
+
+    @classmethod
+    def from_cursor(cls, cursor, rows: Optional[Sequence] = None) -> "ColumnarResult":
+        """Build from a plain tuple cursor after execute()"""
+        description = cursor.description or []
+        if rows is None:
+            rows = cursor.fetchall()
+        return cls.from_rows(
+            [column[0] for column in description],
+            rows,
+            [_column_kind(column[1]) for column in description],
+        )
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def __iter__(self) -> Iterator[Row]:
+        return (Row(self, i) for i in range(len(self)))
+
+    def __getitem__(self, index: int) -> Row:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return Row(self, index % len(self))
+
+    def position(self, name: str) -> int:
+        if self._positions is None:
+            self._positions = {}
+            for i, column in enumerate(self.columns):
+                self._positions.setdefault(column, i)
+        return self._positions[name]
+
+    def column(self, name: str):
+        return self.data[self.position(name)]
+
+    def fill(self, matrix: np.ndarray):
+        """Copy every column into the columns of a preallocated 2-D array"""
+        for j, values in enumerate(self.data):
+            matrix[:, j] = values
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame(dict(enumerate(self.data)), copy=False)
+        frame.columns = self.columns
+        return frame
+
+    def to_text(self) -> str:
+        return self.to_frame().to_string(index=False)
@@ -0,0 +1,190 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+from .drivers import QUERY_CANCELED
+from .exceptions import QueryError
+
+Z_95 = 1.96
+DEFAULT_TARGET_ERROR = 0.01
+MIN_SAMPLE_ROWS = 10_000
+# TABLESAMPLE SYSTEM with a fixed seed picks a superset of pages as the
+# percentage grows, so escalation refines rather than reshuffles the sample
+SAMPLE_SEED = 1
+# Rows assumed per heap page for tables without statistics; erring high keeps
+# the first sample small, and escalation grows it if that was too few rows
+ROWS_PER_PAGE = 100
+
+RELATION_PAGES_QUERY = """
+SELECT sum(pg_relation_size(t.relid)) / current_setting('block_size')::float8
+FROM pg_partition_tree(to_regclass(%s)) t
+"""
+
+# measure(cursor, source, fraction) -> (value, error, saturated)
+Measure = Callable[[Any, str, float], Tuple[Any, float, bool]]
+
+
+@dataclass
+class Estimate:
+    value: Any
+    error: float
+    fraction: float
+    elapsed: float
+    target_error: float
+    rows_estimate: float
+    relative: bool = True
+
+    @property
+    def exact(self) -> bool:
+        return self.fraction >= 1.0
+
+    @property
+    def met_target(self) -> bool:
+        return self.exact or self.error <= self.target_error
+
+    def note(self) -> str:
+        if self.exact:
+            return f"Exact: full table scanned in {self.elapsed * 1000:.0f}ms"
+        spec = ".2%" if self.relative else ".3f"
+        target = (
+            ""
+            if self.met_target
+            else f", target ±{self.target_error:{spec}} not reached"
+        )
+        return (
+            f"Approximate: {self.fraction:.2%} of table sampled in "
+            f"{self.elapsed * 1000:.0f}ms, 95% error ±{self.error:{spec}}{target}"
+        )
+
+
+def table_estimate(cursor, table_name: str) -> float:
+    """Planner row estimate from pg_class, without scanning.
+
+    A table that was never analyzed has reltuples = -1 (PostgreSQL 14+); its
+    rows are then guessed from the on-disk size of it and its partitions, so
+    that a large fresh table is still sampled rather than scanned in full.
+    """
+    cursor.execute(
+        "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", (table_name,)
+    )
+    row = cursor.fetchone()
+    if not row or row[0] is None:
+        return 0.0
+    if row[0] >= 0:
+        return float(row[0])
+    cursor.execute(RELATION_PAGES_QUERY, (table_name,))
+    row = cursor.fetchone()
+    return float(row[0] or 0) * ROWS_PER_PAGE if row else 0.0
+
+
+def sample_source(table_name: str, fraction: float) -> str:
+    if fraction >= 1.0:
+        return table_name
+    return (
+        f"{table_name} TABLESAMPLE SYSTEM ({fraction * 100:.6f}) "
+        f"REPEATABLE ({SAMPLE_SEED})"
+    )
+
+
+def approximate(
+    conn,
+    table_name: str,
+    measure: Measure,
+    max_latency_ms: Optional[float] = None,
+    target_error: Optional[float] = None,
+    min_rows: int = MIN_SAMPLE_ROWS,
+    relative: bool = True,
+) -> Estimate:
+    """Run measure on growing TABLESAMPLE fractions within a latency budget.
+
+    The first fraction is sized from pg_class to return about min_rows rows.
+    Each round grows the fraction by (error / target)^2, since error shrinks
+    with the square root of the sample, as long as the predicted runtime fits
+    in what is left of the budget. Every statement also runs under a
+    statement_timeout for the remaining budget. Errors are relative to the
+    estimate unless relative is False, e.g. the half-width of an interval on r.
+    """
+    target = DEFAULT_TARGET_ERROR if target_error is None else target_error
+    start = time.monotonic()
+    deadline = None if max_latency_ms is None else start + max_latency_ms / 1000
+    cursor = conn.cursor()
+    rows_estimate = table_estimate(cursor, table_name)
+    fraction = 1.0 if rows_estimate <= min_rows else min_rows / rows_estimate
+
+    best: Optional[Estimate] = None
+    try:
+        while True:
+            if deadline is not None:
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                if best is not None and remaining_ms <= 0:
+                    break
+                cursor.execute(f"SET LOCAL statement_timeout = {max(remaining_ms, 1)}")
+            round_start = time.monotonic()
+            try:
+                value, error, saturated = measure(
+                    cursor, sample_source(table_name, fraction), fraction
+                )
+            except QUERY_CANCELED:
+                conn.rollback()
+                if best is None:
+                    raise QueryError(
+                        f"No estimate within {max_latency_ms:g}ms; raise max_latency_ms"
+                    )
+                break
+            elapsed = time.monotonic() - round_start
+            best = Estimate(
+                value,
+                error,
+                fraction,
+                time.monotonic() - start,
+                target,
+                rows_estimate,
+                relative,
+            )
+            if best.met_target or saturated:
+                break
+            grow = (
+                max(2.0, 1.2 * (error / target) ** 2) if math.isfinite(error) else 10.0
+            )
+            next_fraction = min(1.0, fraction * grow)
+            if deadline is not None:
+                predicted = elapsed * next_fraction / fraction
+                if time.monotonic() + predicted > deadline:
+                    break
+            fraction = next_fraction
+    finally:
+        if deadline is not None:
+            conn.rollback()  # drop the SET LOCAL timeout
+    return best
+
+
+def count_interval(count: int, fraction: float) -> Tuple[float, float, float, float]:
+    """Scale a sampled count up; returns (estimate, low, high, relative error)"""
+    if fraction >= 1.0:
+        return float(count), float(count), float(count), 0.0
+    if count == 0:
+        return 0.0, 0.0, 3.0 / fraction, math.inf  # rule of three
+    estimate = count / fraction
+    half = Z_95 * math.sqrt(count * (1 - fraction)) / fraction
+    return estimate, max(estimate - half, 0.0), estimate + half, half / estimate
+
+
+def proportion_interval(hits: int, n: int) -> Tuple[float, float, float]:
+    """Wilson score interval for a sampled proportion: (p, low, high)"""
+    if n == 0:
+        return 0.0, 0.0, 1.0
+    p = hits / n
+    denominator = 1 + Z_95**2 / n
+    center = (p + Z_95**2 / (2 * n)) / denominator
+    half = Z_95 * math.sqrt(p * (1 - p) / n + Z_95**2 / (4 * n * n)) / denominator
+    return p, max(center - half, 0.0), min(center + half, 1.0)
+
+
+def correlation_interval(r: float, n: int) -> Tuple[float, float]:
+    """Fisher z interval for a Pearson correlation"""
+    if n <= 3:
+        return -1.0, 1.0
+    z = math.atanh(max(min(r, 0.999999), -0.999999))
+    half = Z_95 / math.sqrt(n - 3)
+    return math.tanh(z - half), math.tanh(z + half)
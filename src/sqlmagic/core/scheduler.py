@@ -0,0 +1,118 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+class LaneScheduler:
+    """Admission control for one connection's pool with two priority lanes.
+
+    Interactive calls may use any free slot and are admitted before queued
+    bulk calls. Bulk calls are capped at ``bulk_limit`` and never take the
+    last ``reserved_interactive`` slots.
+    """
+
+    def __init__(
+        self, capacity: int, reserved_interactive: int = 2, bulk_limit: int = 6
+    ):
+        self.capacity = max(1, capacity)
+        self.reserved_interactive = max(0, min(reserved_interactive, self.capacity - 1))
+        self.bulk_limit = max(
+            1, min(bulk_limit, self.capacity - self.reserved_interactive)
+        )
+        self.active = {lane: 0 for lane in LANES}
+        self.waiting = {lane: 0 for lane in LANES}
+        self.stats = {
+            lane: {"admitted": 0, "wait_total": 0.0, "wait_max": 0.0, "max_queue": 0}
+            for lane in LANES
+        }
+        self._condition = asyncio.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _can_admit(self, lane: str) -> bool:
+        total = sum(self.active.values())
+        if lane == INTERACTIVE:
+            return total < self.capacity
+        return (
+            self.waiting[INTERACTIVE] == 0
+            and self.active[BULK] < self.bulk_limit
+            and total < self.capacity - self.reserved_interactive
+        )
+
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        self._loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        async with self._condition:
+            self.waiting[lane] += 1
+            stats = self.stats[lane]
+            stats["max_queue"] = max(stats["max_queue"], self.waiting[lane])
+            try:
+                await self._condition.wait_for(lambda: self._can_admit(lane))
+            finally:
+                self.waiting[lane] -= 1
+                self._condition.notify_all()
+            self.active[lane] += 1
+        wait = time.monotonic() - start
+        stats["admitted"] += 1
+        stats["wait_total"] += wait
+        stats["wait_max"] = max(stats["wait_max"], wait)
+        try:
+            yield
+        finally:
+            await self._release(lane)
+
+    async def _try_acquire(self, lane: str) -> bool:
+        async with self._condition:
+            if not self._can_admit(lane):
+                return False
+            self.active[lane] += 1
+            self.stats[lane]["admitted"] += 1
+            return True
+
+    async def _release(self, lane: str):
+        async with self._condition:
+            self.active[lane] -= 1
+            self._condition.notify_all()
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def try_acquire_threadsafe(self, lane: str) -> bool:
+        """Take a slot from a worker thread if one is free right now; never waits.
+
+        Lets a running call widen itself (e.g. a parallel scan taking more
+        connections) only within the lane limits and reserve.
+        """
+        if self._loop is None or self._loop.is_closed() or self._on_loop():
+            return False
+        return asyncio.run_coroutine_threadsafe(
+            self._try_acquire(lane), self._loop
+        ).result()
+
+    def release_threadsafe(self, lane: str):
+        asyncio.run_coroutine_threadsafe(self._release(lane), self._loop).result()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for lane in LANES:
+            stats = self.stats[lane]
+            admitted = stats["admitted"]
+            result[lane] = {
+                "active": self.active[lane],
+                "queued": self.waiting[lane],
+                "max_queue": stats["max_queue"],
+                "admitted": admitted,
+                "avg_wait": stats["wait_total"] / admitted if admitted else 0.0,
+                "max_wait": stats["wait_max"],
+            }
+        return result
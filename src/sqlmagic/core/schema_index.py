@@ -0,0 +1,215 @@
+import bisect
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..utils.cache import LRUCache
+
+SCHEMA_CATALOG_QUERY = """
+SELECT n.nspname, c.relname, c.relkind::text, obj_description(c.oid, 'pg_class'),
+       greatest(c.reltuples, 0)::float8, a.attname, col_description(c.oid, a.attnum)
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg_toast%%'
+  AND n.nspname NOT LIKE 'pg_temp%%'
+ORDER BY n.nspname, c.relname, a.attnum
+"""
+
+RELKINDS = {
+    "r": "table",
+    "p": "partitioned table",
+    "v": "view",
+    "m": "materialized view",
+    "f": "foreign table",
+}
+
+# Weight of a hit by where the token was found
+TABLE_WEIGHT, COLUMN_WEIGHT, COMMENT_WEIGHT = 3.0, 2.0, 1.0
+PREFIX_QUALITY = 0.8
+MIN_TRIGRAM_SIMILARITY = 0.5
+# Rough bytes held per posting or trigram entry (dict slot, key and float)
+ENTRY_BYTES = 100
+
+_WORDS = re.compile(r"[A-Za-z][a-z]*|[a-z]+|\d+")
+
+
+def tokenize_name(text: Optional[str]) -> List[str]:
+    """Split identifiers and comments into lowercase words (snake and camel case)"""
+    if not text:
+        return []
+    return [word.lower() for word in _WORDS.findall(text)]
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class TableEntry:
+    schema: str
+    name: str
+    kind: str
+    rows: float = 0.0
+    comment: Optional[str] = None
+    columns: List[str] = field(default_factory=list)
+    column_comments: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+
+def load_tables(rows) -> List[TableEntry]:
+    """Fold SCHEMA_CATALOG_QUERY rows (one per column) into table entries"""
+    tables: Dict[Tuple[str, str], TableEntry] = {}
+    for schema, name, kind, comment, reltuples, column, column_comment in rows:
+        entry = tables.get((schema, name))
+        if entry is None:
+            entry = tables[(schema, name)] = TableEntry(
+                schema, name, RELKINDS.get(kind, kind), reltuples or 0.0, comment
+            )
+        if column:
+            entry.columns.append(column)
+            if column_comment:
+                entry.column_comments[column] = column_comment
+    return list(tables.values())
+
+
+class SchemaIndex:
+    """Inverted index over schema, table and column names and comments.
+
+    Query terms match index tokens exactly, by prefix (binary search over the
+    sorted vocabulary) or, for typos, by trigram similarity.
+    """
+
+    def __init__(self, tables: List[TableEntry]):
+        self.tables = sorted(tables, key=lambda t: (t.schema, t.name))
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for table_id, table in enumerate(self.tables):
+            fields = [
+                (tokenize_name(table.name) + tokenize_name(table.schema), TABLE_WEIGHT),
+                (
+                    [t for column in table.columns for t in tokenize_name(column)],
+                    COLUMN_WEIGHT,
+                ),
+                (
+                    tokenize_name(table.comment)
+                    + [
+                        t
+                        for text in table.column_comments.values()
+                        for t in tokenize_name(text)
+                    ],
+                    COMMENT_WEIGHT,
+                ),
+            ]
+            for tokens, weight in fields:
+                for token in tokens:
+                    posting = self.postings[token]
+                    posting[table_id] = max(posting.get(table_id, 0.0), weight)
+        self.vocabulary = sorted(self.postings)
+        self.trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.trigram_index[gram].add(token)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def expand(self, term: str) -> Dict[str, float]:
+        """Index tokens matching a query term, with match quality in (0, 1]"""
+        matches: Dict[str, float] = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches[token] = 1.0 if token == term else PREFIX_QUALITY
+        if matches or len(term) < 3:
+            return matches
+        grams = trigrams(term)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for token in self.trigram_index.get(gram, ()):
+                shared[token] += 1
+        for token, count in shared.items():
+            similarity = count / len(grams | trigrams(token))
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                matches[token] = similarity * PREFIX_QUALITY
+        return matches
+
+    def search(
+        self,
+        query: str,
+        schema: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[int, List[Tuple[TableEntry, float, List[str]]]]:
+        """Tables matching every term, best first: (total, page of (table, score, columns))"""
+        terms = tokenize_name(query)
+        if not terms:
+            return 0, []
+        scores: Optional[Dict[int, float]] = None
+        expansions = []
+        for term in terms:
+            expanded = self.expand(term)
+            expansions.append(expanded)
+            term_scores: Dict[int, float] = {}
+            for token, quality in expanded.items():
+                for table_id, weight in self.postings[token].items():
+                    term_scores[table_id] = max(
+                        term_scores.get(table_id, 0.0), weight * quality
+                    )
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    table_id: score + term_scores[table_id]
+                    for table_id, score in scores.items()
+                    if table_id in term_scores
+                }
+        ranked = sorted(
+            (
+                (table_id, score)
+                for table_id, score in (scores or {}).items()
+                if schema is None or self.tables[table_id].schema == schema
+            ),
+            key=lambda item: (-item[1], self.tables[item[0]].qualified_name),
+        )
+        matched_tokens = set().union(*expansions)
+        page = []
+        for table_id, score in ranked[offset : offset + limit]:
+            table = self.tables[table_id]
+            columns = [
+                column
+                for column in table.columns
+                if matched_tokens & set(tokenize_name(column))
+            ]
+            page.append((table, score, columns))
+        return len(ranked), page
+
+
+def index_size(index: SchemaIndex) -> int:
+    """Approximate memory held by an index: names and comments plus its entries"""
+    text = sum(
+        len(t.schema)
+        + len(t.name)
+        + len(t.comment or "")
+        + sum(map(len, t.columns))
+        + sum(map(len, t.column_comments.values()))
+        for t in index.tables
+    )
+    entries = sum(map(len, index.postings.values())) + sum(
+        map(len, index.trigram_index.values())
+    )
+    return text + ENTRY_BYTES * entries
+
+
+# One index per resolved connection; rebuilt from the catalog after the TTL and
+# dropped when the connection is closed
+schema_indexes = LRUCache(
+    ttl=600, max_entries=32, max_bytes=256 * 2**20, sizeof=index_size
+)
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Bump when the on-disk layout changes; older snapshots are then ignored
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_CURSOR = "sqlmagic_snapshot"
+SNAPSHOT_BATCH = 100_000
+MANIFEST = "manifest.json"
+# Tries to swap a finished snapshot in while concurrent writes do the same
+REPLACE_ATTEMPTS = 3
+
+# PostgreSQL type OIDs a snapshot can hold, by the kind they are stored as
+INTEGER_OIDS = {20, 21, 23, 26}
+FLOAT_OIDS = {700, 701}
+NUMERIC_OID = 1700
+TEMPORAL_OIDS = {1082, 1114, 1184}
+# numeric(p, s) is stored exactly as a scaled 64-bit integer up to this precision
+DECIMAL_PRECISION = 18
+# Little-endian, fixed width; NULL is NaN, NaT or the smallest int64
+DTYPES = {"integer": "<i8", "float": "<f8", "decimal": "<i8", "temporal": "<M8[us]"}
+NUMERIC_KINDS = ("integer", "float", "decimal")
+NULL_INT = np.iinfo(np.int64).min
+
+# Version of a table and every partition or inheritance child under it; reads
+# no table data. Files and write counters catch writes to unlogged tables; the
+# WAL position (replay position on a standby) catches writes whose counters
+# have not been flushed yet. tracked is false when some relation has no stats
+# row (views, foreign tables), and such versions are never compared.
+TABLE_VERSION_QUERY = """
+WITH RECURSIVE tree(relid) AS (
+    SELECT to_regclass(%s)::oid
+    UNION
+    SELECT i.inhrelid FROM pg_inherits i JOIN tree t ON i.inhparent = t.relid
+)
+SELECT array_agg(c.relfilenode::bigint ORDER BY c.oid),
+       coalesce(sum(s.n_tup_ins + s.n_tup_upd + s.n_tup_del), 0)::bigint,
+       bool_and(c.relkind IN ('r', 'm', 'p') AND (s.relid IS NOT NULL OR c.relkind = 'p')),
+       CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+            ELSE pg_current_wal_lsn() END::text
+FROM tree
+JOIN pg_class c ON c.oid = tree.relid
+LEFT JOIN pg_stat_all_tables s ON s.relid = c.oid
+"""
+
+
+def column_kind(column) -> Tuple[Optional[str], int]:
+    """Storage kind and decimal scale of a cursor.description column.
+
+    Every kind is exact; numeric without a precision that fits a scaled
+    int64 has no exact fixed-width form and is not supported.
+    """
+    type_code = column[1]
+    if type_code in INTEGER_OIDS:
+        return "integer", 0
+    if type_code in FLOAT_OIDS:
+        return "float", 0
+    if type_code in TEMPORAL_OIDS:
+        return "temporal", 0
+    if type_code == NUMERIC_OID and len(column) > 5:
+        precision, scale = column[4], column[5]
+        if precision and precision <= DECIMAL_PRECISION:
+            return "decimal", scale or 0
+    return None, 0
+
+
+def snapshot_id(
+    connection_key: str,
+    table_name: str,
+    columns: Optional[Sequence[str]],
+    sample_percent: Optional[float],
+) -> str:
+    """Stable id for a snapshot spec, scoped to the resolved connection"""
+    spec = [
+        connection_key,
+        table_name,
+        sorted(columns) if columns else None,
+        sample_percent,
+    ]
+    return hashlib.sha256(json.dumps(spec).encode()).hexdigest()[:16]
+
+
+def _to_utc(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_int(value, scale: int) -> int:
+    if value is None:
+        return NULL_INT
+    scaled = value.scaleb(scale) if scale else value
+    try:
+        exact = int(scaled)
+    except (ValueError, OverflowError):  # NaN and infinities
+        exact = None
+    if exact is None or exact != scaled or exact == NULL_INT:
+        raise ValueError(f"{value} cannot be stored exactly in a snapshot")
+    return exact
+
+
+def column_array(values: Sequence, kind: str, scale: int = 0) -> np.ndarray:
+    if kind == "float":
+        return np.array(
+            [np.nan if value is None else value for value in values], dtype=DTYPES[kind]
+        )
+    if kind in ("integer", "decimal"):
+        return np.array([_to_int(value, scale) for value in values], dtype=DTYPES[kind])
+    return np.array([_to_utc(value) for value in values], dtype=DTYPES[kind])
+
+
+@dataclass
+class Snapshot:
+    snapshot_id: str
+    connection: str
+    table: str
+    columns: List[Tuple[str, str]]
+    rows: int
+    created: float
+    sample_percent: Optional[float] = None
+    version: Optional[list] = None
+    # Decimal scale of each "decimal" column
+    scales: Dict[str, int] = field(default_factory=dict)
+    format: int = SNAPSHOT_FORMAT
+    path: str = field(default="", compare=False)
+
+    def kind(self, name: str) -> Optional[str]:
+        return dict(self.columns).get(name)
+
+    def is_numeric(self, name: str) -> bool:
+        return self.kind(name) in NUMERIC_KINDS
+
+    def numeric_columns(self) -> List[str]:
+        return [name for name, kind in self.columns if kind in NUMERIC_KINDS]
+
+    def values(self, name: str) -> np.ndarray:
+        """A numeric column as float64 for analysis, NULL as NaN.
+
+        Float columns stay memory maps; exact integer and decimal columns are
+        converted into memory.
+        """
+        kind = self.kind(name)
+        stored = self.column(name)
+        if kind == "float":
+            return stored
+        values = stored.astype(np.float64)
+        values[stored == NULL_INT] = np.nan
+        if kind == "decimal" and self.scales.get(name):
+            values /= 10.0 ** self.scales[name]
+        return values
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory map of one column as stored; pages load on first access"""
+        for i, (column, kind) in enumerate(self.columns):
+            if column == name:
+                if not self.rows:
+                    return np.empty(0, dtype=DTYPES[kind])
+                return np.memmap(
+                    os.path.join(self.path, f"{i}.bin"),
+                    dtype=DTYPES[kind],
+                    mode="r",
+                    shape=(self.rows,),
+                )
+        raise ValueError(f"Column {name} is not in snapshot {self.snapshot_id}")
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created
+
+    def describe(self) -> str:
+        sample = f", {self.sample_percent:g}% sample" if self.sample_percent else ""
+        return (
+            f"Snapshot {self.snapshot_id} of {self.table}: {self.rows:,} rows{sample}, "
+            f"taken {self.age:.0f}s ago"
+        )
+
+
+def write_snapshot(
+    cursor, directory: str, snapshot: Snapshot, batch: int = SNAPSHOT_BATCH
+) -> Snapshot:
+    """Stream an executed cursor into column files, replacing any older copy.
+
+    Memory stays bounded by one batch; the snapshot appears atomically when
+    the partial directory is renamed into place. Each write has its own
+    partial directory, so concurrent writes of one snapshot id do not clash;
+    the last one to finish wins.
+    """
+    path = os.path.join(directory, snapshot.snapshot_id)
+    partial = f"{path}.{uuid.uuid4().hex[:8]}.partial"
+    os.makedirs(partial)
+    try:
+        files = [
+            open(os.path.join(partial, f"{i}.bin"), "wb")
+            for i in range(len(snapshot.columns))
+        ]
+        try:
+            rows = 0
+            while True:
+                chunk = cursor.fetchmany(batch)
+                if not chunk:
+                    break
+                for i, (name, kind) in enumerate(snapshot.columns):
+                    values = column_array(
+                        [row[i] for row in chunk], kind, snapshot.scales.get(name, 0)
+                    )
+                    files[i].write(values.tobytes())
+                rows += len(chunk)
+                if len(chunk) < batch:
+                    break
+        finally:
+            for f in files:
+                f.close()
+        snapshot.rows = rows
+        with open(os.path.join(partial, MANIFEST), "w") as f:
+            json.dump({k: v for k, v in asdict(snapshot).items() if k != "path"}, f)
+        for attempt in range(REPLACE_ATTEMPTS):
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                os.replace(partial, path)
+                break
+            except OSError:
+                # Another write renamed its copy into place in between
+                if attempt + 1 == REPLACE_ATTEMPTS:
+                    raise
+    except Exception:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    snapshot.path = path
+    return snapshot
+
+
+def load_snapshot(directory: str, snapshot_id: str, ttl: float) -> Optional[Snapshot]:
+    """The snapshot if it exists, is complete and is younger than ttl seconds"""
+    path = os.path.join(directory, snapshot_id)
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        snapshot = Snapshot(**manifest)
+    except (OSError, ValueError, TypeError):
+        return None
+    snapshot.columns = [tuple(column) for column in snapshot.columns]
+    snapshot.path = path
+    if snapshot.format != SNAPSHOT_FORMAT or snapshot.age >= ttl:
+        return None
+    for i, (_, kind) in enumerate(snapshot.columns):
+        size = snapshot.rows * np.dtype(DTYPES[kind]).itemsize
+        try:
+            if os.path.getsize(os.path.join(path, f"{i}.bin")) != size:
+                return None
+        except OSError:
+            return None
+    return snapshot
+
+
+def prune_snapshots(directory: str, ttl: float) -> int:
+    """Delete expired snapshots and leftovers of interrupted writes"""
+    removed = 0
+    if not os.path.isdir(directory):
+        return removed
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not os.path.isdir(path):
+            continue
+        expired = (
+            name.endswith(".partial") or load_snapshot(directory, name, ttl) is None
+        )
+        # Partial directories younger than a minute may belong to a running write
+        if expired and time.time() - os.path.getmtime(path) > min(ttl, 60):
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def open_snapshot(
+    directory: str, snapshot_id: str, ttl: float, connection_key: str, table_name: str
+) -> Snapshot:
+    """A valid snapshot of table_name taken through this connection, or ValueError"""
+    if not snapshot_id.isalnum():
+        raise ValueError(f"Invalid snapshot id: {snapshot_id}")
+    snapshot = load_snapshot(directory, snapshot_id, ttl)
+    if snapshot is None or snapshot.connection != connection_key:
+        raise ValueError(
+            f"Snapshot {snapshot_id} not found or expired; take a new one with snapshot_table"
+        )
+    if snapshot.table != table_name:
+        raise ValueError(
+            f"Snapshot {snapshot_id} is of {snapshot.table}, not {table_name}"
+        )
+    return snapshot
+
+
+def complete_columns(snapshot: Snapshot, names: Sequence[str]) -> List[np.ndarray]:
+    """Numeric columns restricted to rows where none is NULL (NaN)"""
+    columns = []
+    for name in names:
+        if not snapshot.is_numeric(name):
+            raise ValueError(
+                f"{name} is not a numeric column of snapshot {snapshot.snapshot_id}"
+            )
+        columns.append(snapshot.values(name))
+    complete = None
+    for values in columns:
+        missing = np.isnan(values)
+        if missing.any():
+            complete = ~missing if complete is None else complete & ~missing
+    if complete is None:
+        # No NULLs: hand out the columns as they are
+        return columns
+    return [values[complete] for values in columns]
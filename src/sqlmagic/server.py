@@ -1,37 +1,166 @@
 import asyncio
+import functools
 import logging
-from typing import Any, Dict, List, Optional
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
 
-from mcp.server import Server
-from mcp.server.stdio import stdio_server
+import anyio
+import mcp.types as types
 from mcp import Tool
-from mcp.types import TextContent
+from mcp.server import Server, request_ctx
+from mcp.server.session import ServerSession
+from mcp.server.stdio import stdio_server
+from mcp.shared.context import RequestContext
+from mcp.shared.session import RequestResponder
+from mcp.types import ImageContent, TextContent
 
+from .core.compute import compute
 from .core.config import Config
-from .core.connection import ConnectionManager
+from .core.connection import ConnectionManager, client_scope
+from .core.drivers import get_driver
+from .core.memory import memory_budget
+from .tools.advisor import IndexAdvisorTool
+from .tools.aggregate import FUNCTIONS, OPERATORS, AggregateTool
+from .tools.analytics import (
+    AnalyzeDistributionTool,
+    DetectAnomaliesTool,
+    FindCorrelationsTool,
+    TimeSeriesAnalysisTool,
+)
 from .tools.basic import (
     AnalyzeDataTool,
     ConnectTool,
     DescribeTableTool,
     ExecuteQueryTool,
     ExploreTablesTool,
+    ListConnectionsTool,
+    QueryStatsTool,
     SampleDataTool,
+    ServerMetricsTool,
 )
-from .tools.analytics import (
-    DetectAnomaliesTool,
-    FindCorrelationsTool,
-    TimeSeriesAnalysisTool,
-)
+from .tools.charts import PlotDistributionTool, PlotSeriesTool
+from .tools.export import ExportQueryTool
+from .tools.schema import DiscoverRelationshipsTool, SearchSchemaTool
+from .tools.snapshot import SnapshotTableTool
+from .utils.profiler import profiler
+from .utils.querylog import query_log
+from .utils.watchdog import watchdog
 
 logger = logging.getLogger(__name__)
 
+# Shared by the analytics tools that can answer from a TABLESAMPLE estimate
+APPROXIMATE_PROPERTIES = {
+    "max_latency_ms": {
+        "type": "number",
+        "description": "Answer from a growing sample within this budget",
+    },
+    "target_error": {
+        "type": "number",
+        "description": "Stop sampling at this 95% error (0.01 = ±1%; for correlations, ± on r)",
+    },
+}
+
+SNAPSHOT_PROPERTY = {
+    "snapshot": {
+        "type": "string",
+        "description": "Snapshot id from snapshot_table; analyzes the local copy without querying",
+    },
+}
+
+PROFILE_PROPERTY = {
+    "profile": {
+        "type": "boolean",
+        "default": False,
+        "description": "Profile this call and log its hotspots (PROFILE_CALLS=request)",
+    },
+}
+
+
+class ConcurrentServer(Server):
+    """MCP server that handles each request of a session in its own task.
+
+    mcp's Server.run awaits every request before reading the next one, so
+    on a single session (stdio, or one SSE client) tool calls would never
+    overlap and the interactive/bulk lanes could not let a metadata call
+    pass a running scan.
+    """
+
+    async def run(
+        self,
+        read_stream,
+        write_stream,
+        initialization_options,
+        raise_exceptions: bool = False,
+    ):
+        async with ServerSession(
+            read_stream, write_stream, initialization_options
+        ) as session:
+            async with anyio.create_task_group() as tasks:
+                async for message in session.incoming_messages:
+                    match message:
+                        case RequestResponder(
+                            request=types.ClientRequest(root=request)
+                        ):
+                            tasks.start_soon(
+                                self._handle_request,
+                                session,
+                                message,
+                                request,
+                                raise_exceptions,
+                            )
+                        case types.ClientNotification(root=notification):
+                            handler = self.notification_handlers.get(type(notification))
+                            if handler is None:
+                                continue
+                            try:
+                                await handler(notification)
+                            except Exception as e:
+                                logger.error(f"Notification handler error: {e}")
+
+    async def _handle_request(self, session, message, request, raise_exceptions: bool):
+        handler = self.request_handlers.get(type(request))
+        if handler is None:
+            await message.respond(
+                types.ErrorData(code=types.METHOD_NOT_FOUND, message="Method not found")
+            )
+            return
+        token = request_ctx.set(
+            RequestContext(message.request_id, message.request_meta, session)
+        )
+        try:
+            response = await handler(request)
+        except Exception as e:
+            if raise_exceptions:
+                raise
+            response = types.ErrorData(code=0, message=str(e), data=None)
+        finally:
+            request_ctx.reset(token)
+        await message.respond(response)
+
 
 class PostgreSQLMCPServer:
     def __init__(self, config: Optional[Config] = None):
         self.config = config or Config.from_env()
-        self.connection_manager = ConnectionManager()
+        compute.configure(self.config.analytics_workers)
+        query_log.configure(
+            self.config.slow_query_ms / 1000, self.config.query_stats_max
+        )
+        profiler.configure(
+            self.config.profile_calls, self.config.profile_dir, self.config.profile_keep
+        )
+        memory_budget.configure(self.config.server_result_bytes)
+        self.connection_manager = ConnectionManager(
+            max_connections=self.config.max_connections,
+            max_replica_lag=self.config.max_replica_lag,
+            lag_check_interval=self.config.replica_check_interval,
+            interactive_reserved=self.config.interactive_reserved,
+            bulk_concurrency=self.config.bulk_concurrency,
+            driver=get_driver(self.config.db_driver),
+        )
         self.tools = self._init_tools()
-        self.server = Server("postgresql-analytics")
+        self._warmup: Dict[str, asyncio.Task] = {}
+        self.server = ConcurrentServer("postgresql-analytics")
         self._setup_handlers()
 
     def _init_tools(self):
@@ -39,18 +168,94 @@ class PostgreSQLMCPServer:
             "connect_database": ConnectTool(self.connection_manager, self.config),
             "explore_tables": ExploreTablesTool(self.connection_manager, self.config),
             "describe_table": DescribeTableTool(self.connection_manager, self.config),
+            "discover_relationships": DiscoverRelationshipsTool(
+                self.connection_manager, self.config
+            ),
+            "search_schema": SearchSchemaTool(self.connection_manager, self.config),
             "sample_data": SampleDataTool(self.connection_manager, self.config),
             "analyze_data": AnalyzeDataTool(self.connection_manager, self.config),
             "execute_query": ExecuteQueryTool(self.connection_manager, self.config),
-            "find_correlations": FindCorrelationsTool(self.connection_manager, self.config),
-            "detect_anomalies": DetectAnomaliesTool(self.connection_manager, self.config),
-            "time_series_analysis": TimeSeriesAnalysisTool(self.connection_manager, self.config),
+            "export_query": ExportQueryTool(self.connection_manager, self.config),
+            "snapshot_table": SnapshotTableTool(self.connection_manager, self.config),
+            "find_correlations": FindCorrelationsTool(
+                self.connection_manager, self.config
+            ),
+            "detect_anomalies": DetectAnomaliesTool(
+                self.connection_manager, self.config
+            ),
+            "time_series_analysis": TimeSeriesAnalysisTool(
+                self.connection_manager, self.config
+            ),
+            "aggregate": AggregateTool(self.connection_manager, self.config),
+            "analyze_distribution": AnalyzeDistributionTool(
+                self.connection_manager, self.config
+            ),
+            "plot_series": PlotSeriesTool(self.connection_manager, self.config),
+            "plot_distribution": PlotDistributionTool(
+                self.connection_manager, self.config
+            ),
+            "list_connections": ListConnectionsTool(
+                self.connection_manager, self.config
+            ),
+            "server_metrics": ServerMetricsTool(self.connection_manager, self.config),
+            "query_stats": QueryStatsTool(self.connection_manager, self.config),
+            "advise_indexes": IndexAdvisorTool(self.connection_manager, self.config),
         }
 
+    def start_warmup(self):
+        """Open the pools of all configured profiles in the background"""
+        for name, profile in self.config.profiles.items():
+            task = asyncio.create_task(
+                asyncio.to_thread(
+                    self.connection_manager.connect,
+                    name,
+                    profile.host,
+                    profile.port,
+                    profile.database,
+                    profile.username,
+                    profile.resolve_password(),
+                    profile.replicas,
+                    profile.min_connections,
+                )
+            )
+            task.add_done_callback(functools.partial(self._log_warmup, name))
+            self._warmup[name] = task
+
+    @staticmethod
+    def _log_warmup(name: str, task: asyncio.Task):
+        if task.cancelled():
+            return
+        if task.exception():
+            logger.error(f"Warm-up of profile {name} failed: {task.exception()}")
+        else:
+            logger.info(f"Profile {name} warmed up")
+
+    async def wait_for_warmup(self, connection_name: Optional[str]):
+        task = self._warmup.get(connection_name)
+        if task is None:
+            return
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            pass  # logged by the done callback; the tool reports the missing connection
+        finally:
+            self._warmup.pop(connection_name, None)
+
+    async def dispatch(
+        self, tool, arguments: Dict[str, Any]
+    ) -> List[Union[ImageContent, TextContent]]:
+        connection_name = arguments.get("connection_name")
+        await self.wait_for_warmup(connection_name)
+        if not self.connection_manager.has_connection(connection_name):
+            return await tool.execute(**arguments)
+        scheduler = self.connection_manager.scheduler(connection_name)
+        async with scheduler.slot(tool.lane):
+            return await tool.execute(**arguments)
+
     def _setup_handlers(self):
         @self.server.list_tools()
         async def handle_list_tools() -> List[Tool]:
-            return [
+            tools = [
                 Tool(
                     name="connect_database",
                     description="Connect to PostgreSQL database",
@@ -63,6 +268,11 @@ class PostgreSQLMCPServer:
                             "database": {"type": "string"},
                             "username": {"type": "string"},
                             "password": {"type": "string"},
+                            "replicas": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Read replica hosts as host or host:port",
+                            },
                         },
                         "required": [
                             "connection_name",
@@ -75,13 +285,41 @@ class PostgreSQLMCPServer:
                 ),
                 Tool(
                     name="explore_tables",
-                    description="List all tables in the database",
+                    description="List tables in a schema, one page at a time",
                     inputSchema={
                         "type": "object",
-                        "properties": {"connection_name": {"type": "string"}},
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "schema": {"type": "string", "default": "public"},
+                            "offset": {"type": "integer", "default": 0},
+                            "limit": {"type": "integer", "default": 100},
+                        },
                         "required": ["connection_name"],
                     },
                 ),
+                Tool(
+                    name="search_schema",
+                    description="Find tables by words in schema, table and column names or comments (prefix and typo tolerant)",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "query": {"type": "string"},
+                            "schema": {
+                                "type": "string",
+                                "description": "Only tables in this schema",
+                            },
+                            "offset": {"type": "integer", "default": 0},
+                            "limit": {"type": "integer", "default": 20},
+                            "refresh": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Rebuild the index from the catalog",
+                            },
+                        },
+                        "required": ["connection_name", "query"],
+                    },
+                ),
                 Tool(
                     name="describe_table",
                     description="Get table structure and column information",
@@ -94,6 +332,22 @@ class PostgreSQLMCPServer:
                         "required": ["connection_name", "table_name"],
                     },
                 ),
+                Tool(
+                    name="discover_relationships",
+                    description="Rank likely join paths from foreign keys, column names/types and pg_stats, without reading table data",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "table_name": {
+                                "type": "string",
+                                "description": "Only joins involving this table",
+                            },
+                            "limit": {"type": "integer", "default": 30},
+                        },
+                        "required": ["connection_name"],
+                    },
+                ),
                 Tool(
                     name="sample_data",
                     description="Get sample data from a table",
@@ -115,6 +369,7 @@ class PostgreSQLMCPServer:
                         "properties": {
                             "connection_name": {"type": "string"},
                             "table_name": {"type": "string"},
+                            **APPROXIMATE_PROPERTIES,
                         },
                         "required": ["connection_name", "table_name"],
                     },
@@ -132,34 +387,99 @@ class PostgreSQLMCPServer:
                         "required": ["connection_name", "query"],
                     },
                 ),
+                Tool(
+                    name="export_query",
+                    description="Stream a SELECT result into a local Parquet or Arrow IPC file and return its path, row count and schema",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "query": {"type": "string"},
+                            "format": {
+                                "type": "string",
+                                "enum": ["parquet", "arrow"],
+                                "default": "parquet",
+                            },
+                            "filename": {
+                                "type": "string",
+                                "description": "File name inside EXPORT_DIR",
+                            },
+                            "max_rows": {"type": "integer"},
+                        },
+                        "required": ["connection_name", "query"],
+                    },
+                ),
+                Tool(
+                    name="snapshot_table",
+                    description="Copy numeric and date/time columns of a table (optionally sampled) to local memory-mapped files for repeated analysis without querying",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "table_name": {"type": "string"},
+                            "columns": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Defaults to every numeric and date/time column",
+                            },
+                            "sample_percent": {
+                                "type": "number",
+                                "description": "TABLESAMPLE SYSTEM percentage",
+                            },
+                            "max_rows": {"type": "integer"},
+                            "refresh": {"type": "boolean", "default": False},
+                        },
+                        "required": ["connection_name", "table_name"],
+                    },
+                ),
                 Tool(
                     name="find_correlations",
-                    description="Find correlations between numeric columns in a table",
+                    description="Find the strongest correlations between numeric columns in a table",
                     inputSchema={
                         "type": "object",
                         "properties": {
                             "connection_name": {"type": "string"},
                             "table_name": {"type": "string"},
+                            "threshold": {"type": "number", "default": 0.5},
+                            "top_k": {"type": "integer", "default": 20},
+                            "full_scan": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Exact over every row, scanning table ranges in parallel",
+                            },
+                            **APPROXIMATE_PROPERTIES,
+                            **SNAPSHOT_PROPERTY,
                         },
                         "required": ["connection_name", "table_name"],
                     },
                 ),
                 Tool(
                     name="detect_anomalies",
-                    description="Detect anomalies in a numeric column using Z-score",
+                    description="Detect anomalies in numeric columns using Z-score, optionally per group (sampling applies to single-column mode)",
                     inputSchema={
                         "type": "object",
                         "properties": {
                             "connection_name": {"type": "string"},
                             "table_name": {"type": "string"},
                             "column_name": {"type": "string"},
+                            "columns": {"type": "array", "items": {"type": "string"}},
+                            "group_by": {"type": "string"},
+                            "threshold": {"type": "number", "default": 3.0},
+                            "limit": {"type": "integer", "default": 20},
+                            "full_scan": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Single-column mode: exact over every row, scanning table ranges in parallel",
+                            },
+                            **APPROXIMATE_PROPERTIES,
+                            **SNAPSHOT_PROPERTY,
                         },
-                        "required": ["connection_name", "table_name", "column_name"],
+                        "required": ["connection_name", "table_name"],
                     },
                 ),
                 Tool(
                     name="time_series_analysis",
-                    description="Perform basic time series analysis on date and value columns",
+                    description="Time series analysis with rolling statistics, period-over-period changes, gaps and seasonality",
                     inputSchema={
                         "type": "object",
                         "properties": {
@@ -167,29 +487,257 @@ class PostgreSQLMCPServer:
                             "table_name": {"type": "string"},
                             "date_column": {"type": "string"},
                             "value_column": {"type": "string"},
+                            "interval": {
+                                "type": "string",
+                                "enum": list(TimeSeriesAnalysisTool.INTERVALS),
+                                "default": "day",
+                            },
+                            "window": {"type": "integer", "default": 7},
+                            "full_scan": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Scan table ranges in parallel and merge the buckets",
+                            },
+                            **APPROXIMATE_PROPERTIES,
+                            **SNAPSHOT_PROPERTY,
                         },
-                        "required": ["connection_name", "table_name", "date_column", "value_column"],
+                        "required": [
+                            "connection_name",
+                            "table_name",
+                            "date_column",
+                            "value_column",
+                        ],
+                    },
+                ),
+                Tool(
+                    name="aggregate",
+                    description="Group, aggregate and rank rows without writing SQL (e.g. sum of revenue by region)",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "table_name": {"type": "string"},
+                            "dimensions": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                            },
+                            "measures": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "function": {
+                                            "type": "string",
+                                            "enum": list(FUNCTIONS),
+                                        },
+                                        "column": {"type": "string"},
+                                        "alias": {"type": "string"},
+                                    },
+                                    "required": ["function"],
+                                },
+                            },
+                            "filters": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "column": {"type": "string"},
+                                        "op": {
+                                            "type": "string",
+                                            "enum": list(OPERATORS),
+                                        },
+                                        "value": {},
+                                    },
+                                    "required": ["column", "op"],
+                                },
+                            },
+                            "order_by": {"type": "string"},
+                            "descending": {"type": "boolean", "default": True},
+                            "top_k": {"type": "integer", "default": 20},
+                        },
+                        "required": ["connection_name", "table_name", "measures"],
+                    },
+                ),
+                Tool(
+                    name="analyze_distribution",
+                    description="Histogram, skewness and kurtosis of a numeric column computed inside PostgreSQL",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "table_name": {"type": "string"},
+                            "column_name": {"type": "string"},
+                            "bins": {"type": "integer", "default": 20},
+                            "method": {
+                                "type": "string",
+                                "enum": list(AnalyzeDistributionTool.METHODS),
+                                "default": "equi_width",
+                            },
+                        },
+                        "required": ["connection_name", "table_name", "column_name"],
+                    },
+                ),
+                Tool(
+                    name="plot_series",
+                    description="Render a PNG line chart of a value column over a date column",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "table_name": {"type": "string"},
+                            "date_column": {"type": "string"},
+                            "value_column": {"type": "string"},
+                        },
+                        "required": [
+                            "connection_name",
+                            "table_name",
+                            "date_column",
+                            "value_column",
+                        ],
+                    },
+                ),
+                Tool(
+                    name="plot_distribution",
+                    description="Render a PNG histogram of a numeric column",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "table_name": {"type": "string"},
+                            "column_name": {"type": "string"},
+                            "bins": {"type": "integer", "default": 30},
+                        },
+                        "required": ["connection_name", "table_name", "column_name"],
+                    },
+                ),
+                Tool(
+                    name="list_connections",
+                    description="List active connections, including configured profiles",
+                    inputSchema={"type": "object", "properties": {}},
+                ),
+                Tool(
+                    name="server_metrics",
+                    description="Show server metrics including replica routing decisions",
+                    inputSchema={"type": "object", "properties": {}},
+                ),
+                Tool(
+                    name="query_stats",
+                    description="Top query fingerprints by total time and recent slow queries",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "limit": {"type": "integer", "default": 10},
+                            "reset": {"type": "boolean", "default": False},
+                        },
+                    },
+                ),
+                Tool(
+                    name="advise_indexes",
+                    description="Suggest B-tree/BRIN indexes for this server's most expensive recent queries from their plans; returns DDL text, never runs it",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "connection_name": {"type": "string"},
+                            "statements": {
+                                "type": "integer",
+                                "default": 50,
+                                "description": "Top statements by total time to plan",
+                            },
+                            "limit": {"type": "integer", "default": 10},
+                        },
+                        "required": ["connection_name"],
                     },
                 ),
             ]
+            if profiler.mode == "request":
+                for tool in tools:
+                    tool.inputSchema.setdefault("properties", {}).update(
+                        PROFILE_PROPERTY
+                    )
+            return tools
 
         @self.server.call_tool()
-        async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+        async def handle_call_tool(
+            name: str, arguments: Dict[str, Any]
+        ) -> List[Union[ImageContent, TextContent]]:
             try:
                 if name in self.tools:
-                    return await self.tools[name].execute(**arguments)
+                    arguments = dict(arguments or {})
+                    requested = bool(arguments.pop("profile", False))
+                    with watchdog.track(name, arguments):
+                        async with profiler.capture(name, arguments, requested):
+                            return await self.dispatch(self.tools[name], arguments)
                 return [TextContent(type="text", text=f"Unknown tool: {name}")]
             except Exception as e:
                 logger.error(f"Tool {name} error: {e}")
                 return [TextContent(type="text", text=f"Error: {str(e)}")]
 
     async def run(self):
-        async with stdio_server() as (read_stream, write_stream):
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.config.worker_threads)
+        )
+        if self.config.loop_watchdog:
+            watchdog.start(self.config.stall_threshold_ms / 1000)
+        self.start_warmup()
+        if self.config.transport == "sse":
+            await self.run_sse()
+        elif self.config.transport == "stdio":
+            async with stdio_server() as (read_stream, write_stream):
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    self.server.create_initialization_options(),
+                )
+        else:
+            raise ValueError(f"Unknown transport: {self.config.transport}")
+
+    async def serve_client(self, read_stream, write_stream):
+        """Serve one network client with its own connection namespace"""
+        scope = uuid.uuid4().hex
+        token = client_scope.set(scope)
+        try:
             await self.server.run(
-                read_stream,
-                write_stream,
-                self.server.create_initialization_options()
+                read_stream, write_stream, self.server.create_initialization_options()
             )
+        finally:
+            client_scope.reset(token)
+            await asyncio.to_thread(self.connection_manager.disconnect_scope, scope)
+
+    def create_sse_app(self):
+        from mcp.server.sse import SseServerTransport
+        from starlette.applications import Starlette
+        from starlette.responses import Response
+        from starlette.routing import Mount, Route
+
+        sse = SseServerTransport("/messages/")
+
+        async def handle_sse(request):
+            async with sse.connect_sse(
+                request.scope, request.receive, request._send
+            ) as streams:
+                await self.serve_client(*streams)
+            return Response()
+
+        return Starlette(
+            routes=[
+                Route("/sse", endpoint=handle_sse),
+                Mount("/messages/", app=sse.handle_post_message),
+            ]
+        )
+
+    async def run_sse(self):
+        import uvicorn
+
+        server_config = uvicorn.Config(
+            self.create_sse_app(),
+            host=self.config.http_host,
+            port=self.config.http_port,
+            log_level=self.config.log_level.lower(),
+        )
+        logger.info(
+            f"Serving MCP over SSE on {self.config.http_host}:{self.config.http_port}"
+        )
+        await uvicorn.Server(server_config).serve()
 
 
 async def async_main():
@@ -0,0 +1,347 @@
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from mcp.types import TextContent
+
+from ..core.drivers import plain_cursor
+from ..utils.querylog import query_log
+from ..utils.validators import QueryValidator, quote_identifier
+from .base import BaseTool, blocking
+
+PLANNER_COSTS_QUERY = """
+SELECT current_setting('random_page_cost')::float8,
+       current_setting('seq_page_cost')::float8,
+       current_setting('cpu_tuple_cost')::float8
+"""
+
+RELATION_QUERY = """
+SELECT c.relpages, greatest(c.reltuples, 0)::float8, a.attname,
+       format_type(a.atttypid, a.atttypmod), s.correlation,
+       EXISTS (SELECT 1 FROM pg_index i WHERE i.indrelid = c.oid AND i.indkey[0] = a.attnum)
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+LEFT JOIN pg_stats s
+       ON s.schemaname = n.nspname AND s.tablename = c.relname AND s.attname = a.attname
+WHERE n.nspname = %s AND c.relname = %s
+"""
+
+# Bare or cast column references compared in plan filters, such as
+# "((events.status)::text = $1)"; operands inside a function call like
+# "lower(name)" are skipped, since a plain index on the column would not serve
+_PREDICATE = re.compile(
+    r"(?:^|(?<![\w.])\(|\b(?:AND|OR) )\(*(?:\w+\.)?(\w+)\)?(?:::[\w ]+)?"
+    r"\s+(=|<>|<=|>=|<|>)\s"
+)
+_SORT_KEY = re.compile(r"^(?:\w+\.)?(\w+)(?: (DESC|ASC))?(?: NULLS (?:FIRST|LAST))?$")
+_PLACEHOLDER = re.compile(r"\?")
+
+RANGE_OPERATORS = {"<", "<=", ">", ">="}
+# Types whose physical order often follows insertion order, where BRIN fits
+BRIN_TYPES = ("timestamp", "date", "bigint", "integer")
+
+
+def parameterize(fingerprint: str) -> Tuple[str, int]:
+    """Turn the ? of a query log fingerprint into $1..$n"""
+    count = 0
+
+    def number(_):
+        nonlocal count
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(number, fingerprint), count
+
+
+def plan_nodes(
+    plan: Dict[str, Any], parent: Optional[Dict[str, Any]] = None
+) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Every node of an EXPLAIN (FORMAT JSON) plan with its parent"""
+    yield plan, parent
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child, plan)
+
+
+@dataclass
+class Relation:
+    pages: float
+    rows: float
+    types: Dict[str, str] = field(default_factory=dict)
+    correlation: Dict[str, Optional[float]] = field(default_factory=dict)
+    indexed: set = field(default_factory=set)
+
+
+@dataclass
+class Suggestion:
+    schema: str
+    table: str
+    columns: Tuple[str, ...]
+    method: str
+    reason: str
+    cost: float
+    estimated: float
+    calls: int = 0
+    total_time: float = 0.0
+
+    @property
+    def ddl(self) -> str:
+        table = f"{quote_identifier(self.schema)}.{quote_identifier(self.table)}"
+        columns = ", ".join(quote_identifier(column) for column in self.columns)
+        return f"CREATE INDEX CONCURRENTLY ON {table} USING {self.method} ({columns});"
+
+    @property
+    def benefit(self) -> float:
+        """Plan cost saved across all recorded calls"""
+        return (self.cost - self.estimated) * max(self.calls, 1)
+
+
+class IndexAdvisorTool(BaseTool):
+    """Suggests indexes for the statements this server ran most; never executes DDL"""
+
+    read_only = True
+
+    # Seq scans keeping at most this share of rows would use a B-tree
+    SELECTIVITY = 0.05
+    # Range filters on columns this correlated with heap order suit BRIN
+    BRIN_CORRELATION = 0.9
+    BRIN_SELECTIVITY = 0.5
+    # Tables smaller than this are cheaper to scan than to index
+    MIN_PAGES = 100
+    STATEMENT = "sqlmagic_advice"
+
+    @blocking
+    def execute(
+        self, connection_name: str, statements: int = 50, limit: int = 10
+    ) -> List[TextContent]:
+        self.validate_connection(connection_name)
+        candidates = [
+            stats
+            for stats in query_log.top(max(1, statements))
+            if QueryValidator.classify(parameterize(stats.query)[0]).command
+            in QueryValidator.LIMITABLE
+        ]
+        if not candidates:
+            return [
+                TextContent(
+                    type="text", text="No recorded SELECT statements to analyze"
+                )
+            ]
+
+        suggestions: Dict[Tuple[str, str, Tuple[str, ...], str], Suggestion] = {}
+        planned = 0
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            # Advice statements must not show up in the log they are advising on
+            cursor = plain_cursor(conn)
+            try:
+                cursor.execute("SET TRANSACTION READ ONLY")
+                cursor.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+                cursor.execute(PLANNER_COSTS_QUERY)
+                costs = cursor.fetchone()
+                relations: Dict[Tuple[str, str], Optional[Relation]] = {}
+                for stats in candidates:
+                    plan = self._explain(cursor, stats.query)
+                    if plan is None:
+                        continue
+                    planned += 1
+                    for suggestion in self._analyze(cursor, plan, relations, costs):
+                        suggestion.calls, suggestion.total_time = (
+                            stats.calls,
+                            stats.total_time,
+                        )
+                        key = (
+                            suggestion.schema,
+                            suggestion.table,
+                            suggestion.columns,
+                            suggestion.method,
+                        )
+                        if key in suggestions:
+                            suggestions[key].calls += stats.calls
+                            suggestions[key].total_time += stats.total_time
+                        else:
+                            suggestions[key] = suggestion
+            finally:
+                conn.rollback()
+
+        header = (
+            f"Index advice from {planned} of {len(candidates)} recent statements "
+            f"(the rest do not plan on {connection_name}). DDL is for review only and was not run."
+        )
+        if not suggestions:
+            return [
+                TextContent(type="text", text=f"{header}\nNo index candidates found")
+            ]
+        lines = [header]
+        ranked = sorted(suggestions.values(), key=lambda s: -s.benefit)[: max(1, limit)]
+        for n, suggestion in enumerate(ranked, 1):
+            reduction = (
+                1 - suggestion.estimated / suggestion.cost if suggestion.cost else 0.0
+            )
+            lines.append(f"{n}. {suggestion.ddl}")
+            lines.append(
+                f"   {suggestion.reason}; {suggestion.calls} calls, "
+                f"{suggestion.total_time * 1000:,.0f}ms total"
+            )
+            lines.append(
+                f"   Estimated plan cost {suggestion.cost:,.0f} → ~{suggestion.estimated:,.0f} "
+                f"(-{reduction:.0%})"
+            )
+        return [TextContent(type="text", text="\n".join(lines))]
+
+    def _explain(self, cursor, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Generic plan of a fingerprinted statement, or None if it does not plan here"""
+        sql, params = parameterize(fingerprint)
+        args = f"({', '.join(['NULL'] * params)})" if params else ""
+        cursor.execute(f"SAVEPOINT {self.STATEMENT}")
+        prepared = False
+        try:
+            cursor.execute(f"PREPARE {self.STATEMENT} AS {sql}")
+            prepared = True
+            # VERBOSE adds the schema of each scanned relation
+            cursor.execute(
+                f"EXPLAIN (VERBOSE, FORMAT JSON) EXECUTE {self.STATEMENT}{args}"
+            )
+            output = cursor.fetchone()[0]
+            if isinstance(output, str):
+                output = json.loads(output)
+            cursor.execute(f"RELEASE SAVEPOINT {self.STATEMENT}")
+            return output[0]["Plan"]
+        except Exception:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {self.STATEMENT}")
+            return None
+        finally:
+            # Prepared statements outlive the transaction
+            if prepared:
+                cursor.execute(f"DEALLOCATE {self.STATEMENT}")
+
+    def _relation(
+        self,
+        cursor,
+        scan: Dict[str, Any],
+        relations: Dict[Tuple[str, str], Optional[Relation]],
+    ) -> Optional[Relation]:
+        name = (scan["Schema"], scan["Relation Name"])
+        if name not in relations:
+            cursor.execute(RELATION_QUERY, name)
+            rows = cursor.fetchall()
+            relation = None
+            if rows:
+                relation = Relation(rows[0][0], rows[0][1])
+                for _, _, column, type_name, correlation, indexed in rows:
+                    relation.types[column] = type_name
+                    relation.correlation[column] = correlation
+                    if indexed:
+                        relation.indexed.add(column)
+            relations[name] = relation
+        return relations[name]
+
+    def _analyze(self, cursor, plan, relations, costs) -> List[Suggestion]:
+        random_page_cost, _, cpu_tuple_cost = costs
+        found = []
+        for node, parent in plan_nodes(plan):
+            if (
+                node.get("Node Type") == "Sort"
+                and parent
+                and parent.get("Node Type") == "Limit"
+            ):
+                scans = node.get("Plans", [])
+                if len(scans) != 1 or scans[0].get("Node Type") != "Seq Scan":
+                    continue
+                scan = scans[0]
+                relation = self._relation(cursor, scan, relations)
+                keys = [_SORT_KEY.match(key) for key in node.get("Sort Key", [])]
+                if (
+                    not relation
+                    or relation.pages < self.MIN_PAGES
+                    or not keys
+                    or not keys[0]
+                ):
+                    continue
+                column = keys[0].group(1)
+                if column not in relation.types or column in relation.indexed:
+                    continue
+                wanted = parent.get("Plan Rows", 1)
+                estimated = wanted * (random_page_cost + cpu_tuple_cost)
+                found.append(
+                    Suggestion(
+                        scan["Schema"],
+                        scan["Relation Name"],
+                        (column,),
+                        "btree",
+                        f"Top-{wanted:,.0f} by {column} sorts a seq scan of "
+                        f"{relation.rows:,.0f} rows",
+                        parent["Total Cost"],
+                        estimated,
+                    )
+                )
+            elif node.get("Node Type") == "Seq Scan" and node.get("Filter"):
+                relation = self._relation(cursor, node, relations)
+                if not relation or relation.pages < self.MIN_PAGES or not relation.rows:
+                    continue
+                suggestion = self._for_filter(node, relation, costs)
+                if suggestion:
+                    found.append(suggestion)
+        return found
+
+    def _for_filter(self, node, relation: Relation, costs) -> Optional[Suggestion]:
+        random_page_cost, seq_page_cost, cpu_tuple_cost = costs
+        equality, ranges = [], []
+        for column, operator in _PREDICATE.findall(node["Filter"]):
+            if column not in relation.types:
+                continue
+            if operator == "=" and column not in equality:
+                equality.append(column)
+            elif operator in RANGE_OPERATORS and column not in ranges:
+                ranges.append(column)
+        ranges = [column for column in ranges if column not in equality]
+        selectivity = min(node.get("Plan Rows", 0) / relation.rows, 1.0)
+        schema, name, cost = node["Schema"], node["Relation Name"], node["Total Cost"]
+        reason = (
+            f"Seq scan on {schema}.{name} keeps ~{selectivity:.2%} of {relation.rows:,.0f} rows "
+            f"(filter: {node['Filter']})"
+        )
+
+        # Equality columns first, then one range column: the B-tree rule of thumb
+        columns = tuple(equality + ranges[:1])
+        if (
+            columns
+            and selectivity <= self.SELECTIVITY
+            and columns[0] not in relation.indexed
+        ):
+            matched = node.get("Plan Rows", 0)
+            pages = min(relation.pages, matched)
+            estimated = (
+                math.log2(max(relation.rows, 2)) * cpu_tuple_cost
+                + pages * random_page_cost
+                + matched * cpu_tuple_cost
+            )
+            if estimated < cost:
+                return Suggestion(
+                    schema, name, columns, "btree", reason, cost, estimated
+                )
+
+        for column in ranges:
+            correlation = relation.correlation.get(column)
+            if (
+                correlation is not None
+                and abs(correlation) >= self.BRIN_CORRELATION
+                and selectivity <= self.BRIN_SELECTIVITY
+                and relation.types[column].startswith(BRIN_TYPES)
+                and column not in relation.indexed
+            ):
+                # Block ranges are 128 pages; matching ones are read in order
+                pages = relation.pages * min(1.0, selectivity / abs(correlation))
+                estimated = (
+                    relation.pages / 128 * cpu_tuple_cost
+                    + pages * seq_page_cost
+                    + pages * relation.rows / relation.pages * cpu_tuple_cost
+                )
+                if estimated < cost:
+                    return Suggestion(
+                        schema, name, (column,), "brin", reason, cost, estimated
+                    )
+        return None
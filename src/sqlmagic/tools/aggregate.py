@@ -0,0 +1,198 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp.types import TextContent
+
+from ..core.results import ColumnarResult
+from ..core.scheduler import BULK
+from ..utils.cache import LRUCache
+from ..utils.validators import sanitize_sql_identifier
+from .base import BaseTool, blocking
+
+aggregate_cache = LRUCache(ttl=300, max_entries=256, max_bytes=16 * 2**20)
+
+FUNCTIONS = {
+    "sum": "sum({})",
+    "avg": "avg({})",
+    "count": "count({})",
+    "min": "min({})",
+    "max": "max({})",
+    "count_distinct": "count(DISTINCT {})",
+}
+
+OPERATORS = {
+    "=": "{} = %s",
+    "!=": "{} <> %s",
+    "<": "{} < %s",
+    "<=": "{} <= %s",
+    ">": "{} > %s",
+    ">=": "{} >= %s",
+    "like": "{} LIKE %s",
+    "in": "{} = ANY(%s)",
+    "not_in": "NOT ({} = ANY(%s))",
+    "is_null": "{} IS NULL",
+    "not_null": "{} IS NOT NULL",
+}
+
+
+def normalize_spec(
+    table_name: str,
+    dimensions: Optional[List[str]],
+    measures: List[Dict[str, Any]],
+    filters: Optional[List[Dict[str, Any]]],
+    order_by: Optional[str],
+    descending: bool,
+    top_k: int,
+) -> Dict[str, Any]:
+    """Validate an aggregate request into a canonical, JSON-serializable spec"""
+    table_name = sanitize_sql_identifier(table_name)
+    dimensions = [sanitize_sql_identifier(dim) for dim in dimensions or []]
+    if not measures:
+        raise ValueError("At least one measure is required")
+
+    normalized_measures = []
+    for measure in measures:
+        function = str(measure.get("function", "")).lower()
+        if function not in FUNCTIONS:
+            raise ValueError(f"function must be one of {', '.join(FUNCTIONS)}")
+        column = measure.get("column") or "*"
+        if column == "*":
+            if function != "count":
+                raise ValueError(f"{function} needs a column")
+        else:
+            column = sanitize_sql_identifier(column)
+        default_alias = "count" if column == "*" else f"{function}_{column}"
+        alias = sanitize_sql_identifier(measure.get("alias") or default_alias)
+        normalized_measures.append(
+            {"function": function, "column": column, "alias": alias}
+        )
+
+    names = dimensions + [measure["alias"] for measure in normalized_measures]
+    if len(set(names)) != len(names) or "total_groups" in names:
+        raise ValueError("Dimension and measure names must be unique")
+
+    normalized_filters = []
+    for condition in filters or []:
+        op = str(condition.get("op", "=")).lower()
+        if op not in OPERATORS:
+            raise ValueError(f"op must be one of {', '.join(OPERATORS)}")
+        entry = {
+            "column": sanitize_sql_identifier(condition.get("column", "")),
+            "op": op,
+        }
+        if op not in ("is_null", "not_null"):
+            if "value" not in condition:
+                raise ValueError(f"Filter on {entry['column']} needs a value")
+            value = condition["value"]
+            if op in ("in", "not_in") and not isinstance(value, list):
+                raise ValueError(f"{op} needs a list value")
+            entry["value"] = value
+        normalized_filters.append(entry)
+    # Filter order does not change the result
+    normalized_filters.sort(key=lambda f: json.dumps(f, sort_keys=True, default=str))
+
+    order_by = order_by or normalized_measures[0]["alias"]
+    if order_by not in names:
+        raise ValueError(f"order_by must be one of {', '.join(names)}")
+
+    return {
+        "table": table_name,
+        "dimensions": dimensions,
+        "measures": normalized_measures,
+        "filters": normalized_filters,
+        "order_by": order_by,
+        "descending": bool(descending),
+        "top_k": top_k,
+    }
+
+
+def compile_spec(spec: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Build one GROUP BY ... ORDER BY ... LIMIT statement and its parameters"""
+    select = list(spec["dimensions"])
+    for measure in spec["measures"]:
+        expr = FUNCTIONS[measure["function"]].format(measure["column"])
+        select.append(f"{expr} AS {measure['alias']}")
+    # Number of groups before LIMIT, computed over the aggregated rows
+    select.append("count(*) OVER () AS total_groups")
+
+    where, params = [], []
+    for condition in spec["filters"]:
+        where.append(OPERATORS[condition["op"]].format(condition["column"]))
+        if "value" in condition:
+            params.append(condition["value"])
+
+    query = f"SELECT {', '.join(select)} FROM {spec['table']}"
+    if where:
+        query += f" WHERE {' AND '.join(where)}"
+    if spec["dimensions"]:
+        query += (
+            f" GROUP BY {', '.join(str(i + 1) for i in range(len(spec['dimensions'])))}"
+        )
+    direction = "DESC" if spec["descending"] else "ASC"
+    query += f" ORDER BY {spec['order_by']} {direction} NULLS LAST LIMIT %s"
+    params.append(spec["top_k"])
+    return query, params
+
+
+class AggregateTool(BaseTool):
+    read_only = True
+    lane = BULK
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        table_name: str,
+        measures: List[Dict[str, Any]],
+        dimensions: Optional[List[str]] = None,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = True,
+        top_k: int = 20,
+    ) -> List[TextContent]:
+        self.validate_connection(connection_name)
+        top_k = max(1, min(top_k, self.config.max_rows_limit))
+        spec = normalize_spec(
+            table_name, dimensions, measures, filters, order_by, descending, top_k
+        )
+        key = (
+            "aggregate:"
+            + hashlib.sha256(
+                json.dumps(
+                    [self.connection_manager.resolve(connection_name), spec],
+                    sort_keys=True,
+                    default=str,
+                ).encode()
+            ).hexdigest()
+        )
+        cached = aggregate_cache.get(key)
+        if cached is not None:
+            return cached
+
+        query, params = compile_spec(spec)
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            result = ColumnarResult.from_cursor(cursor)
+
+        if not len(result):
+            output = [TextContent(type="text", text="No matching rows")]
+        else:
+            total = result.column("total_groups")[0]
+            result = ColumnarResult(result.columns[:-1], result.data[:-1])
+            heading = (
+                f"Top {len(result)} of {total:,} groups"
+                if total > len(result)
+                else f"{len(result)} groups"
+            )
+            output = [
+                TextContent(
+                    type="text",
+                    text=f"{heading} from {spec['table']}:\n{result.to_text()}",
+                )
+            ]
+        aggregate_cache.set(key, output)
+        return output
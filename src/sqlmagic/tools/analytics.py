@@ -1,112 +1,1059 @@
-from typing import List
+import math
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
 from mcp.types import TextContent
-from scipy import stats
 
+from ..core.catalog import execute_catalog
+from ..core.compute import compute, top_correlations, zscore_outliers
+from ..core.partitions import (
+    Moments,
+    merge_moments,
+    moments_select,
+    parallel_scan,
+    plan_ranges,
+)
+from ..core.results import ColumnarResult
+from ..core.sampling import (
+    Z_95,
+    approximate,
+    correlation_interval,
+    proportion_interval,
+    sample_source,
+)
+from ..core.scheduler import BULK
+from ..core.snapshot import Snapshot, complete_columns, open_snapshot
 from ..utils.validators import sanitize_sql_identifier
-from .base import BaseTool
+from .base import BaseTool, blocking
+
+
+def _open_snapshot(
+    tool: BaseTool,
+    connection_name: str,
+    table_name: str,
+    snapshot_id: str,
+    full_scan: bool = False,
+    max_latency_ms: Optional[float] = None,
+    target_error: Optional[float] = None,
+) -> Snapshot:
+    """A local snapshot of the table; analysis then reads no database rows"""
+    if full_scan or max_latency_ms is not None or target_error is not None:
+        raise ValueError(
+            "snapshot cannot be combined with full_scan, max_latency_ms or target_error"
+        )
+    return open_snapshot(
+        tool.config.snapshot_dir,
+        snapshot_id,
+        tool.config.snapshot_ttl,
+        tool.connection_manager.resolve(connection_name),
+        table_name,
+    )
 
 
 class FindCorrelationsTool(BaseTool):
-    async def execute(self, connection_name: str, table_name: str) -> List[TextContent]:
+    read_only = True
+    lane = BULK
+
+    # Tables with at least this many numeric columns are pre-filtered via pg_stats
+    WIDE_TABLE_COLUMNS = 50
+    # Co-moments take k(k+1)/2 select items; PostgreSQL allows 1664
+    MAX_FULL_SCAN_COLUMNS = 50
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        table_name: str,
+        threshold: float = 0.5,
+        top_k: int = 20,
+        max_latency_ms: Optional[float] = None,
+        target_error: Optional[float] = None,
+        full_scan: bool = False,
+        snapshot: Optional[str] = None,
+    ) -> List[TextContent]:
         self.validate_connection(connection_name)
         table_name = sanitize_sql_identifier(table_name)
-        with self.connection_manager.get_connection(connection_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT column_name FROM information_schema.columns WHERE table_name = %s AND data_type IN ('integer', 'bigint', 'numeric', 'real', 'double precision')",
-                (table_name,),
+        top_k = max(1, top_k)
+        skipped: List[str] = []
+        estimate = snap = None
+        if snapshot:
+            snap = _open_snapshot(
+                self,
+                connection_name,
+                table_name,
+                snapshot,
+                full_scan,
+                max_latency_ms,
+                target_error,
             )
-            numeric_cols = [row[0] for row in cursor.fetchall()]
+            numeric_cols = snap.numeric_columns()
             if len(numeric_cols) < 2:
                 return [TextContent(type="text", text="Insufficient numeric columns")]
+            data = ColumnarResult(numeric_cols, complete_columns(snap, numeric_cols))
+        else:
+            with self.connection_manager.get_connection(
+                connection_name, read_only=self.read_only
+            ) as conn:
+                cursor = conn.cursor()
+                execute_catalog(cursor, "sqlmagic_numeric_columns", (table_name,))
+                numeric_cols = [row[0] for row in cursor.fetchall()]
+                if len(numeric_cols) >= self.WIDE_TABLE_COLUMNS:
+                    skipped = self._uninformative_columns(cursor, table_name)
+                    numeric_cols = [col for col in numeric_cols if col not in skipped]
+                if len(numeric_cols) < 2:
+                    return [
+                        TextContent(type="text", text="Insufficient numeric columns")
+                    ]
+                if full_scan:
+                    return self._full_scan(
+                        conn,
+                        connection_name,
+                        table_name,
+                        numeric_cols,
+                        threshold,
+                        top_k,
+                        skipped,
+                    )
+
+                def fetch(cursor, source: str) -> ColumnarResult:
+                    cursor.execute(
+                        f"SELECT {', '.join(numeric_cols)} FROM {source} WHERE {' AND '.join([f'{col} IS NOT NULL' for col in numeric_cols])} LIMIT {self.config.max_rows_limit}"
+                    )
+                    return ColumnarResult.from_rows(
+                        numeric_cols, cursor.fetchall(), ["f"] * len(numeric_cols)
+                    )
+
+                def measure(cursor, source: str, fraction: float):
+                    sample = fetch(cursor, source)
+                    # Interval half-width on r is widest at r = 0
+                    n = len(sample)
+                    error = Z_95 / math.sqrt(n - 3) if n > 3 else math.inf
+                    return sample, error, n >= self.config.max_rows_limit
+
+                if max_latency_ms is None and target_error is None:
+                    data = fetch(cursor, table_name)
+                else:
+                    estimate = approximate(
+                        conn,
+                        table_name,
+                        measure,
+                        max_latency_ms,
+                        target_error,
+                        relative=False,
+                    )
+                    data = estimate.value
+        if not len(data):
+            return [TextContent(type="text", text="No data available")]
+
+        with compute.shared_array((len(data), len(numeric_cols))) as matrix:
+            data.fill(matrix)
+            pairs, total = compute.run(top_correlations, matrix, top_k, threshold)
+        result = f"Strong correlations (>{threshold}):\n"
+        for i, j, r in pairs:
+            interval = ""
+            if estimate is not None and not estimate.exact:
+                low, high = correlation_interval(r, len(data))
+                interval = f" [{low:.3f}, {high:.3f}]"
+            result += f"• {numeric_cols[i]} - {numeric_cols[j]}: {r:.3f}{interval}\n"
+        if not pairs:
+            result += "No strong correlations found"
+        elif total > len(pairs):
+            result += f"Showing top {len(pairs)} of {total} pairs\n"
+        if skipped:
+            result += f"Skipped constant or ID-like columns: {', '.join(skipped)}\n"
+        if estimate is not None:
+            result += f"{estimate.note()} ({len(data):,} rows)\n"
+        if snap is not None:
+            result += f"{snap.describe()} ({len(data):,} complete rows)\n"
+        return [TextContent(type="text", text=result)]
+
+    def _full_scan(
+        self,
+        conn,
+        connection_name: str,
+        table_name: str,
+        numeric_cols: List[str],
+        threshold: float,
+        top_k: int,
+        skipped: List[str],
+    ) -> List[TextContent]:
+        """Exact correlations over every row from co-moments merged across ranges"""
+        if len(numeric_cols) > self.MAX_FULL_SCAN_COLUMNS:
+            raise ValueError(
+                f"full_scan supports up to {self.MAX_FULL_SCAN_COLUMNS} numeric columns"
+            )
+        where = " AND ".join(f"{col} IS NOT NULL" for col in numeric_cols)
 
-            cols_str = ", ".join(numeric_cols)
+        def scan(cursor, source: str) -> Moments:
             cursor.execute(
-                f"SELECT {cols_str} FROM {table_name} WHERE {' AND '.join([f'{col} IS NOT NULL' for col in numeric_cols])} LIMIT {self.config.max_rows_limit}"
-            )
-            data = cursor.fetchall()
-            if not data:
-                return [TextContent(type="text", text="No data available")]
-
-            df = pd.DataFrame(data, columns=numeric_cols)
-            corr = df.corr()
-            result = "Strong correlations (>0.5):\n"
-            found = False
-            for i, col1 in enumerate(numeric_cols):
-                for j, col2 in enumerate(numeric_cols):
-                    if i < j and abs(corr.iloc[i, j]) > 0.5:
-                        result += f"• {col1} - {col2}: {corr.iloc[i, j]:.3f}\n"
-                        found = True
-            if not found:
-                result += "No strong correlations found"
-            return [TextContent(type="text", text=result)]
+                f"SELECT {moments_select(numeric_cols)} FROM {source} WHERE {where}"
+            )
+            return Moments.from_row(cursor.fetchone(), len(numeric_cols))
+
+        ranges = plan_ranges(conn.cursor(), table_name, self.config.scan_parallelism)
+        moments = merge_moments(
+            parallel_scan(
+                self.connection_manager,
+                connection_name,
+                conn,
+                ranges,
+                scan,
+                self.config.scan_parallelism,
+                self.read_only,
+            )
+        )
+        if moments.n < 2:
+            return [TextContent(type="text", text="No data available")]
+
+        r = moments.correlation()
+        i, j = np.triu_indices(len(numeric_cols), 1)
+        hits = np.flatnonzero(np.abs(r[i, j]) > threshold)
+        order = hits[np.argsort(-np.abs(r[i[hits], j[hits]]))][:top_k]
+        result = f"Strong correlations (>{threshold}):\n"
+        for n in order:
+            result += (
+                f"• {numeric_cols[i[n]]} - {numeric_cols[j[n]]}: {r[i[n], j[n]]:.3f}\n"
+            )
+        if not len(order):
+            result += "No strong correlations found"
+        elif len(hits) > len(order):
+            result += f"Showing top {len(order)} of {len(hits)} pairs\n"
+        if skipped:
+            result += f"Skipped constant or ID-like columns: {', '.join(skipped)}\n"
+        result += f"Exact: {moments.n:,.0f} rows scanned in {len(ranges)} ranges\n"
+        return [TextContent(type="text", text=result)]
+
+    @staticmethod
+    def _uninformative_columns(cursor, table_name: str) -> List[str]:
+        """Constant or unique, physically ordered (ID-like) columns per pg_stats"""
+        # Same-named tables in other schemas have their own statistics
+        cursor.execute(
+            """
+            SELECT s.attname, s.n_distinct, s.correlation
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            JOIN pg_stats s ON s.schemaname = n.nspname AND s.tablename = c.relname
+            WHERE c.oid = to_regclass(%s)
+            """,
+            (table_name,),
+        )
+        skipped = []
+        for column, n_distinct, correlation in cursor.fetchall():
+            if column in skipped:
+                continue  # inherited and own statistics of the same column
+            constant = n_distinct == 1
+            id_like = (
+                n_distinct is not None
+                and n_distinct <= -0.99
+                and correlation is not None
+                and abs(correlation) >= 0.99
+            )
+            if constant or id_like:
+                skipped.append(column)
+        return skipped
 
 
 class DetectAnomaliesTool(BaseTool):
-    async def execute(
-        self, connection_name: str, table_name: str, column_name: str
+    read_only = True
+    lane = BULK
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        table_name: str,
+        column_name: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        group_by: Optional[str] = None,
+        threshold: float = 3.0,
+        limit: int = 20,
+        max_latency_ms: Optional[float] = None,
+        target_error: Optional[float] = None,
+        full_scan: bool = False,
+        snapshot: Optional[str] = None,
     ) -> List[TextContent]:
         self.validate_connection(connection_name)
         table_name = sanitize_sql_identifier(table_name)
+        if columns or group_by:
+            columns = list(columns or []) + ([column_name] if column_name else [])
+            if not columns:
+                raise ValueError("At least one column is required")
+            if snapshot:
+                raise ValueError("snapshot supports single-column detection only")
+            return self._detect_grouped(
+                connection_name,
+                table_name,
+                [sanitize_sql_identifier(col) for col in dict.fromkeys(columns)],
+                sanitize_sql_identifier(group_by) if group_by else None,
+                threshold,
+                limit,
+            )
+        if not column_name:
+            raise ValueError("column_name or columns is required")
         column_name = sanitize_sql_identifier(column_name)
-        with self.connection_manager.get_connection(connection_name) as conn:
-            cursor = conn.cursor()
+        if full_scan and not snapshot:
+            return self._full_scan(connection_name, table_name, column_name, threshold)
+
+        def fetch(cursor, source: str):
+            cursor.execute(
+                f"SELECT {column_name} FROM {source} WHERE {column_name} IS NOT NULL LIMIT {self.config.max_rows_limit}"
+            )
+            return ColumnarResult.from_rows(
+                [column_name], cursor.fetchall(), ["f"]
+            ).data[0]
+
+        def count_outliers(values) -> int:
+            with compute.shared_array((len(values),)) as array:
+                array[:] = values
+                return compute.run(zscore_outliers, array, threshold)
+
+        def measure(cursor, source: str, fraction: float):
+            values = fetch(cursor, source)
+            hits = count_outliers(values) if len(values) >= 10 else 0
+            rate, low, high = proportion_interval(hits, len(values))
+            error = (high - low) / 2 / rate if rate else math.inf
+            return (hits, len(values)), error, len(values) >= self.config.max_rows_limit
+
+        estimate, note = None, ""
+        if snapshot:
+            snap = _open_snapshot(
+                self,
+                connection_name,
+                table_name,
+                snapshot,
+                full_scan,
+                max_latency_ms,
+                target_error,
+            )
+            values = complete_columns(snap, [column_name])[0]
+            note = f"\n{snap.describe()}"
+        else:
+            with self.connection_manager.get_connection(
+                connection_name, read_only=self.read_only
+            ) as conn:
+                if max_latency_ms is None and target_error is None:
+                    values = fetch(conn.cursor(), table_name)
+                else:
+                    estimate = approximate(
+                        conn, table_name, measure, max_latency_ms, target_error
+                    )
+                    hits, sampled = estimate.value
+        if estimate is not None:
+            if sampled < 10:
+                return [
+                    TextContent(
+                        type="text", text="Insufficient data for anomaly detection"
+                    )
+                ]
+            if estimate.exact:
+                detected = f"{hits} detected"
+            else:
+                rate, low, high = proportion_interval(hits, sampled)
+                rows = estimate.rows_estimate
+                detected = (
+                    f"~{rate * rows:,.0f} estimated (95% CI {low * rows:,.0f}-{high * rows:,.0f}, "
+                    f"{hits} of {sampled:,} sampled rows)"
+                )
+            return [
+                TextContent(
+                    type="text",
+                    text=f"Anomalies in {column_name}: {detected} (Z-score > {threshold:g})\n{estimate.note()}",
+                )
+            ]
+        if len(values) < 10:
+            return [
+                TextContent(type="text", text="Insufficient data for anomaly detection")
+            ]
+
+        anomalies = count_outliers(values)
+        return [
+            TextContent(
+                type="text",
+                text=f"Anomalies in {column_name}: {anomalies} detected (Z-score > {threshold:g})"
+                + note,
+            )
+        ]
+
+    def _full_scan(
+        self, connection_name: str, table_name: str, column_name: str, threshold: float
+    ) -> List[TextContent]:
+        """Exact z-score outliers over every row in two range-parallel passes"""
+
+        def moments(cursor, source: str) -> Moments:
             cursor.execute(
-                f"SELECT {column_name} FROM {table_name} WHERE {column_name} IS NOT NULL LIMIT {self.config.max_rows_limit}"
+                f"SELECT {moments_select([column_name])} FROM {source} WHERE {column_name} IS NOT NULL"
             )
-            values = [float(row[0]) for row in cursor.fetchall()]
-            if len(values) < 10:
+            return Moments.from_row(cursor.fetchone(), 1)
+
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            ranges = plan_ranges(
+                conn.cursor(), table_name, self.config.scan_parallelism
+            )
+
+            def scan(measure):
+                return parallel_scan(
+                    self.connection_manager,
+                    connection_name,
+                    conn,
+                    ranges,
+                    measure,
+                    self.config.scan_parallelism,
+                    self.read_only,
+                )
+
+            total = merge_moments(scan(moments))
+            if total.n < 10:
                 return [
                     TextContent(
                         type="text", text="Insufficient data for anomaly detection"
                     )
                 ]
+            mean, std = float(total.mean[0]), float(total.std[0])
+            anomalies = 0
+            if std > 0:
+
+                def outliers(cursor, source: str) -> int:
+                    cursor.execute(
+                        f"SELECT count(*) FROM {source} WHERE abs({column_name} - %s) > %s",
+                        (mean, threshold * std),
+                    )
+                    return cursor.fetchone()[0]
+
+                anomalies = sum(scan(outliers))
+        return [
+            TextContent(
+                type="text",
+                text=f"Anomalies in {column_name}: {anomalies} detected (Z-score > {threshold:g})\n"
+                f"Exact: {total.n:,.0f} rows scanned in {len(ranges)} ranges",
+            )
+        ]
 
-            z_scores = np.abs(stats.zscore(values))
-            anomalies = np.array(values)[z_scores > 3]
+    def _detect_grouped(
+        self,
+        connection_name: str,
+        table_name: str,
+        columns: List[str],
+        group_by: Optional[str],
+        threshold: float,
+        limit: int,
+    ) -> List[TextContent]:
+        """Score every column per group with window functions in one scan"""
+        n = len(columns)
+        group_expr = f"{group_by}::text" if group_by else "NULL::text"
+        partition = f"PARTITION BY {group_by}" if group_by else ""
+        z_exprs = ", ".join(
+            f"({col} - avg({col}) OVER w) / NULLIF(stddev_pop({col}) OVER w, 0) AS z_{i}"
+            for i, col in enumerate(columns)
+        )
+        is_flagged = [f"abs(z_{i}) > %(threshold)s" for i in range(n)]
+        flag_counts = ", ".join(
+            f"count(*) FILTER (WHERE {cond}) OVER g AS flagged_{i}"
+            for i, cond in enumerate(is_flagged)
+        )
+        score = f"greatest({', '.join(f'coalesce(abs(z_{i}), 0)' for i in range(n))})"
+        z_cols = ", ".join(f"z_{i}" for i in range(n))
+        flagged_cols = ", ".join(f"flagged_{i}" for i in range(n))
+        query = f"""
+            WITH scored AS (
+                SELECT {group_expr} AS grp, {", ".join(columns)},
+                       count(*) OVER w AS group_rows, {z_exprs}
+                FROM {table_name}
+                WINDOW w AS ({partition})
+            ), flagged AS (
+                SELECT *, count(*) OVER g AS group_flagged, {flag_counts},
+                       row_number() OVER (ORDER BY {score} DESC) AS overall_rank,
+                       row_number() OVER (PARTITION BY grp ORDER BY {score} DESC) AS group_rank
+                FROM scored
+                WHERE {" OR ".join(is_flagged)}
+                WINDOW g AS (PARTITION BY grp)
+            )
+            SELECT grp, {", ".join(columns)}, {z_cols}, group_rows, group_flagged,
+                   {flagged_cols}, overall_rank
+            FROM flagged
+            WHERE overall_rank <= %(limit)s OR group_rank = 1
+            ORDER BY overall_rank
+            LIMIT %(max_rows)s
+        """
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                query,
+                {
+                    "threshold": threshold,
+                    "limit": limit,
+                    "max_rows": self.config.max_rows_limit,
+                },
+            )
+            rows = cursor.fetchall()
+
+        label = f" by {group_by}" if group_by else ""
+        if not rows:
             return [
                 TextContent(
                     type="text",
-                    text=f"Anomalies in {column_name}: {len(anomalies)} detected (Z-score > 3)",
+                    text=f"Anomalies (|z| > {threshold:g}) in {', '.join(columns)}{label}: none detected",
                 )
             ]
 
+        groups = {}
+        top_rows = []
+        for row in rows:
+            group = row[0] if group_by else "all rows"
+            values, z_scores = row[1 : n + 1], row[n + 1 : 2 * n + 1]
+            group_rows, group_flagged = row[2 * n + 1], row[2 * n + 2]
+            per_column = row[2 * n + 3 : 3 * n + 3]
+            groups[group] = (group_rows, group_flagged, per_column)
+            if row[-1] <= limit:
+                top_rows.append((group, values, z_scores))
+
+        total = sum(flagged for _, flagged, _ in groups.values())
+        lines = [
+            f"Anomalies (|z| > {threshold:g}) in {', '.join(columns)}{label}: {total:,} rows flagged",
+            "Per group:",
+        ]
+        for group, (group_rows, group_flagged, per_column) in sorted(
+            groups.items(), key=lambda item: -item[1][1]
+        ):
+            detail = ", ".join(
+                f"{col}: {count}" for col, count in zip(columns, per_column) if count
+            )
+            lines.append(
+                f"• {group}: {group_flagged} of {group_rows:,} rows ({detail})"
+            )
+        lines.append("Top flagged rows:")
+        for group, values, z_scores in top_rows:
+            cells = ", ".join(
+                f"{col}={value} (z={z:.2f})"
+                for col, value, z in zip(columns, values, z_scores)
+                if z is not None and abs(z) > threshold
+            )
+            lines.append(f"• {group}: {cells}")
+        return [TextContent(type="text", text="\n".join(lines))]
+
 
 class TimeSeriesAnalysisTool(BaseTool):
-    async def execute(
-        self, connection_name: str, table_name: str, date_column: str, value_column: str
+    read_only = True
+    lane = BULK
+
+    INTERVALS = ("minute", "hour", "day", "week", "month", "quarter", "year")
+    WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+    # date_trunc units as pandas periods and bucket steps, for snapshots
+    PERIODS = {
+        "minute": "min",
+        "hour": "h",
+        "day": "D",
+        "week": "W-SUN",
+        "month": "M",
+        "quarter": "Q",
+        "year": "Y",
+    }
+    STEPS = {
+        "minute": pd.DateOffset(minutes=1),
+        "hour": pd.DateOffset(hours=1),
+        "day": pd.DateOffset(days=1),
+        "week": pd.DateOffset(weeks=1),
+        "month": pd.DateOffset(months=1),
+        "quarter": pd.DateOffset(months=3),
+        "year": pd.DateOffset(years=1),
+    }
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        table_name: str,
+        date_column: str,
+        value_column: str,
+        interval: str = "day",
+        window: int = 7,
+        max_latency_ms: Optional[float] = None,
+        target_error: Optional[float] = None,
+        snapshot: Optional[str] = None,
+        full_scan: bool = False,
     ) -> List[TextContent]:
         self.validate_connection(connection_name)
         table_name = sanitize_sql_identifier(table_name)
         date_column = sanitize_sql_identifier(date_column)
         value_column = sanitize_sql_identifier(value_column)
-        with self.connection_manager.get_connection(connection_name) as conn:
+        if interval not in self.INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(self.INTERVALS)}")
+        window = max(1, window)
+        if snapshot:
+            snap = _open_snapshot(
+                self,
+                connection_name,
+                table_name,
+                snapshot,
+                full_scan,
+                max_latency_ms,
+                target_error,
+            )
+            series, profile = self._snapshot_series(
+                snap, date_column, value_column, interval, window
+            )
+            if len(series) < 2:
+                return [
+                    TextContent(
+                        type="text", text="Insufficient data for time series analysis"
+                    )
+                ]
+            summary = self._summarize(value_column, interval, window, series, profile)
+            return [TextContent(type="text", text=f"{summary}\n{snap.describe()}")]
+        where = f"WHERE {date_column} IS NOT NULL AND {value_column} IS NOT NULL"
+        params = {
+            "interval": interval,
+            "step": f"1 {interval}",
+            "preceding": window - 1,
+            "max_rows": self.config.max_rows_limit,
+        }
+
+        def bucket_query(source: str) -> str:
+            return f"""
+                SELECT date_trunc(%(interval)s, {date_column}) AS bucket,
+                       avg({value_column})::float8 AS value,
+                       count(*) AS points,
+                       sum({value_column})::float8 AS total,
+                       sum({value_column}::float8 * {value_column}::float8) AS total_sq
+                FROM {source} {where}
+                GROUP BY 1
+            """
+
+        # PostgreSQL 14+ rejects extract(hour) on date; through timestamp a
+        # date has hour 0 everywhere and the hour profile is left out
+        hour = f"extract(hour FROM {date_column}::timestamp)"
+
+        def profile_query(source: str) -> str:
+            return f"""
+                SELECT extract(isodow FROM {date_column})::int AS dow,
+                       {hour}::int AS hour,
+                       avg({value_column})::float8, count(*)
+                FROM {source} {where}
+                GROUP BY GROUPING SETS (
+                    (extract(isodow FROM {date_column})), ({hour})
+                )
+            """
+
+        def series_statement(buckets: str, bucket_params=None):
+            return (
+                f"""
+                WITH buckets AS ({buckets}), series AS (
+                    SELECT bucket, value, points, total, total_sq,
+                           avg(value) OVER r AS rolling_mean,
+                           stddev_samp(value) OVER r AS rolling_std,
+                           value - lag(value) OVER o AS delta,
+                           (value - lag(value) OVER o) / NULLIF(lag(value) OVER o, 0) AS pct_change,
+                           COALESCE(lag(bucket) OVER o + %(step)s::interval < bucket, false) AS gap
+                    FROM buckets
+                    WINDOW o AS (ORDER BY bucket),
+                           r AS (ORDER BY bucket ROWS BETWEEN %(preceding)s PRECEDING AND CURRENT ROW)
+                )
+                SELECT bucket, value, points, rolling_mean, rolling_std, delta, pct_change, gap,
+                       count(*) FILTER (WHERE gap) OVER () AS gaps,
+                       count(*) OVER () AS buckets_total,
+                       sum(points) OVER () AS total_points,
+                       sum(total) OVER () AS total_sum,
+                       sum(total_sq) OVER () AS total_sq_sum
+                FROM series
+                ORDER BY bucket DESC
+                LIMIT %(max_rows)s
+                """,
+                {**params, **(bucket_params or {})},
+            )
+
+        def fetch_series(cursor, buckets: str, bucket_params=None):
+            cursor.execute(*series_statement(buckets, bucket_params))
+            return cursor.fetchall()[::-1]
+
+        def measure(cursor, source: str, fraction: float):
+            series = fetch_series(cursor, bucket_query(source))
+            return series, self._bucket_error(series), False
+
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                f"SELECT {date_column}, {value_column} FROM {table_name} WHERE {date_column} IS NOT NULL AND {value_column} IS NOT NULL ORDER BY {date_column} LIMIT {self.config.max_rows_limit}"
+            estimate, source, profile = None, table_name, None
+            ranges = (
+                plan_ranges(cursor, table_name, self.config.scan_parallelism)
+                if full_scan
+                else []
             )
-            data = cursor.fetchall()
-            if len(data) < 2:
+            if len(ranges) > 1:
+                series, profile = self._parallel_series(
+                    conn,
+                    connection_name,
+                    ranges,
+                    date_column,
+                    value_column,
+                    where,
+                    profile_query,
+                    params,
+                    fetch_series,
+                )
+            elif not full_scan and (
+                max_latency_ms is not None or target_error is not None
+            ):
+                estimate = approximate(
+                    conn, table_name, measure, max_latency_ms, target_error
+                )
+                series = estimate.value
+                source = sample_source(table_name, estimate.fraction)
+            else:
+                # Series and profile are independent: one round trip where pipelined
+                series, profile = self.connection_manager.run_batch(
+                    conn,
+                    [
+                        series_statement(bucket_query(source)),
+                        (profile_query(source), ()),
+                    ],
+                )
+                series = series[::-1]
+            if len(series) < 2:
                 return [
                     TextContent(
                         type="text", text="Insufficient data for time series analysis"
                     )
                 ]
+            if profile is None:
+                cursor.execute(profile_query(source))
+                profile = cursor.fetchall()
+
+        summary = self._summarize(value_column, interval, window, series, profile)
+        if estimate is not None:
+            summary += f"\n{estimate.note()} (error of a typical bucket mean)"
+        return [TextContent(type="text", text=summary)]
+
+    def _parallel_series(
+        self,
+        conn,
+        connection_name,
+        ranges,
+        date_column,
+        value_column,
+        where,
+        profile_query,
+        params,
+        fetch_series,
+    ):
+        """Bucket and profile partials per range, merged and windowed in one query"""
 
-            df = pd.DataFrame(data, columns=[date_column, value_column])
-            trend = (
-                "increasing"
-                if df[value_column].iloc[-1] > df[value_column].iloc[0]
-                else "decreasing"
+        def scan(cursor, source: str):
+            cursor.execute(
+                f"""
+                SELECT date_trunc(%(interval)s, {date_column}), {moments_select([value_column])}
+                FROM {source} {where}
+                GROUP BY 1
+                """,
+                params,
             )
-            mean_val = df[value_column].mean()
-            std_val = df[value_column].std()
-            return [
-                TextContent(
-                    type="text",
-                    text=f"Time series {value_column}: {len(data)} points, trend: {trend}, mean: {mean_val:.2f}, std: {std_val:.2f}",
+            buckets = cursor.fetchall()
+            cursor.execute(profile_query(source))
+            return buckets, cursor.fetchall()
+
+        buckets, profile = {}, {}
+        for part_buckets, part_profile in parallel_scan(
+            self.connection_manager,
+            connection_name,
+            conn,
+            ranges,
+            scan,
+            self.config.scan_parallelism,
+            self.read_only,
+        ):
+            for bucket, *moments in part_buckets:
+                part = Moments.from_row(moments, 1)
+                buckets[bucket] = (
+                    buckets[bucket].merge(part) if bucket in buckets else part
                 )
-            ]
+            for dow, hour, avg, count in part_profile:
+                merged = profile.setdefault((dow, hour), [0.0, 0])
+                merged[0] += avg * count
+                merged[1] += count
+        if not buckets:
+            return [], []
+
+        keys = sorted(buckets)
+        merged = [buckets[key] for key in keys]
+        array_type = "timestamptz" if keys[0].tzinfo else "timestamp"
+        # Sums are rebuilt from the merged moments for the summary statistics
+        series = fetch_series(
+            conn.cursor(),
+            f"""
+            SELECT bucket, value, points, value * points AS total,
+                   m2 + value * value * points AS total_sq
+            FROM unnest(%(buckets)s::{array_type}[], %(points)s::bigint[],
+                        %(means)s::float8[], %(m2)s::float8[])
+                 AS b(bucket, points, value, m2)
+            """,
+            {
+                "buckets": keys,
+                "points": [int(m.n) for m in merged],
+                "means": [float(m.mean[0]) for m in merged],
+                "m2": [float(m.comoment[0, 0]) for m in merged],
+            },
+        )
+        merged_profile = [
+            (dow, hour, total / count, count)
+            for (dow, hour), (total, count) in profile.items()
+        ]
+        return series, merged_profile
+
+    def _snapshot_series(
+        self, snap: Snapshot, date_column, value_column, interval, window
+    ):
+        """The rows of fetch_series and profile_query, computed from a snapshot.
+
+        timestamptz values are stored in UTC, so they are bucketed in UTC.
+        """
+        if snap.kind(date_column) != "temporal":
+            raise ValueError(f"{date_column} is not a date/time column of the snapshot")
+        if not snap.is_numeric(value_column):
+            raise ValueError(f"{value_column} is not a numeric column of the snapshot")
+        dates, values = snap.column(date_column), snap.values(value_column)
+        keep = ~np.isnat(dates) & ~np.isnan(values)
+        frame = pd.DataFrame({"at": dates[keep], "value": values[keep]})
+        if frame.empty:
+            return [], []
+        frame["square"] = frame["value"] ** 2
+        frame["bucket"] = frame["at"].dt.to_period(self.PERIODS[interval]).dt.start_time
+        buckets = frame.groupby("bucket").agg(
+            value=("value", "mean"),
+            points=("value", "size"),
+            total=("value", "sum"),
+            total_sq=("square", "sum"),
+        )
+
+        value = buckets["value"]
+        rolling = value.rolling(window, min_periods=1)
+        previous = value.shift()
+        delta = value - previous
+        pct_change = delta / previous.where(previous != 0)
+        starts = buckets.index.to_series()
+        gap = starts.shift() + self.STEPS[interval] < starts
+        totals = (
+            int(gap.sum()),
+            len(buckets),
+            int(buckets["points"].sum()),
+            float(buckets["total"].sum()),
+            float(buckets["total_sq"].sum()),
+        )
+
+        def nullable(x):
+            return None if pd.isna(x) else float(x)
+
+        series = [
+            (
+                bucket.to_pydatetime(),
+                float(v),
+                int(points),
+                nullable(mean),
+                nullable(std),
+            )
+            + (nullable(d), nullable(pct), bool(g))
+            + totals
+            for bucket, v, points, mean, std, d, pct, g in zip(
+                buckets.index,
+                value,
+                buckets["points"],
+                rolling.mean(),
+                rolling.std(),
+                delta,
+                pct_change,
+                gap,
+            )
+        ][-self.config.max_rows_limit :]
+
+        profile = []
+        for part, key in ((0, frame["at"].dt.dayofweek + 1), (1, frame["at"].dt.hour)):
+            for k, (avg, count) in (
+                frame.groupby(key)["value"].agg(["mean", "size"]).iterrows()
+            ):
+                row = [None, None, float(avg), int(count)]
+                row[part] = int(k)
+                profile.append(tuple(row))
+        return series, profile
+
+    @staticmethod
+    def _bucket_error(series) -> float:
+        """Relative 95% error of the mean of a median-sized bucket"""
+        if len(series) < 2:
+            return math.inf
+        total_points, total_sum, total_sq_sum = series[-1][10:13]
+        mean = total_sum / total_points
+        if total_points < 2 or mean == 0:
+            return math.inf
+        variance = (total_sq_sum - total_sum * total_sum / total_points) / (
+            total_points - 1
+        )
+        points = float(np.median([row[2] for row in series]))
+        return Z_95 * math.sqrt(max(variance, 0.0) / points) / abs(mean)
+
+    def _summarize(self, value_column, interval, window, series, profile) -> str:
+        buckets, values, _, rolling_mean, rolling_std, delta, pct_change, _ = zip(
+            *[row[:8] for row in series]
+        )
+        gaps, buckets_total, total_points, total_sum, total_sq_sum = series[-1][8:]
+        values = np.asarray(values, dtype=float)
+        slope = np.polyfit(np.arange(len(values)), values, 1)[0]
+        trend = "increasing" if slope > 0 else "decreasing"
+        mean_val = total_sum / total_points
+        variance = (
+            (total_sq_sum - total_sum * total_sum / total_points) / (total_points - 1)
+            if total_points > 1
+            else 0.0
+        )
+        std_val = float(np.sqrt(max(variance, 0.0)))
+
+        lines = [
+            f"Time series {value_column}: {total_points} points, trend: {trend}, mean: {mean_val:.2f}, std: {std_val:.2f}",
+            f"Buckets: {buckets_total} by {interval}"
+            + (f" (last {len(series)} shown)" if buckets_total > len(series) else "")
+            + f", {gaps} gaps, slope {slope:+.3f} per {interval}",
+        ]
+        spread = "" if rolling_std[-1] is None else f" ± {rolling_std[-1]:.2f}"
+        lines.append(
+            f"Latest {buckets[-1]}: {values[-1]:.2f}, rolling {window}-{interval} mean {rolling_mean[-1]:.2f}{spread}"
+        )
+        changes = [
+            (abs(d), bucket, d, pct)
+            for bucket, d, pct in zip(buckets, delta, pct_change)
+            if d is not None
+        ]
+        if changes:
+            lines.append("Largest period-over-period changes:")
+            for _, bucket, d, pct in sorted(changes, key=lambda c: c[0], reverse=True)[
+                :3
+            ]:
+                pct_text = "" if pct is None else f" ({pct:+.1%})"
+                lines.append(f"• {bucket}: {d:+.2f}{pct_text}")
+
+        by_dow = {dow: avg for dow, hour, avg, _ in profile if dow is not None}
+        by_hour = {hour: avg for dow, hour, avg, _ in profile if hour is not None}
+        if len(by_dow) > 1:
+            lines.append(
+                "Day-of-week profile: "
+                + ", ".join(
+                    f"{self.WEEKDAYS[dow - 1]} {by_dow[dow]:.2f}"
+                    for dow in sorted(by_dow)
+                )
+            )
+        if len(by_hour) > 1:
+            peak = max(by_hour, key=by_hour.get)
+            low = min(by_hour, key=by_hour.get)
+            lines.append(
+                f"Hour-of-day profile: peak {peak:02d}:00 ({by_hour[peak]:.2f}), low {low:02d}:00 ({by_hour[low]:.2f})"
+            )
+        return "\n".join(lines)
+
+
+class AnalyzeDistributionTool(BaseTool):
+    read_only = True
+    lane = BULK
+
+    METHODS = ("equi_width", "equi_depth")
+    MAX_BINS = 200
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        table_name: str,
+        column_name: str,
+        bins: int = 20,
+        method: str = "equi_width",
+    ) -> List[TextContent]:
+        self.validate_connection(connection_name)
+        table_name = sanitize_sql_identifier(table_name)
+        column_name = sanitize_sql_identifier(column_name)
+        if method not in self.METHODS:
+            raise ValueError(f"method must be one of {', '.join(self.METHODS)}")
+        bins = max(1, min(bins, self.MAX_BINS))
+        x = f"{column_name}::float8"
+        quantiles = (
+            ""
+            if method == "equi_width"
+            else (
+                f", percentile_cont(%(quantiles)s::float8[]) WITHIN GROUP (ORDER BY {x})"
+            )
+        )
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT count(*), count({column_name}), min({x}), max({x}), avg({x})
+                       {quantiles}
+                FROM {table_name}
+                """,
+                {"quantiles": [i / bins for i in range(bins + 1)]},
+            )
+            total, count, lo, hi, mean, *edges = cursor.fetchone()
+            if not count:
+                return [
+                    TextContent(
+                        type="text", text=f"No non-null values in {column_name}"
+                    )
+                ]
+
+            if lo == hi:
+                edges = [lo, hi]
+                bucket = "1"
+            elif method == "equi_width":
+                edges = list(np.linspace(lo, hi, bins + 1))
+                bucket = f"LEAST(width_bucket({x}, %(lo)s, %(hi)s, %(bins)s), %(bins)s)"
+            else:
+                # Ties collapse quantiles, so repeated edges merge their bins
+                edges = sorted(set(edges[0]))
+                if len(edges) < 2:
+                    edges = [lo, hi]
+                bucket = f"LEAST(width_bucket({x}, %(edges)s::float8[]), %(last)s)"
+            # Central moments in the same scan as the bin counts
+            cursor.execute(
+                f"""
+                SELECT {bucket} AS bin, count(*),
+                       sum(power({x} - %(mean)s, 2)), sum(power({x} - %(mean)s, 3)),
+                       sum(power({x} - %(mean)s, 4))
+                FROM {table_name}
+                WHERE {column_name} IS NOT NULL
+                GROUP BY 1
+                """,
+                {
+                    "lo": lo,
+                    "hi": hi,
+                    "bins": bins,
+                    "edges": edges[:-1],
+                    "last": len(edges) - 1,
+                    "mean": mean,
+                },
+            )
+            rows = cursor.fetchall()
+
+        counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        m2 = m3 = m4 = 0.0
+        for bin_number, bin_count, s2, s3, s4 in rows:
+            counts[int(bin_number) - 1] += bin_count
+            m2, m3, m4 = m2 + (s2 or 0.0), m3 + (s3 or 0.0), m4 + (s4 or 0.0)
+        m2, m3, m4 = m2 / count, m3 / count, m4 / count
+        skew = m3 / m2**1.5 if m2 > 0 else 0.0
+        kurtosis = m4 / m2**2 - 3 if m2 > 0 else 0.0
+
+        label = "equi-width" if method == "equi_width" else "equi-depth"
+        lines = [
+            f"Distribution of {column_name} in {table_name}: {count:,} values"
+            + (f", {total - count:,} nulls" if total > count else ""),
+            f"min {lo:g}, max {hi:g}, mean {mean:g}, std {math.sqrt(m2):g}, "
+            f"skewness {skew:.3f}, excess kurtosis {kurtosis:.3f}",
+            f"{len(counts)} {label} bins:",
+        ]
+        for i, bin_count in enumerate(counts):
+            closing = "]" if i == len(counts) - 1 else ")"
+            lines.append(
+                f"• [{edges[i]:g}, {edges[i + 1]:g}{closing}: {bin_count:,} ({bin_count / count:.1%})"
+            )
+        return [TextContent(type="text", text="\n".join(lines))]
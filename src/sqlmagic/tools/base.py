@@ -1,13 +1,35 @@
+import asyncio
 from abc import ABC, abstractmethod
+from functools import wraps
 from typing import List
 
 from mcp.types import TextContent
 
 from ..core.config import Config
 from ..core.connection import ConnectionManager
+from ..core.scheduler import INTERACTIVE
+from ..utils.profiler import current_profile
+
+
+def blocking(func):
+    """Run a synchronous tool method in a worker thread"""
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return await asyncio.to_thread(profile.runcall, func, *args, **kwargs)
+
+    return wrapper
 
 
 class BaseTool(ABC):
+    # Read-only tools may be routed to a replica
+    read_only: bool = False
+    # Scheduler lane: INTERACTIVE for metadata, BULK for scans
+    lane: str = INTERACTIVE
+
     def __init__(self, connection_manager: ConnectionManager, config: Config):
         self.connection_manager = connection_manager
         self.config = config
@@ -19,3 +41,9 @@ class BaseTool(ABC):
     def validate_connection(self, connection_name: str):
         if not self.connection_manager.is_connected(connection_name):
             raise ValueError(f"Connection {connection_name} not found or inactive")
+
+    def apply_query_timeout(self, cursor):
+        """Cap statements of the current transaction at QUERY_TIMEOUT"""
+        cursor.execute(
+            f"SET LOCAL statement_timeout = {max(1, self.config.query_timeout * 1000)}"
+        )
@@ -1,15 +1,30 @@
-from typing import List
+import time
+from typing import List, Optional
 
-import pandas as pd
 from mcp.types import TextContent
-from psycopg2.extras import RealDictCursor
 
-from ..utils.validators import sanitize_sql_identifier
-from .base import BaseTool
+from ..core.catalog import catalog_statement, execute_catalog
+from ..core.memory import fetch_within, format_bytes, memory_budget
+from ..core.results import ColumnarResult
+from ..core.sampling import approximate, count_interval
+from ..core.scheduler import BULK
+from ..utils.metrics import metrics
+from ..utils.querylog import query_log
+from ..utils.validators import QueryValidator, sanitize_sql_identifier
+from ..utils.watchdog import watchdog
+from .base import BaseTool, blocking
+
+# Server-side cursor so rows stream in batches instead of arriving all at once
+RESULT_CURSOR = "sqlmagic_result"
+
+
+def truncation_note(reason: Optional[str]) -> str:
+    return f"\n(truncated: {reason})" if reason else ""
 
 
 class ConnectTool(BaseTool):
-    async def execute(
+    @blocking
+    def execute(
         self,
         connection_name: str,
         host: str,
@@ -17,10 +32,11 @@ class ConnectTool(BaseTool):
         username: str,
         password: str,
         port: int = 5432,
+        replicas: Optional[List[str]] = None,
     ) -> List[TextContent]:
         try:
             self.connection_manager.connect(
-                connection_name, host, port, database, username, password
+                connection_name, host, port, database, username, password, replicas
             )
             return [
                 TextContent(
@@ -32,30 +48,53 @@ class ConnectTool(BaseTool):
 
 
 class ExploreTablesTool(BaseTool):
-    async def execute(self, connection_name: str) -> List[TextContent]:
+    read_only = True
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        schema: str = "public",
+        offset: int = 0,
+        limit: int = 100,
+    ) -> List[TextContent]:
         self.validate_connection(connection_name)
-        with self.connection_manager.get_connection_context(connection_name) as conn:
+        offset = max(0, offset)
+        limit = max(1, min(limit, self.config.max_rows_limit))
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "SELECT table_name, table_type FROM information_schema.tables WHERE table_schema = 'public' ORDER BY table_name"
-            )
+            execute_catalog(cursor, "sqlmagic_tables", (schema, limit, offset))
             tables = cursor.fetchall()
-            result = "Tables:\n" + "\n".join(
-                [f"• {name} ({type_})" for name, type_ in tables]
-            )
-            return [TextContent(type="text", text=result)]
+        if not tables:
+            return [
+                TextContent(
+                    type="text", text=f"No tables in {schema} at offset {offset}"
+                )
+            ]
+        total = tables[0][2]
+        result = (
+            f"Tables in {schema} ({offset + 1}-{offset + len(tables)} of {total}):\n"
+            + "\n".join([f"• {name} ({type_})" for name, type_, _ in tables])
+        )
+        if offset + len(tables) < total:
+            result += f"\nMore tables: offset={offset + len(tables)}"
+        return [TextContent(type="text", text=result)]
 
 
 class DescribeTableTool(BaseTool):
-    async def execute(self, connection_name: str, table_name: str) -> List[TextContent]:
+    read_only = True
+
+    @blocking
+    def execute(self, connection_name: str, table_name: str) -> List[TextContent]:
         self.validate_connection(connection_name)
         table_name = sanitize_sql_identifier(table_name)
-        with self.connection_manager.get_connection_context(connection_name) as conn:
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "SELECT column_name, data_type, is_nullable FROM information_schema.columns WHERE table_name = %s ORDER BY ordinal_position",
-                (table_name,),
-            )
+            execute_catalog(cursor, "sqlmagic_columns", (table_name,))
             columns = cursor.fetchall()
             result = f"Structure of {table_name}:\n" + "\n".join(
                 [
@@ -67,78 +106,226 @@ class DescribeTableTool(BaseTool):
 
 
 class SampleDataTool(BaseTool):
-    async def execute(
+    read_only = True
+
+    @blocking
+    def execute(
         self, connection_name: str, table_name: str, limit: int = 10
     ) -> List[TextContent]:
         self.validate_connection(connection_name)
         table_name = sanitize_sql_identifier(table_name)
         limit = min(limit, self.config.max_rows_limit)
-        with self.connection_manager.get_connection_context(connection_name) as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(f"SELECT * FROM {table_name} LIMIT %s", (limit,))
-            rows = cursor.fetchall()
-            if not rows:
+        with memory_budget.lease(self.config.max_result_bytes) as lease:
+            with self.connection_manager.get_connection(
+                connection_name, read_only=self.read_only
+            ) as conn:
+                cursor = conn.cursor(name=RESULT_CURSOR)
+                cursor.execute(f"SELECT * FROM {table_name} LIMIT %s", (limit,))
+                rows, truncated = fetch_within(cursor, limit, lease)
+                result = ColumnarResult.from_cursor(cursor, rows)
+            if not len(result):
                 return [TextContent(type="text", text="No data found")]
-            df = pd.DataFrame(rows)
             return [
                 TextContent(
                     type="text",
-                    text=f"Sample from {table_name} ({len(rows)} rows):\n{df.to_string(index=False)}",
+                    text=f"Sample from {table_name} ({len(result)} rows):\n{result.to_text()}"
+                    + truncation_note(truncated),
                 )
             ]
 
 
 class AnalyzeDataTool(BaseTool):
-    async def execute(self, connection_name: str, table_name: str) -> List[TextContent]:
+    read_only = True
+    lane = BULK
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        table_name: str,
+        max_latency_ms: Optional[float] = None,
+        target_error: Optional[float] = None,
+    ) -> List[TextContent]:
         self.validate_connection(connection_name)
         table_name = sanitize_sql_identifier(table_name)
-        with self.connection_manager.get_connection_context(connection_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            cursor.execute(
-                "SELECT COUNT(*) FROM information_schema.columns WHERE table_name = %s",
-                (table_name,),
-            )
-            cols = cursor.fetchone()[0]
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            if max_latency_ms is None and target_error is None:
+                # Independent statements: one round trip on a pipelining driver
+                (count_row,), (cols_row,) = self.connection_manager.run_batch(
+                    conn,
+                    [
+                        (f"SELECT COUNT(*) FROM {table_name}", ()),
+                        catalog_statement(conn, "sqlmagic_column_count", (table_name,)),
+                    ],
+                )
+                count, cols = count_row[0], cols_row[0]
+                rows, note = f"{count:,} rows", ""
+            else:
+                estimate = approximate(
+                    conn, table_name, self._sampled_count, max_latency_ms, target_error
+                )
+                count, low, high = estimate.value
+                rows = (
+                    f"{count:,.0f} rows"
+                    if estimate.exact
+                    else f"~{count:,.0f} rows (95% CI {low:,.0f}-{high:,.0f})"
+                )
+                note = f"\n{estimate.note()}"
+                cursor = conn.cursor()
+                execute_catalog(cursor, "sqlmagic_column_count", (table_name,))
+                cols = cursor.fetchone()[0]
             return [
                 TextContent(
                     type="text",
-                    text=f"Analysis of {table_name}: {count:,} rows, {cols} columns",
+                    text=f"Analysis of {table_name}: {rows}, {cols} columns{note}",
                 )
             ]
 
+    @staticmethod
+    def _sampled_count(cursor, source: str, fraction: float):
+        cursor.execute(f"SELECT COUNT(*) FROM {source}")
+        estimate, low, high, error = count_interval(cursor.fetchone()[0], fraction)
+        return (estimate, low, high), error, False
+
 
 class ExecuteQueryTool(BaseTool):
-    async def execute(self, connection_name: str, query: str, limit: int = 100) -> List[TextContent]:
+    read_only = True
+    lane = BULK
+
+    @blocking
+    def execute(
+        self, connection_name: str, query: str, limit: int = 100
+    ) -> List[TextContent]:
         self.validate_connection(connection_name)
-        
-        # Простая проверка безопасности - только SELECT запросы
-        query_upper = query.strip().upper()
-        if not query_upper.startswith('SELECT'):
-            return [TextContent(type="text", text="Error: Only SELECT queries are allowed")]
-        
+        verdict = QueryValidator.classify(query)
+        if not verdict.allowed:
+            return [TextContent(type="text", text=f"Error: {verdict.reason}")]
+
         limit = min(limit, self.config.max_rows_limit)
-        
-        with self.connection_manager.get_connection_context(connection_name) as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            try:
-                # Добавляем LIMIT если его нет
-                if 'LIMIT' not in query_upper:
-                    query = f"{query.rstrip(';')} LIMIT {limit}"
-                
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                
-                if not rows:
-                    return [TextContent(type="text", text="No data found")]
-                
-                df = pd.DataFrame(rows)
-                return [
-                    TextContent(
-                        type="text",
-                        text=f"Query results ({len(rows)} rows):\n{df.to_string(index=False)}",
+        query = query[: verdict.end]
+        if verdict.command in QueryValidator.LIMITABLE and not verdict.has_limit:
+            query = f"{query} LIMIT {limit}"
+
+        with memory_budget.lease(self.config.max_result_bytes) as lease:
+            with self.connection_manager.get_connection(
+                connection_name, read_only=self.read_only
+            ) as conn:
+                try:
+                    # The server enforces read-only even if the lexer missed something
+                    setup = conn.cursor()
+                    setup.execute("SET TRANSACTION READ ONLY")
+                    self.apply_query_timeout(setup)
+                    # SHOW and EXPLAIN cannot run through a server-side cursor
+                    streamed = verdict.command in QueryValidator.LIMITABLE
+                    cursor = (
+                        conn.cursor(name=RESULT_CURSOR) if streamed else conn.cursor()
                     )
-                ]
-            except Exception as e:
-                return [TextContent(type="text", text=f"Query error: {str(e)}")]
+                    cursor.execute(query)
+                    rows, truncated = fetch_within(cursor, limit, lease)
+                    result = ColumnarResult.from_cursor(cursor, rows)
+                except Exception as e:
+                    return [TextContent(type="text", text=f"Query error: {str(e)}")]
+                finally:
+                    conn.rollback()
+
+            if not len(result):
+                return [TextContent(type="text", text="No data found")]
+            return [
+                TextContent(
+                    type="text",
+                    text=f"Query results ({len(result)} rows):\n{result.to_text()}"
+                    + truncation_note(truncated),
+                )
+            ]
+
+
+class ListConnectionsTool(BaseTool):
+    async def execute(self) -> List[TextContent]:
+        connections = self.connection_manager.list_connections()
+        if not connections:
+            return [TextContent(type="text", text="No active connections")]
+        result = "Connections:\n" + "\n".join(
+            [
+                f"• {name}: {info['database']} on {info['host']}"
+                for name, info in connections.items()
+            ]
+        )
+        return [TextContent(type="text", text=result)]
+
+
+class ServerMetricsTool(BaseTool):
+    async def execute(self) -> List[TextContent]:
+        data = metrics.get_metrics()
+        lines = [
+            f"Queries executed: {data['queries_executed']}",
+            f"Connections created: {data['connections_created']}",
+            f"Errors: {data['errors']}",
+            f"Average query time: {data['avg_query_time']:.3f}s",
+            f"Result memory: {format_bytes(memory_budget.used)} in use, "
+            f"peak {format_bytes(memory_budget.peak)} of {format_bytes(memory_budget.capacity)}",
+        ]
+        loop = watchdog.snapshot()
+        if loop["enabled"]:
+            buckets = ", ".join(
+                f"{label}: {count}"
+                for label, count in zip(watchdog.histogram_labels(), loop["histogram"])
+                if count
+            )
+            lines.append(
+                f"Event loop lag: max {loop['max_lag'] * 1000:.1f}ms ({buckets})"
+            )
+            for stall in reversed(loop["stalls"][-5:]):
+                when = time.strftime("%H:%M:%S", time.localtime(stall.started))
+                lines.append(
+                    f"• stall at {when}: {stall.duration * 1000:.0f}ms in {stall.call}"
+                )
+        for name in self.connection_manager.list_connections():
+            key = self.connection_manager.resolve(name)
+            lines.append(f"Routing for {name}:")
+            for target, count in data["routes"].get(key, {}).items():
+                lines.append(f"• {target}: {count}")
+            for replica in self.connection_manager.replica_status(name):
+                lag = "unknown" if replica["lag"] is None else f"{replica['lag']:.1f}s"
+                role = "replica" if replica["is_replica"] else "primary"
+                lines.append(
+                    f"• {replica['host']} ({role}): lag {lag}, {replica['in_use']} in use"
+                )
+            scheduler = self.connection_manager.schedulers.get(key)
+            if scheduler is None:
+                continue
+            for lane, stats in scheduler.snapshot().items():
+                lines.append(
+                    f"• {lane} lane: {stats['active']} active, {stats['queued']} queued "
+                    f"(max {stats['max_queue']}), wait avg {stats['avg_wait'] * 1000:.1f}ms "
+                    f"max {stats['max_wait'] * 1000:.1f}ms"
+                )
+        return [TextContent(type="text", text="\n".join(lines))]
+
+
+class QueryStatsTool(BaseTool):
+    async def execute(self, limit: int = 10, reset: bool = False) -> List[TextContent]:
+        statements = query_log.top(limit)
+        slow = query_log.slow_queries(limit)
+        if reset:
+            query_log.reset()
+        if not statements:
+            return [TextContent(type="text", text="No queries recorded")]
+        lines = ["Top statements by total time:"]
+        for stats in statements:
+            lines.append(
+                f"• {stats.calls} calls, total {stats.total_time * 1000:.1f}ms, "
+                f"mean {stats.mean_time * 1000:.1f}ms, max {stats.max_time * 1000:.1f}ms, "
+                f"{stats.rows:,} rows, {stats.errors} errors: {stats.query}"
+            )
+        threshold = query_log.slow_threshold * 1000
+        lines.append(f"Slow queries (>= {threshold:g}ms), newest first:")
+        if not slow:
+            lines.append("• none")
+        for entry in slow:
+            when = time.strftime("%H:%M:%S", time.localtime(entry.timestamp))
+            lines.append(
+                f"• {when} {entry.duration * 1000:.1f}ms, {entry.rows:,} rows: {entry.fingerprint}"
+            )
+        return [TextContent(type="text", text="\n".join(lines))]
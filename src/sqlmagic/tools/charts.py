@@ -0,0 +1,213 @@
+import base64
+import hashlib
+import io
+import json
+from typing import List, Union
+
+import numpy as np
+from mcp.types import ImageContent, TextContent
+
+from ..core.scheduler import BULK
+from ..utils.cache import LRUCache
+from ..utils.downsample import lttb
+from ..utils.validators import sanitize_sql_identifier
+from .base import BaseTool, blocking
+
+# PNGs are large; keep the recent ones and bound the total
+chart_cache = LRUCache(ttl=300, max_entries=64, max_bytes=32 * 2**20)
+
+
+def chart_key(*parts) -> str:
+    return "chart:" + hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def render_png(draw, width: float, height: float, dpi: int) -> str:
+    """Draw on a headless Agg figure and return the PNG as base64"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    ax = fig.subplots()
+    draw(ax)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+class PlotSeriesTool(BaseTool):
+    read_only = True
+    lane = BULK
+
+    # Rows fetched per output pixel before LTTB picks the final points
+    OVERSAMPLE = 4
+
+    @blocking
+    def execute(
+        self, connection_name: str, table_name: str, date_column: str, value_column: str
+    ) -> List[Union[ImageContent, TextContent]]:
+        self.validate_connection(connection_name)
+        table_name = sanitize_sql_identifier(table_name)
+        date_column = sanitize_sql_identifier(date_column)
+        value_column = sanitize_sql_identifier(value_column)
+        width, height, dpi = (
+            self.config.chart_width,
+            self.config.chart_height,
+            self.config.chart_dpi,
+        )
+        key = chart_key(
+            "series",
+            self.connection_manager.resolve(connection_name),
+            table_name,
+            date_column,
+            value_column,
+            width,
+            height,
+            dpi,
+        )
+        cached = chart_cache.get(key)
+        if cached is not None:
+            return cached
+
+        pixels = int(width * dpi)
+        buckets = pixels * self.OVERSAMPLE
+        epoch = f"extract(epoch FROM {date_column})"
+        source = f"FROM {table_name} WHERE {date_column} IS NOT NULL AND {value_column} IS NOT NULL"
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT count(*), min({epoch})::float8, max({epoch})::float8 {source}"
+            )
+            total, lo, hi = cursor.fetchone()
+            if total < 2:
+                return [TextContent(type="text", text="Insufficient data to plot")]
+            if total <= buckets or lo == hi:
+                cursor.execute(
+                    f"SELECT {epoch}::float8, {value_column}::float8 {source} ORDER BY {date_column} LIMIT %s",
+                    (buckets,),
+                )
+                points = cursor.fetchall()
+            else:
+                # Min and max per time bucket keep spikes visible after LTTB
+                cursor.execute(
+                    f"""
+                    SELECT avg({epoch})::float8, min({value_column})::float8, max({value_column})::float8
+                    {source}
+                    GROUP BY LEAST(width_bucket({epoch}, %(lo)s, %(hi)s, %(n)s), %(n)s)
+                    ORDER BY 1
+                    """,
+                    {"lo": lo, "hi": hi, "n": buckets},
+                )
+                points = [
+                    point
+                    for x, low, high in cursor.fetchall()
+                    for point in ((x, low), (x, high))
+                ]
+
+        x = np.array([p[0] for p in points], dtype=float)
+        y = np.array([p[1] for p in points], dtype=float)
+        x, y = lttb(x, y, pixels)
+        timestamps = x.astype("datetime64[s]")
+
+        def draw(ax):
+            ax.plot(timestamps, y, linewidth=1)
+            ax.set_title(f"{value_column} over {date_column}")
+            ax.set_xlabel(date_column)
+            ax.set_ylabel(value_column)
+            ax.figure.autofmt_xdate()
+
+        image = render_png(draw, width, height, dpi)
+        result = [
+            ImageContent(type="image", data=image, mimeType="image/png"),
+            TextContent(
+                type="text",
+                text=f"{value_column} over {date_column}: {total:,} rows, {len(x)} points plotted",
+            ),
+        ]
+        chart_cache.set(key, result)
+        return result
+
+
+class PlotDistributionTool(BaseTool):
+    read_only = True
+    lane = BULK
+
+    @blocking
+    def execute(
+        self, connection_name: str, table_name: str, column_name: str, bins: int = 30
+    ) -> List[Union[ImageContent, TextContent]]:
+        self.validate_connection(connection_name)
+        table_name = sanitize_sql_identifier(table_name)
+        column_name = sanitize_sql_identifier(column_name)
+        bins = max(1, min(bins, 500))
+        width, height, dpi = (
+            self.config.chart_width,
+            self.config.chart_height,
+            self.config.chart_dpi,
+        )
+        key = chart_key(
+            "distribution",
+            self.connection_manager.resolve(connection_name),
+            table_name,
+            column_name,
+            bins,
+            width,
+            height,
+            dpi,
+        )
+        cached = chart_cache.get(key)
+        if cached is not None:
+            return cached
+
+        source = f"FROM {table_name} WHERE {column_name} IS NOT NULL"
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT count(*), min({column_name})::float8, max({column_name})::float8 {source}"
+            )
+            total, lo, hi = cursor.fetchone()
+            if not total:
+                return [TextContent(type="text", text="No data to plot")]
+            if lo == hi:
+                counts = np.array([total])
+            else:
+                cursor.execute(
+                    f"""
+                    SELECT LEAST(width_bucket({column_name}, %(lo)s, %(hi)s, %(n)s), %(n)s), count(*)
+                    {source}
+                    GROUP BY 1
+                    """,
+                    {"lo": lo, "hi": hi, "n": bins},
+                )
+                counts = np.zeros(bins, dtype=np.int64)
+                for bucket, count in cursor.fetchall():
+                    counts[bucket - 1] = count
+
+        edges = (
+            np.linspace(lo, hi, len(counts) + 1)
+            if lo != hi
+            else np.array([lo - 0.5, hi + 0.5])
+        )
+
+        def draw(ax):
+            ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge")
+            ax.set_title(f"Distribution of {column_name}")
+            ax.set_xlabel(column_name)
+            ax.set_ylabel("count")
+
+        image = render_png(draw, width, height, dpi)
+        result = [
+            ImageContent(type="image", data=image, mimeType="image/png"),
+            TextContent(
+                type="text",
+                text=f"Distribution of {column_name}: {total:,} values in {len(counts)} bins",
+            ),
+        ]
+        chart_cache.set(key, result)
+        return result
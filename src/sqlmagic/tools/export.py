@@ -0,0 +1,202 @@
+import json
+import os
+import re
+import time
+import uuid
+from typing import List, Optional
+
+from mcp.types import TextContent
+
+from ..core.memory import SIZE_SAMPLE, estimate_rows_bytes, format_bytes, memory_budget
+from ..core.scheduler import BULK
+from ..utils.validators import QueryValidator
+from .base import BaseTool, blocking
+
+try:  # Optional: pip install sqlmagic[export]
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401  (makes pa.ipc available)
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_CURSOR = "sqlmagic_export"
+# Most rows per record batch; batches are also sized to fit MAX_RESULT_BYTES,
+# so memory stays bounded by one batch whatever the result size
+EXPORT_BATCH = 50_000
+# Widest numeric exported as an Arrow decimal; wider ones are exported as text
+DECIMAL256_PRECISION = 76
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+_FILENAME = re.compile(r"[\w.-]+")
+
+
+def arrow_type(column):
+    """Arrow type for a cursor.description column; anything unknown is exported as text.
+
+    numeric(p, s) becomes an exact decimal; unconstrained numeric has no fixed
+    scale and is exported as text rather than rounded.
+    """
+    type_code = column[1]
+    if type_code == 1700:
+        precision, scale = (column[4], column[5]) if len(column) > 5 else (None, None)
+        if not precision or precision > DECIMAL256_PRECISION:
+            return pa.string()
+        if precision > 38:
+            return pa.decimal256(precision, scale or 0)
+        return pa.decimal128(precision, scale or 0)
+    return {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        26: pa.int64(),
+        700: pa.float32(),
+        701: pa.float64(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+        17: pa.binary(),
+    }.get(type_code, pa.string())
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def record_batch(rows: List[tuple], schema) -> "pa.RecordBatch":
+    columns = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [_to_text(value) for value in values]
+        elif pa.types.is_decimal(field.type):
+            # numeric(p, s) may still hold NaN, which a decimal cannot
+            values = [
+                None if value is not None and value.is_nan() else value
+                for value in values
+            ]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class ExportQueryTool(BaseTool):
+    read_only = True
+    lane = BULK
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        query: str,
+        format: str = "parquet",
+        filename: Optional[str] = None,
+        max_rows: Optional[int] = None,
+    ) -> List[TextContent]:
+        self.validate_connection(connection_name)
+        if pa is None:
+            raise ValueError("export_query needs pyarrow: pip install sqlmagic[export]")
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if max_rows is not None and max_rows < 1:
+            raise ValueError("max_rows must be positive")
+        verdict = QueryValidator.classify(query)
+        if not verdict.allowed:
+            return [TextContent(type="text", text=f"Error: {verdict.reason}")]
+        if verdict.command not in QueryValidator.LIMITABLE:
+            return [
+                TextContent(
+                    type="text",
+                    text=f"Error: {verdict.command} results cannot be exported",
+                )
+            ]
+        query = query[: verdict.end]
+
+        name = (
+            filename
+            or f"export-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        )
+        if not _FILENAME.fullmatch(name) or name.startswith("."):
+            raise ValueError(
+                "filename may only contain letters, digits, '.', '-' and '_'"
+            )
+        if not name.endswith(FORMATS[format]):
+            name += FORMATS[format]
+        os.makedirs(self.config.export_dir, exist_ok=True)
+        path = os.path.abspath(os.path.join(self.config.export_dir, name))
+        # Unique per write, so concurrent exports to one name never share a file
+        partial = f"{path}.{uuid.uuid4().hex[:8]}.partial"
+
+        start = time.monotonic()
+        rows = 0
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn, memory_budget.lease(self.config.max_result_bytes) as lease:
+            writer = None
+            try:
+                setup = conn.cursor()
+                setup.execute("SET TRANSACTION READ ONLY")
+                self.apply_query_timeout(setup)
+                cursor = conn.cursor(name=EXPORT_CURSOR)
+                cursor.execute(query)
+                # The first batch is small and measures the row size for the rest
+                batch_rows = min(SIZE_SAMPLE, EXPORT_BATCH)
+                while max_rows is None or rows < max_rows:
+                    wanted = batch_rows
+                    if max_rows is not None:
+                        wanted = min(wanted, max_rows - rows)
+                    batch = cursor.fetchmany(wanted)
+                    if writer is None:
+                        # A named cursor describes its columns after the first fetch
+                        schema = pa.schema(
+                            [
+                                (column[0], arrow_type(column))
+                                for column in cursor.description
+                            ]
+                        )
+                        writer = (
+                            pq.ParquetWriter(partial, schema)
+                            if format == "parquet"
+                            else pa.ipc.new_file(partial, schema)
+                        )
+                    if not batch:
+                        break
+                    nbytes = estimate_rows_bytes(batch)
+                    refused = lease.grow(nbytes)
+                    if refused:
+                        raise MemoryError(
+                            f"a batch of {len(batch):,} rows does not fit: {refused}"
+                        )
+                    writer.write_batch(record_batch(batch, schema))
+                    lease.shrink(nbytes)
+                    rows += len(batch)
+                    if len(batch) < wanted:
+                        break
+                    room = min(lease.limit, lease.budget.available())
+                    batch_rows = max(
+                        1, min(EXPORT_BATCH, room // max(1, nbytes // len(batch)))
+                    )
+                writer.close()
+                writer = None
+                os.replace(partial, path)
+            except Exception as e:
+                if writer is not None:
+                    writer.close()
+                if os.path.exists(partial):
+                    os.remove(partial)
+                return [TextContent(type="text", text=f"Export error: {str(e)}")]
+            finally:
+                conn.rollback()
+
+        columns = "\n".join(f"• {field.name}: {field.type}" for field in schema)
+        return [
+            TextContent(
+                type="text",
+                text=f"Exported {rows:,} rows to {path} ({format}, "
+                f"{format_bytes(os.path.getsize(path))}, {time.monotonic() - start:.1f}s)\n"
+                f"Schema:\n{columns}",
+            )
+        ]
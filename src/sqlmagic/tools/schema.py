@@ -0,0 +1,295 @@
+import csv
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from mcp.types import TextContent
+
+from ..core.schema_index import (
+    SCHEMA_CATALOG_QUERY,
+    SchemaIndex,
+    load_tables,
+    schema_indexes,
+)
+from ..utils.validators import sanitize_sql_identifier
+from .base import BaseTool, blocking
+
+FOREIGN_KEYS_QUERY = """
+SELECT c.conname, src.relname, a.attname, dst.relname, af.attname
+FROM pg_constraint c
+JOIN pg_class src ON src.oid = c.conrelid
+JOIN pg_class dst ON dst.oid = c.confrelid
+CROSS JOIN LATERAL unnest(c.conkey, c.confkey) AS k(attnum, fattnum)
+JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+JOIN pg_attribute af ON af.attrelid = c.confrelid AND af.attnum = k.fattnum
+WHERE c.contype = 'f' AND c.connamespace = 'public'::regnamespace
+"""
+
+# Column types, uniqueness and planner statistics; reads no table data
+COLUMN_STATS_QUERY = """
+SELECT c.relname, a.attname, format_type(a.atttypid, a.atttypmod),
+       greatest(c.reltuples, 0)::float8,
+       EXISTS (
+           SELECT 1 FROM pg_index i
+           WHERE i.indrelid = c.oid AND i.indisunique AND i.indnatts = 1
+             AND i.indkey[0] = a.attnum
+       ),
+       s.null_frac, s.n_distinct, s.most_common_vals::text, s.histogram_bounds::text
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+LEFT JOIN pg_stats s
+       ON s.schemaname = n.nspname AND s.tablename = c.relname AND s.attname = a.attname
+WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p', 'm')
+"""
+
+TYPE_FAMILIES = {
+    "smallint": "integer",
+    "integer": "integer",
+    "bigint": "integer",
+    "numeric": "integer",
+    "text": "text",
+    "character varying": "text",
+    "character": "text",
+    "uuid": "uuid",
+}
+
+
+def type_family(type_name: str) -> Optional[str]:
+    """Joinable type family, ignoring length/precision modifiers"""
+    return TYPE_FAMILIES.get(type_name.split("(")[0])
+
+
+def parse_pg_array(text: Optional[str]) -> List[str]:
+    if not text or len(text) < 2:
+        return []
+    return next(csv.reader([text[1:-1]], escapechar="\\"), [])
+
+
+def singular(name: str) -> str:
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    if name.endswith(("ses", "xes")):
+        return name[:-2]
+    if name.endswith("s") and not name.endswith("ss"):
+        return name[:-1]
+    return name
+
+
+@dataclass
+class ColumnStats:
+    table: str
+    column: str
+    family: Optional[str]
+    rows: float
+    unique: bool
+    null_frac: float
+    n_distinct: Optional[float]
+    common_values: List[str]
+    bounds: List[str]
+
+    @property
+    def distinct(self) -> float:
+        """Estimated number of distinct values"""
+        if self.unique:
+            return max(self.rows, 1.0)
+        if self.n_distinct is None:
+            return max(self.rows, 1.0)
+        if self.n_distinct < 0:
+            return max(-self.n_distinct * self.rows, 1.0)
+        return max(self.n_distinct, 1.0)
+
+
+@dataclass
+class Relationship:
+    source: ColumnStats
+    target: ColumnStats
+    evidence: str
+    score: float
+    overlap: Optional[float] = None
+
+    @property
+    def estimated_rows(self) -> float:
+        """Textbook equi-join estimate |A| * |B| / max(ndv(A), ndv(B))"""
+        source_rows = self.source.rows * (1 - self.source.null_frac)
+        return (
+            source_rows
+            * self.target.rows
+            / max(self.source.distinct, self.target.distinct)
+        )
+
+
+def value_overlap(source: ColumnStats, target: ColumnStats) -> Optional[float]:
+    """Share of the source's common values the target could contain, from pg_stats"""
+    if source.common_values and target.common_values:
+        common = set(source.common_values)
+        return len(common & set(target.common_values)) / len(common)
+    values = source.common_values or source.bounds
+    if values and len(target.bounds) >= 2 and source.family == "integer":
+        try:
+            low, high = float(target.bounds[0]), float(target.bounds[-1])
+            inside = sum(low <= float(value) <= high for value in values)
+        except ValueError:
+            return None
+        return inside / len(values)
+    return None
+
+
+class DiscoverRelationshipsTool(BaseTool):
+    read_only = True
+
+    # Names too generic to suggest a join on their own
+    GENERIC_NAMES = {"id", "name", "type", "status", "value", "description"}
+
+    @blocking
+    def execute(
+        self, connection_name: str, table_name: Optional[str] = None, limit: int = 30
+    ) -> List[TextContent]:
+        self.validate_connection(connection_name)
+        if table_name:
+            table_name = sanitize_sql_identifier(table_name)
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            foreign_keys, column_rows = self.connection_manager.run_batch(
+                conn, [(FOREIGN_KEYS_QUERY, ()), (COLUMN_STATS_QUERY, ())]
+            )
+            columns = {
+                (row[0], row[1]): ColumnStats(
+                    row[0],
+                    row[1],
+                    type_family(row[2]),
+                    row[3] or 0.0,
+                    bool(row[4]),
+                    row[5] or 0.0,
+                    row[6],
+                    parse_pg_array(row[7]),
+                    parse_pg_array(row[8]),
+                )
+                for row in column_rows
+            }
+
+        relationships = self._discover(foreign_keys, columns)
+        if table_name:
+            relationships = [
+                rel
+                for rel in relationships
+                if table_name in (rel.source.table, rel.target.table)
+            ]
+        if not relationships:
+            return [TextContent(type="text", text="No relationships found")]
+
+        relationships.sort(key=lambda rel: -rel.score)
+        lines = [f"Relationships ({len(relationships)} candidates, from catalog only):"]
+        for rel in relationships[: max(1, limit)]:
+            kind = "many-to-one" if not rel.source.unique else "one-to-one"
+            overlap = (
+                "" if rel.overlap is None else f", values overlap {rel.overlap:.0%}"
+            )
+            lines.append(
+                f"• {rel.source.table}.{rel.source.column} → {rel.target.table}.{rel.target.column} "
+                f"[{rel.evidence}{overlap}] {kind}, ~{rel.estimated_rows:,.0f} joined rows "
+                f"(score {rel.score:.2f})"
+            )
+        return [TextContent(type="text", text="\n".join(lines))]
+
+    def _discover(
+        self,
+        foreign_keys: List[Tuple],
+        columns: Dict[Tuple[str, str], ColumnStats],
+    ) -> List[Relationship]:
+        found: Dict[Tuple[str, str, str, str], Relationship] = {}
+        for _, src_table, src_column, dst_table, dst_column in foreign_keys:
+            source = columns.get((src_table, src_column))
+            target = columns.get((dst_table, dst_column))
+            if source and target:
+                key = (src_table, src_column, dst_table, dst_column)
+                found[key] = Relationship(source, target, "foreign key", 1.0)
+
+        # Index unique keys by name so candidates are found without comparing
+        # every column with every other one
+        keys_by_name: Dict[str, List[ColumnStats]] = defaultdict(list)
+        keys_by_table: Dict[str, List[ColumnStats]] = defaultdict(list)
+        for stats in columns.values():
+            if stats.unique and stats.family:
+                keys_by_name[stats.column].append(stats)
+                keys_by_table[stats.table].append(stats)
+                keys_by_table[singular(stats.table)].append(stats)
+
+        for source in columns.values():
+            if not source.family:
+                continue
+            candidates = []
+            if source.column not in self.GENERIC_NAMES:
+                candidates += [
+                    (target, "same name", 0.5) for target in keys_by_name[source.column]
+                ]
+            prefix, _, suffix = source.column.rpartition("_")
+            if prefix and suffix:
+                candidates += [
+                    (target, "naming convention", 0.7)
+                    for target in keys_by_table[prefix]
+                    if target.column == suffix
+                ]
+            for target, evidence, score in candidates:
+                key = (source.table, source.column, target.table, target.column)
+                if (
+                    target.table == source.table
+                    or target.family != source.family
+                    or key in found
+                ):
+                    continue
+                overlap = value_overlap(source, target)
+                if overlap is not None:
+                    score += 0.3 * overlap - (0.3 if overlap == 0 else 0.0)
+                found[key] = Relationship(source, target, evidence, score, overlap)
+        return list(found.values())
+
+
+class SearchSchemaTool(BaseTool):
+    read_only = True
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        query: str,
+        schema: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+        refresh: bool = False,
+    ) -> List[TextContent]:
+        self.validate_connection(connection_name)
+        index = self._index(connection_name, refresh)
+        offset = max(0, offset)
+        total, page = index.search(query, schema, max(1, min(limit, 200)), offset)
+        if not page:
+            return [TextContent(type="text", text=f"No tables match '{query}'")]
+
+        lines = [
+            f"Tables matching '{query}' ({offset + 1}-{offset + len(page)} of {total}, "
+            f"{len(index):,} indexed):"
+        ]
+        for table, score, columns in page:
+            line = f"• {table.qualified_name} ({table.kind}, ~{table.rows:,.0f} rows)"
+            if columns:
+                line += f" columns: {', '.join(columns[:8])}"
+            if table.comment:
+                line += f" — {table.comment[:120]}"
+            lines.append(line)
+        if offset + len(page) < total:
+            lines.append(f"More matches: offset={offset + len(page)}")
+        return [TextContent(type="text", text="\n".join(lines))]
+
+    def _index(self, connection_name: str, refresh: bool) -> SchemaIndex:
+        key = self.connection_manager.resolve(connection_name)
+        index = None if refresh else schema_indexes.get(key)
+        if index is None:
+            with self.connection_manager.get_connection(
+                connection_name, read_only=self.read_only
+            ) as conn:
+                cursor = conn.cursor()
+                cursor.execute(SCHEMA_CATALOG_QUERY)
+                index = SchemaIndex(load_tables(cursor.fetchall()))
+            schema_indexes.set(key, index)
+        return index
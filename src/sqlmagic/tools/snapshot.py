@@ -0,0 +1,152 @@
+import os
+import time
+from typing import List, Optional
+
+from mcp.types import TextContent
+
+from ..core.memory import format_bytes
+from ..core.sampling import sample_source
+from ..core.scheduler import BULK
+from ..core.snapshot import (
+    SNAPSHOT_CURSOR,
+    TABLE_VERSION_QUERY,
+    Snapshot,
+    column_kind,
+    load_snapshot,
+    prune_snapshots,
+    snapshot_id,
+    write_snapshot,
+)
+from ..utils.validators import sanitize_sql_identifier
+from .base import BaseTool, blocking
+
+
+class SnapshotTableTool(BaseTool):
+    """Copies numeric and date/time columns to local memory-mapped files"""
+
+    read_only = True
+    lane = BULK
+
+    @blocking
+    def execute(
+        self,
+        connection_name: str,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        sample_percent: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        refresh: bool = False,
+    ) -> List[TextContent]:
+        self.validate_connection(connection_name)
+        table_name = sanitize_sql_identifier(table_name)
+        if columns:
+            columns = [sanitize_sql_identifier(col) for col in dict.fromkeys(columns)]
+        if sample_percent is not None and not 0 < sample_percent <= 100:
+            raise ValueError("sample_percent must be in (0, 100]")
+        if sample_percent == 100:
+            sample_percent = None
+        limit = min(
+            max_rows or self.config.snapshot_max_rows, self.config.snapshot_max_rows
+        )
+        if limit < 1:
+            raise ValueError("max_rows must be positive")
+
+        directory = self.config.snapshot_dir
+        ttl = self.config.snapshot_ttl
+        key = self.connection_manager.resolve(connection_name)
+        sid = snapshot_id(key, table_name, columns, sample_percent)
+        os.makedirs(directory, exist_ok=True)
+        prune_snapshots(directory, ttl)
+        existing = None if refresh else load_snapshot(directory, sid, ttl)
+
+        start = time.monotonic()
+        with self.connection_manager.get_connection(
+            connection_name, read_only=self.read_only
+        ) as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SET TRANSACTION READ ONLY")
+                cursor.execute(TABLE_VERSION_QUERY, (table_name,))
+                row = cursor.fetchone()
+                if row is None or row[0] is None:
+                    raise ValueError(f"Table {table_name} not found")
+                files, changes, tracked, lsn = row
+                # Without statistics for every relation a change cannot be ruled out
+                version = [list(files), changes, lsn] if tracked else None
+                if existing is not None and version and existing.version == version:
+                    return [
+                        TextContent(
+                            type="text",
+                            text=f"{existing.describe()}; the table has not changed since, "
+                            f"reusing it\n{self._usage(existing)}",
+                        )
+                    ]
+
+                selected = ", ".join(columns) if columns else "*"
+                cursor.execute(f"SELECT {selected} FROM {table_name} LIMIT 0")
+                described = [
+                    (column[0], *column_kind(column)) for column in cursor.description
+                ]
+                if columns:
+                    unsupported = [name for name, kind, _ in described if kind is None]
+                    if unsupported:
+                        raise ValueError(
+                            "Snapshots hold numeric columns with an exact fixed-width form "
+                            "(integers, floats, numeric(p, s) up to p = 18) and date/time "
+                            "columns only: " + ", ".join(unsupported)
+                        )
+                kinds = [
+                    (name, kind) for name, kind, _ in described if kind is not None
+                ]
+                if not kinds:
+                    raise ValueError(
+                        f"{table_name} has no numeric or date/time columns"
+                    )
+
+                snapshot = Snapshot(
+                    sid,
+                    key,
+                    table_name,
+                    kinds,
+                    0,
+                    time.time(),
+                    sample_percent,
+                    version,
+                    {
+                        name: scale
+                        for name, kind, scale in described
+                        if kind == "decimal"
+                    },
+                )
+                source = sample_source(table_name, (sample_percent or 100) / 100)
+                stream = conn.cursor(name=SNAPSHOT_CURSOR)
+                stream.execute(
+                    f"SELECT {', '.join(name for name, _ in kinds)} FROM {source} LIMIT %s",
+                    (limit,),
+                )
+                write_snapshot(stream, directory, snapshot)
+            finally:
+                conn.rollback()
+
+        size = sum(
+            os.path.getsize(os.path.join(snapshot.path, f"{i}.bin"))
+            for i in range(len(kinds))
+        )
+        capped = " (row cap reached)" if snapshot.rows >= limit else ""
+        return [
+            TextContent(
+                type="text",
+                text=f"Snapshot {sid}: {snapshot.rows:,} rows{capped} × {len(kinds)} columns "
+                f"of {table_name} ({format_bytes(size)}, {time.monotonic() - start:.1f}s)\n"
+                f"Columns: {', '.join(f'{name} ({kind})' for name, kind in kinds)}\n"
+                f"{self._usage(snapshot)}",
+            )
+        ]
+
+    def _usage(self, snapshot: Snapshot) -> str:
+        expires = max(0.0, self.config.snapshot_ttl - snapshot.age)
+        return (
+            f'Pass snapshot="{snapshot.snapshot_id}" to find_correlations, detect_anomalies or '
+            f"time_series_analysis to analyze it without querying the database "
+            f"(expires in {expires:.0f}s)"
+        )
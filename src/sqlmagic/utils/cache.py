@@ -1,6 +1,8 @@
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 
 class SimpleCache:
@@ -23,6 +25,77 @@ class SimpleCache:
         self.cache.clear()
 
 
+def content_size(value: Any) -> int:
+    """Payload bytes of a tool result: text and base64 image data"""
+    return sum(
+        len(getattr(item, "data", None) or getattr(item, "text", "")) for item in value
+    )
+
+
+class LRUCache:
+    """TTL cache bounded by entry count and total size, safe across threads.
+
+    The least recently used entries are evicted once either bound is
+    exceeded; a value larger than max_bytes is not cached at all.
+    """
+
+    def __init__(
+        self,
+        ttl: int = 300,
+        max_entries: int = 128,
+        max_bytes: int = 64 * 2**20,
+        sizeof: Callable[[Any], int] = content_size,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored, _ = entry
+            if time.time() - stored >= self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        nbytes = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, time.time(), nbytes)
+            self.size += nbytes
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        _, _, nbytes = self._entries.pop(key)
+        self.size -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
 cache = SimpleCache()
 
 
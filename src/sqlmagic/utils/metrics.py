@@ -1,3 +1,4 @@
+import copy
 import logging
 import time
 from functools import wraps
@@ -13,6 +14,7 @@ class MetricsCollector:
             "connections_created": 0,
             "errors": 0,
             "avg_query_time": 0.0,
+            "routes": {},
         }
         self.query_times = []
 
@@ -27,8 +29,12 @@ class MetricsCollector:
     def record_error(self):
         self.metrics["errors"] += 1
 
+    def record_route(self, connection: str, target: str):
+        routes = self.metrics["routes"].setdefault(connection, {})
+        routes[target] = routes.get(target, 0) + 1
+
     def get_metrics(self) -> Dict[str, Any]:
-        return self.metrics.copy()
+        return copy.deepcopy(self.metrics)
 
 
 metrics = MetricsCollector()
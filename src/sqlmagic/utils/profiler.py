@@ -0,0 +1,148 @@
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from .watchdog import call_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "request", "all")
+# Hotspots (by own time) added to the log line of a profiled call
+HOTSPOTS = 10
+
+# cProfile allows one active profiler; profiled calls that overlap run unprofiled
+_active = threading.Lock()
+
+
+class CallProfile:
+    """cProfile data for the blocking work of one tool call"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.ran = False
+        self.skipped = 0
+
+    def runcall(self, func, *args, **kwargs):
+        if not _active.acquire(blocking=False):
+            self.skipped += 1
+            return func(*args, **kwargs)
+        try:
+            self.ran = True
+            return self.profile.runcall(func, *args, **kwargs)
+        finally:
+            _active.release()
+
+
+# Set for the duration of a profiled call; asyncio.to_thread carries it into
+# the worker thread, where tools.base.blocking picks it up
+current_profile: ContextVar[Optional[CallProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def hotspots(stats: pstats.Stats, limit: int = HOTSPOTS) -> List[Dict[str, Any]]:
+    """Functions with the most own time"""
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:limit]
+    spots = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in rows:
+        where = "/".join(filename.split(os.sep)[-2:])
+        spots.append(
+            {
+                "function": f"{where}:{line}({function})",
+                "calls": calls,
+                "own_ms": round(own * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+        )
+    return spots
+
+
+class CallProfiler:
+    """Opt-in cProfile capture of tool calls.
+
+    In "request" mode only calls passing profile=true are profiled, in "all"
+    mode every call. Profiles go to a directory that keeps the newest `keep`
+    files; the top hotspots are logged. When off, a call pays for one
+    attribute check. On Python 3.12+ cProfile sees every thread, so work of
+    concurrent calls can show up in a profile.
+    """
+
+    def __init__(self, mode: str = "off", directory: str = "profiles", keep: int = 50):
+        self.configure(mode, directory, keep)
+
+    def configure(self, mode: str, directory: str, keep: int):
+        if mode not in MODES:
+            raise ValueError(f"PROFILE_CALLS must be one of {', '.join(MODES)}")
+        self.mode = mode
+        self.directory = directory
+        self.keep = max(1, keep)
+
+    @asynccontextmanager
+    async def capture(
+        self, name: str, arguments: Dict[str, Any], requested: bool = False
+    ):
+        """Profile the blocking work done under this context"""
+        if self.mode == "off" or (self.mode == "request" and not requested):
+            yield
+            return
+        profile = CallProfile()
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current_profile.reset(token)
+            wall = time.perf_counter() - start
+            if profile.ran:
+                await asyncio.to_thread(
+                    self._save, name, call_fingerprint(name, arguments), profile, wall
+                )
+            elif profile.skipped:
+                logger.info(f"Not profiled {name}: another call was being profiled")
+
+    def _save(self, name: str, call: str, profile: CallProfile, wall: float):
+        try:
+            stats = pstats.Stats(profile.profile)
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(
+                self.directory,
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}.prof",
+            )
+            stats.dump_stats(path)
+            self._rotate()
+        except Exception as e:
+            logger.warning(f"Could not write profile of {call}: {e}")
+            return
+        record = {
+            "call": call,
+            "wall_ms": round(wall * 1000, 1),
+            "profiled_ms": round(stats.total_tt * 1000, 1),
+            "path": path,
+            "hotspots": hotspots(stats),
+        }
+        logger.info(f"Profiled {call}: {json.dumps(record)}", extra={"profile": record})
+
+    def _rotate(self):
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".prof")
+        ]
+        files.sort(key=os.path.getmtime)
+        for path in files[: max(0, len(files) - self.keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+profiler = CallProfiler()
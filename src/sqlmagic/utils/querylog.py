@@ -0,0 +1,124 @@
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .sqllex import NUMBER, PARAM, SEMICOLON, STRING, SQLLexError, tokenize
+
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+# Shared by statements the lexer rejects, so their text is never kept
+UNPARSABLE = "<unparsable statement>"
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize a statement: literals and parameters become ?, identifiers stay.
+
+    Built from the same tokens as QueryValidator, so escapes and nested
+    comments are read the way PostgreSQL reads them.
+    """
+    try:
+        tokens = tokenize(sql)
+    except SQLLexError:
+        return UNPARSABLE
+    while tokens and tokens[-1].kind == SEMICOLON:
+        tokens.pop()
+    parts = []
+    end = None
+    for token in tokens:
+        if end is not None and token.start > end:
+            parts.append(" ")
+        parts.append("?" if token.kind in (STRING, NUMBER, PARAM) else token.value)
+        end = token.end
+    return _VALUE_LIST.sub("(?)", "".join(parts))
+
+
+@dataclass
+class StatementStats:
+    query: str
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    rows: int = 0
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+@dataclass
+class SlowQuery:
+    timestamp: float
+    fingerprint: str
+    duration: float
+    rows: int
+
+
+class QueryLog:
+    """Per-fingerprint statement statistics plus a ring buffer of slow queries.
+
+    Only fingerprints are kept, so literal values never reach the log.
+    Memory is bounded: at most max_statements fingerprints are tracked (the
+    cheapest by total time is evicted) and the slow log keeps the most
+    recent slow_log_size entries.
+    """
+
+    def __init__(
+        self,
+        slow_threshold: float = 1.0,
+        max_statements: int = 1000,
+        slow_log_size: int = 100,
+    ):
+        self.slow_threshold = slow_threshold
+        self.max_statements = max_statements
+        self.statements: Dict[str, StatementStats] = {}
+        self.slow_log: deque = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def configure(self, slow_threshold: float, max_statements: int):
+        self.slow_threshold = slow_threshold
+        self.max_statements = max_statements
+
+    def record(self, sql: str, duration: float, rows: int = 0, error: bool = False):
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    cheapest = min(
+                        self.statements, key=lambda k: self.statements[k].total_time
+                    )
+                    del self.statements[cheapest]
+                stats = self.statements[key] = StatementStats(key)
+            stats.calls += 1
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            if error:
+                stats.errors += 1
+            elif rows > 0:
+                stats.rows += rows
+            if duration >= self.slow_threshold:
+                self.slow_log.append(SlowQuery(time.time(), key, duration, rows))
+
+    def top(self, limit: int = 10) -> List[StatementStats]:
+        with self._lock:
+            ranked = sorted(
+                self.statements.values(), key=lambda s: s.total_time, reverse=True
+            )
+        return ranked[:limit]
+
+    def slow_queries(self, limit: Optional[int] = None) -> List[SlowQuery]:
+        with self._lock:
+            entries = list(self.slow_log)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.slow_log.clear()
+
+
+query_log = QueryLog()
@@ -0,0 +1,118 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+WORD = "word"
+QUOTED = "quoted"
+STRING = "string"
+NUMBER = "number"
+PARAM = "param"
+OP = "op"
+SEMICOLON = "semicolon"
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"[^\W\d][\w$]*")
+_NUMBER = re.compile(r"(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_DOLLAR_TAG = re.compile(r"\$(?:[^\W\d]\w*)?\$")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s")
+_STRING_PREFIX = re.compile(r"(?:[eEbBxXnN]|[uU]&)'")
+
+
+class SQLLexError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+def _skip_block_comment(sql: str, i: int) -> int:
+    # PostgreSQL block comments nest
+    depth = 0
+    n = len(sql)
+    while i < n:
+        if sql.startswith("/*", i):
+            depth += 1
+            i += 2
+        elif sql.startswith("*/", i):
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return i
+        else:
+            i += 1
+    raise SQLLexError("Unterminated block comment")
+
+
+def _scan_quoted(sql: str, i: int, quote: str, backslash: bool) -> int:
+    """Return the index after the closing quote; i points at the opening one"""
+    n = len(sql)
+    i += 1
+    while i < n:
+        c = sql[i]
+        if backslash and c == "\\":
+            i += 2
+        elif c == quote:
+            if i + 1 < n and sql[i + 1] == quote:
+                i += 2
+            else:
+                return i + 1
+        else:
+            i += 1
+    raise SQLLexError("Unterminated quoted literal")
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split PostgreSQL text into tokens, dropping whitespace and comments"""
+    tokens: List[Token] = []
+    i = 0
+    n = len(sql)
+    while i < n:
+        c = sql[i]
+        match = _WHITESPACE.match(sql, i)
+        if match:
+            i = match.end()
+            continue
+        if sql.startswith("--", i):
+            newline = sql.find("\n", i)
+            i = n if newline < 0 else newline + 1
+            continue
+        if sql.startswith("/*", i):
+            i = _skip_block_comment(sql, i)
+            continue
+
+        start = i
+        if c == "'" or _STRING_PREFIX.match(sql, i):
+            quote_at = sql.index("'", i)
+            i = _scan_quoted(sql, quote_at, "'", backslash=c in "eE")
+            tokens.append(Token(STRING, sql[start:i], start, i))
+        elif c == '"':
+            i = _scan_quoted(sql, i, '"', backslash=False)
+            tokens.append(Token(QUOTED, sql[start:i], start, i))
+        elif c == "$" and _DOLLAR_TAG.match(sql, i):
+            tag = _DOLLAR_TAG.match(sql, i).group()
+            close = sql.find(tag, i + len(tag))
+            if close < 0:
+                raise SQLLexError("Unterminated dollar-quoted string")
+            i = close + len(tag)
+            tokens.append(Token(STRING, sql[start:i], start, i))
+        elif (c == "$" or c == "%") and _PARAM.match(sql, i):
+            i = _PARAM.match(sql, i).end()
+            tokens.append(Token(PARAM, sql[start:i], start, i))
+        elif c.isdigit() or (c == "." and i + 1 < n and sql[i + 1].isdigit()):
+            i = _NUMBER.match(sql, i).end()
+            tokens.append(Token(NUMBER, sql[start:i], start, i))
+        elif _WORD.match(sql, i):
+            i = _WORD.match(sql, i).end()
+            tokens.append(Token(WORD, sql[start:i], start, i))
+        elif c == ";":
+            i += 1
+            tokens.append(Token(SEMICOLON, c, start, i))
+        else:
+            i += 1
+            tokens.append(Token(OP, c, start, i))
+    return tokens
@@ -1,31 +1,125 @@
 import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from .sqllex import OP, SEMICOLON, WORD, SQLLexError, tokenize
+
+_IDENTIFIER = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+
+
+@dataclass(frozen=True)
+class QueryVerdict:
+    allowed: bool
+    reason: str = ""
+    command: str = ""
+    has_limit: bool = False
+    end: int = 0  # offset just past the last token, before any trailing ; or comment
 
 
 class QueryValidator:
-    DANGEROUS_PATTERNS = [
-        r"\bDROP\s+TABLE\b",
-        r"\bDELETE\s+FROM\b",
-        r"\bTRUNCATE\b",
-        r"\bALTER\s+TABLE\b",
-        r"\bCREATE\s+USER\b",
-        r"\bGRANT\b",
-        r"\bREVOKE\b",
-    ]
+    READ_COMMANDS = {"SELECT", "WITH", "VALUES", "TABLE", "SHOW", "EXPLAIN"}
+    # Commands whose result can take an appended LIMIT
+    LIMITABLE = {"SELECT", "WITH", "VALUES", "TABLE"}
+    WRITE_KEYWORDS = {
+        "INSERT",
+        "UPDATE",
+        "DELETE",
+        "MERGE",
+        "TRUNCATE",
+        "DROP",
+        "ALTER",
+        "CREATE",
+        "GRANT",
+        "REVOKE",
+    }
+    ROW_LOCKS = {"UPDATE", "SHARE", "NO", "KEY"}
+    BLOCKED_FUNCTIONS = {
+        "PG_TERMINATE_BACKEND",
+        "PG_CANCEL_BACKEND",
+        "PG_RELOAD_CONF",
+        "PG_ROTATE_LOGFILE",
+        "SET_CONFIG",
+        "LO_IMPORT",
+        "LO_EXPORT",
+        "PG_READ_FILE",
+        "PG_READ_BINARY_FILE",
+        "PG_LS_DIR",
+        "DBLINK",
+        "DBLINK_EXEC",
+        "PG_SLEEP",
+        "PG_SLEEP_FOR",
+        "PG_SLEEP_UNTIL",
+    }
 
     @classmethod
     def is_safe_query(cls, query: str) -> bool:
-        query_upper = query.upper()
-        for pattern in cls.DANGEROUS_PATTERNS:
-            if re.search(pattern, query_upper):
-                return False
-        return True
+        return cls.classify(query).allowed
+
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def classify(query: str) -> QueryVerdict:
+        """Decide whether a query is a single read-only statement"""
+        try:
+            tokens = tokenize(query)
+        except SQLLexError as e:
+            return QueryVerdict(False, str(e))
+        while tokens and tokens[-1].kind == SEMICOLON:
+            tokens.pop()
+        if not tokens:
+            return QueryVerdict(False, "Empty query")
+        if any(token.kind == SEMICOLON for token in tokens):
+            return QueryVerdict(False, "Multiple statements are not allowed")
+
+        first = tokens[0]
+        command = first.value.upper() if first.kind == WORD else ""
+        if command not in QueryValidator.READ_COMMANDS:
+            return QueryVerdict(False, "Only read-only queries are allowed")
+
+        depth = 0
+        has_limit = False
+        for i, token in enumerate(tokens):
+            if token.kind == OP:
+                depth += {"(": 1, ")": -1}.get(token.value, 0)
+                continue
+            if token.kind != WORD:
+                continue
+            word = token.value.upper()
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if (
+                word == "FOR"
+                and following is not None
+                and following.kind == WORD
+                and following.value.upper() in QueryValidator.ROW_LOCKS
+            ):
+                return QueryVerdict(False, "Row-locking clauses are not allowed")
+            if word in QueryValidator.WRITE_KEYWORDS:
+                return QueryVerdict(
+                    False,
+                    f"{word} is not allowed (quote identifiers named like keywords)",
+                )
+            if word == "INTO":
+                return QueryVerdict(False, "SELECT ... INTO is not allowed")
+            if (
+                word in QueryValidator.BLOCKED_FUNCTIONS
+                and following is not None
+                and following.value == "("
+            ):
+                return QueryVerdict(False, f"{token.value}() is not allowed")
+            if depth == 0 and word in ("LIMIT", "FETCH"):
+                has_limit = True
+        return QueryVerdict(True, "", command, has_limit, tokens[-1].end)
 
     @classmethod
     def validate_identifier(cls, name: str) -> bool:
-        return bool(re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", name))
+        return bool(_IDENTIFIER.fullmatch(name))
 
 
 def sanitize_sql_identifier(identifier: str) -> str:
     if not QueryValidator.validate_identifier(identifier):
         raise ValueError(f"Invalid identifier: {identifier}")
     return identifier
+
+
+def quote_identifier(identifier: str) -> str:
+    """Double-quote an identifier the way PostgreSQL's quote_ident does, always"""
+    return '"' + identifier.replace('"', '""') + '"'
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the loop-lag histogram buckets, in milliseconds
+LAG_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+# Arguments left out of the digest: a short unsalted hash of a low-entropy
+# secret can be brute-forced offline from the logs
+SECRET_ARGUMENTS = frozenset({"password"})
+
+
+def call_fingerprint(name: str, arguments: Dict[str, Any]) -> str:
+    """Tool name, argument names and a hash of the non-secret values"""
+    hashed = {k: v for k, v in arguments.items() if k not in SECRET_ARGUMENTS}
+    digest = hashlib.sha1(
+        json.dumps(hashed, sort_keys=True, default=str).encode()
+    ).hexdigest()[:8]
+    return f"{name}({', '.join(sorted(arguments))})#{digest}"
+
+
+@dataclass
+class Stall:
+    started: float
+    call: str
+    stack: str
+    duration: float
+
+
+class LoopWatchdog:
+    """Detects event-loop stalls and blames the task that was running.
+
+    A heartbeat task sleeps for a short interval and records how late it
+    wakes up. A monitor thread notices when a heartbeat is overdue by more
+    than the threshold and captures the loop thread's stack while the
+    blocking code is still running.
+    """
+
+    def __init__(
+        self, threshold: float = 0.1, interval: float = 0.05, history: int = 20
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.enabled = False
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.max_lag = 0.0
+        self.stalls: deque = deque(maxlen=history)
+        self._calls: Dict[asyncio.Task, str] = {}
+        self._beat = 0.0
+        self._open: Optional[Stall] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._monitor_thread: Optional[threading.Thread] = None
+
+    def start(self, threshold: Optional[float] = None):
+        """Start watching the running loop"""
+        if self.enabled:
+            return
+        if threshold is not None:
+            self.threshold = threshold
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self.enabled = True
+        self._task = self._loop.create_task(self._heartbeat())
+        self._monitor_thread = threading.Thread(
+            target=self._monitor, name="sqlmagic-watchdog", daemon=True
+        )
+        self._monitor_thread.start()
+        logger.info(
+            f"Loop watchdog started (stall threshold {self.threshold * 1000:.0f}ms)"
+        )
+
+    def stop(self):
+        self.enabled = False
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._monitor_thread is not None:
+            self._monitor_thread.join(timeout=1)
+            self._monitor_thread = None
+
+    @contextmanager
+    def track(self, name: str, arguments: Dict[str, Any]):
+        """Label the current task with the tool call it is serving"""
+        task = asyncio.current_task() if self.enabled else None
+        if task is None:
+            yield
+            return
+        self._calls[task] = call_fingerprint(name, arguments)
+        try:
+            yield
+        finally:
+            self._calls.pop(task, None)
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - self._beat - self.interval, 0.0)
+            with self._lock:
+                self.max_lag = max(self.max_lag, lag)
+                self.histogram[self._bucket(lag)] += 1
+                if self._open is not None:
+                    self._open.duration = lag
+                    self._open = None
+
+    @staticmethod
+    def _bucket(lag: float) -> int:
+        ms = lag * 1000
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if ms <= bound:
+                return i
+        return len(LAG_BUCKETS_MS)
+
+    def _monitor(self):
+        reported = None
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue >= self.threshold and beat != reported:
+                reported = beat
+                self._capture(overdue)
+
+    def _capture(self, overdue: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        task = asyncio.current_task(self._loop)
+        call = self._calls.get(task, "event loop" if task is None else task.get_name())
+        stall = Stall(time.time(), call, stack, overdue)
+        with self._lock:
+            self._open = stall
+            self.stalls.append(stall)
+        logger.warning(
+            f"Event loop blocked for {overdue * 1000:.0f}ms+ in {call}\n{stack}"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_lag": self.max_lag,
+                "histogram": list(self.histogram),
+                "stalls": list(self.stalls),
+            }
+
+    def histogram_labels(self) -> List[str]:
+        return [f"<={bound}ms" for bound in LAG_BUCKETS_MS] + [
+            f">{LAG_BUCKETS_MS[-1]}ms"
+        ]
+
+
+watchdog = LoopWatchdog()
@@ -0,0 +1,160 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.tools.advisor import IndexAdvisorTool, Relation, parameterize
+from sqlmagic.utils.querylog import query_log
+
+
+@pytest.fixture
+def advisor():
+    tool = IndexAdvisorTool(ConnectionManager(), Config())
+    tool.connection_manager.pools = {"test": Mock()}
+    query_log.reset()
+    yield tool
+    query_log.reset()
+
+
+def seq_scan(filter_, rows, cost=100000.0):
+    node = {
+        "Node Type": "Seq Scan",
+        "Relation Name": "events",
+        "Schema": "sales",
+        "Plan Rows": rows,
+        "Total Cost": cost,
+    }
+    if filter_:
+        node["Filter"] = filter_
+    return node
+
+
+EVENTS = [
+    (50000, 5e6, "id", "bigint", 1.0, True),
+    (50000, 5e6, "customer_id", "integer", 0.1, False),
+    (50000, 5e6, "created_at", "timestamp without time zone", 0.99, False),
+]
+
+
+def test_parameterize():
+    assert parameterize("SELECT a FROM t WHERE b = ? AND c IN (?)") == (
+        "SELECT a FROM t WHERE b = $1 AND c IN ($2)",
+        2,
+    )
+
+
+def test_brin_for_loosely_selective_range_on_ordered_column(advisor):
+    relation = Relation(50000, 5e6)
+    for _, _, column, type_name, correlation, indexed in EVENTS:
+        relation.types[column] = type_name
+        relation.correlation[column] = correlation
+    relation.indexed.add("id")
+    suggestion = advisor._for_filter(
+        seq_scan("(created_at >= $1)", 1e6), relation, (4.0, 1.0, 0.01)
+    )
+    assert suggestion.method == "brin" and suggestion.columns == ("created_at",)
+    assert suggestion.estimated < suggestion.cost
+    # Unordered columns get nothing at this selectivity
+    assert (
+        advisor._for_filter(
+            seq_scan("(customer_id > $1)", 1e6), relation, (4.0, 1.0, 0.01)
+        )
+        is None
+    )
+
+
+def test_filters_on_expressions_are_not_indexed_as_columns(advisor):
+    relation = Relation(50000, 5e6, types={"name": "text", "customer_id": "integer"})
+    costs = (4.0, 1.0, 0.01)
+    assert (
+        advisor._for_filter(seq_scan("(lower(events.name) = $1)", 100), relation, costs)
+        is None
+    )
+    assert (
+        advisor._for_filter(seq_scan("(COALESCE(x, name) = $1)", 100), relation, costs)
+        is None
+    )
+    suggestion = advisor._for_filter(
+        seq_scan(
+            "((lower(events.name) = $1) AND ((events.customer_id)::text = $2))", 100
+        ),
+        relation,
+        costs,
+    )
+    assert suggestion.columns == ("customer_id",)
+
+
+@pytest.mark.asyncio
+async def test_advise_indexes_from_recent_queries(advisor):
+    query_log.record(
+        "SELECT * FROM events WHERE customer_id = 42 AND created_at >= '2024-01-01'",
+        2.0,
+    )
+    query_log.record("SELECT * FROM events ORDER BY created_at DESC LIMIT 10", 1.0)
+    query_log.record("SELECT * FROM missing WHERE x = 1", 0.5)
+    query_log.record("UPDATE events SET customer_id = 1", 5.0)
+
+    filter_plan = seq_scan(
+        "((events.customer_id = $1) AND (events.created_at >= $2))", 500
+    )
+    sort_plan = {
+        "Node Type": "Limit",
+        "Plan Rows": 10,
+        "Total Cost": 90000.0,
+        "Plans": [
+            {
+                "Node Type": "Sort",
+                "Sort Key": ["events.created_at DESC"],
+                "Plans": [seq_scan(None, 5e6)],
+            }
+        ],
+    }
+    cursor = Mock()
+    cursor.fetchone.side_effect = [
+        (4.0, 1.0, 0.01),
+        ([{"Plan": filter_plan}],),
+        ([{"Plan": sort_plan}],),
+    ]
+    cursor.fetchall.return_value = EVENTS
+
+    def execute(sql, params=None):
+        if sql.startswith("PREPARE") and "missing" in sql:
+            raise Exception('relation "missing" does not exist')
+
+    cursor.execute.side_effect = execute
+    with patch.object(advisor.connection_manager, "get_connection") as mock_conn:
+        conn = mock_conn.return_value.__enter__.return_value
+        conn.cursor.return_value = cursor
+        result = await advisor.execute("test")
+
+    text = result[0].text
+    assert "from 2 of 3 recent statements" in text
+    assert (
+        '1. CREATE INDEX CONCURRENTLY ON "sales"."events" USING btree ("customer_id", "created_at");'
+        in text
+    )
+    assert (
+        '2. CREATE INDEX CONCURRENTLY ON "sales"."events" USING btree ("created_at");'
+        in text
+    )
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert (
+        "PREPARE sqlmagic_advice AS SELECT * FROM events WHERE customer_id = $1 AND created_at >= $2"
+        in statements
+    )
+    assert (
+        "EXPLAIN (VERBOSE, FORMAT JSON) EXECUTE sqlmagic_advice(NULL, NULL)"
+        in statements
+    )
+    assert "ROLLBACK TO SAVEPOINT sqlmagic_advice" in statements
+    # Only the statements that prepared need deallocating
+    assert statements.count("DEALLOCATE sqlmagic_advice") == 2
+    assert not any(s.startswith("CREATE") for s in statements)
+    conn.rollback.assert_called_once()
+    # Relation statistics are looked up once per table, by schema and name
+    assert cursor.fetchall.call_count == 1
+    lookup = next(
+        call for call in cursor.execute.call_args_list if "pg_stats" in call.args[0]
+    )
+    assert lookup.args[1] == ("sales", "events")
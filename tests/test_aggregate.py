@@ -0,0 +1,131 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.tools.aggregate import (
+    AggregateTool,
+    aggregate_cache,
+    compile_spec,
+    normalize_spec,
+)
+
+
+@pytest.fixture
+def aggregate_tool():
+    aggregate_cache.clear()
+    tool = AggregateTool(ConnectionManager(), Config())
+    tool.connection_manager.pools = {"test": Mock()}
+    yield tool
+    aggregate_cache.clear()
+
+
+def test_compiles_group_by_with_top_k():
+    spec = normalize_spec(
+        "orders",
+        ["region"],
+        [{"function": "SUM", "column": "revenue"}, {"function": "count"}],
+        [
+            {"column": "status", "op": "in", "value": ["paid", "shipped"]},
+            {"column": "deleted_at", "op": "is_null"},
+        ],
+        None,
+        True,
+        5,
+    )
+    query, params = compile_spec(spec)
+    assert query == (
+        "SELECT region, sum(revenue) AS sum_revenue, count(*) AS count, "
+        "count(*) OVER () AS total_groups FROM orders "
+        "WHERE deleted_at IS NULL AND status = ANY(%s) "
+        "GROUP BY 1 ORDER BY sum_revenue DESC NULLS LAST LIMIT %s"
+    )
+    assert params == [["paid", "shipped"], 5]
+
+
+def test_filter_order_does_not_change_the_spec():
+    a = {"column": "a", "op": ">", "value": 1}
+    b = {"column": "b", "op": "=", "value": "x"}
+    measures = [{"function": "avg", "column": "price"}]
+    assert normalize_spec(
+        "t", None, measures, [a, b], None, True, 10
+    ) == normalize_spec("t", None, measures, [b, a], None, True, 10)
+
+
+@pytest.mark.parametrize(
+    "dimensions, measures, filters",
+    [
+        (["region; DROP TABLE x"], [{"function": "sum", "column": "v"}], None),
+        (None, [{"function": "median", "column": "v"}], None),
+        (None, [{"function": "sum"}], None),
+        (
+            None,
+            [{"function": "sum", "column": "v"}],
+            [{"column": "v", "op": "~", "value": 1}],
+        ),
+        (
+            None,
+            [{"function": "sum", "column": "v"}],
+            [{"column": "v", "op": "in", "value": 1}],
+        ),
+        (["v"], [{"function": "sum", "column": "v", "alias": "v"}], None),
+        (None, [], None),
+    ],
+)
+def test_invalid_specs_are_rejected(dimensions, measures, filters):
+    with pytest.raises(ValueError):
+        normalize_spec("t", dimensions, measures, filters, None, True, 10)
+
+
+@pytest.mark.asyncio
+async def test_results_are_cached_by_normalized_spec(aggregate_tool):
+    mock_cursor = Mock()
+    mock_cursor.description = [
+        ("region", 25),
+        ("sum_revenue", 701),
+        ("total_groups", 20),
+    ]
+    mock_cursor.fetchall.return_value = [("north", 1200.5, 7), ("south", 800.0, 7)]
+
+    with patch.object(aggregate_tool.connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        result = await aggregate_tool.execute(
+            "test",
+            "orders",
+            [{"function": "sum", "column": "revenue"}],
+            ["region"],
+            top_k=2,
+        )
+        again = await aggregate_tool.execute(
+            "test",
+            "orders",
+            [{"function": "SUM", "column": "revenue"}],
+            ["region"],
+            top_k=2,
+        )
+
+    text = result[0].text
+    assert text.startswith("Top 2 of 7 groups from orders:")
+    assert "north" in text and "1200.5" in text
+    assert "total_groups" not in text
+    assert again is result
+    assert mock_conn.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_keeps_the_most_recent_results(aggregate_tool):
+    mock_cursor = Mock()
+    mock_cursor.description = [("count", 20), ("total_groups", 20)]
+    mock_cursor.fetchall.return_value = [(3, 1)]
+
+    with patch.object(aggregate_cache, "max_entries", 2), patch.object(
+        aggregate_tool.connection_manager, "get_connection"
+    ) as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        for table in ("a", "b", "c", "a"):
+            await aggregate_tool.execute("test", table, [{"function": "count"}])
+
+    assert len(aggregate_cache) == 2
+    # "a" was evicted by "c" and had to be queried again
+    assert mock_conn.call_count == 4
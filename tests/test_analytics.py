@@ -1,11 +1,13 @@
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
 from mcp.types import TextContent
 
 from sqlmagic.core.config import Config
 from sqlmagic.core.connection import ConnectionManager
 from sqlmagic.tools.analytics import (
+    AnalyzeDistributionTool,
     DetectAnomaliesTool,
     FindCorrelationsTool,
     TimeSeriesAnalysisTool,
@@ -101,10 +103,19 @@ async def test_insufficient_data_anomaly(anomaly_tool):
 @pytest.mark.asyncio
 async def test_time_series_analysis(timeseries_tool):
     mock_cursor = Mock()
-    mock_cursor.fetchall.return_value = [
-        ("2023-01-01", 10),
-        ("2023-01-02", 20),
-        ("2023-01-03", 30),
+    totals = (1, 3, 3, 60.0, 1400.0)  # gaps, buckets, points, sum, sum of squares
+    mock_cursor.fetchall.side_effect = [
+        [
+            ("2023-01-04", 30.0, 1, 20.0, 10.0, 20.0, 2.0, True) + totals,
+            ("2023-01-02", 20.0, 1, 15.0, 7.07, 10.0, 1.0, False) + totals,
+            ("2023-01-01", 10.0, 1, 10.0, None, None, None, False) + totals,
+        ],
+        [
+            (7, None, 10.0, 1),
+            (1, None, 20.0, 1),
+            (3, None, 30.0, 1),
+            (None, 0, 20.0, 3),
+        ],
     ]
 
     with patch.object(
@@ -114,5 +125,161 @@ async def test_time_series_analysis(timeseries_tool):
         timeseries_tool.connection_manager.pools = {"test": Mock()}
 
         result = await timeseries_tool.execute("test", "table", "date_col", "value_col")
-        assert "Time series" in result[0].text
-        assert "trend: increasing" in result[0].text
+        text = result[0].text
+        assert "Time series" in text
+        assert "trend: increasing" in text
+        assert "3 points" in text and "mean: 20.00, std: 10.00" in text
+        assert "1 gaps" in text
+        assert "• 2023-01-04: +20.00 (+200.0%)" in text
+        assert "Day-of-week profile: Mon 20.00, Wed 30.00, Sun 10.00" in text
+        assert "Hour-of-day" not in text
+
+        # One query for the series unless full_scan asks for range scans
+        series_query, params = mock_cursor.execute.call_args_list[0].args
+        assert "OVER r" in series_query and "lag(bucket)" in series_query
+        # Works on date columns, where extract(hour) needs a timestamp
+        profile_query = mock_cursor.execute.call_args_list[1].args[0]
+        assert "extract(hour FROM date_col::timestamp)" in profile_query
+        assert params["interval"] == "day" and params["preceding"] == 6
+
+
+@pytest.mark.asyncio
+async def test_time_series_rejects_unknown_interval(timeseries_tool):
+    with patch.object(
+        timeseries_tool.connection_manager, "is_connected", return_value=True
+    ):
+        with pytest.raises(ValueError):
+            await timeseries_tool.execute("test", "t", "d", "v", interval="fortnight")
+
+
+@pytest.mark.asyncio
+async def test_wide_table_skips_constant_and_id_columns(correlation_tool):
+    columns = [f"f{i}" for i in range(FindCorrelationsTool.WIDE_TABLE_COLUMNS)]
+    data = [
+        tuple(float(row * (i + 1)) for i in range(len(columns))) for row in range(5)
+    ]
+    mock_cursor = Mock()
+    mock_cursor.fetchall.side_effect = [
+        [(col,) for col in columns + ["id", "flag"]],
+        [("id", -1.0, 1.0), ("flag", 1.0, 0.2), ("f0", -0.5, 0.1)],
+        data,
+    ]
+
+    with patch.object(
+        correlation_tool.connection_manager, "get_connection"
+    ) as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        correlation_tool.connection_manager.pools = {"test": Mock()}
+
+        result = await correlation_tool.execute("test", "features", top_k=3)
+        text = result[0].text
+        assert "Skipped constant or ID-like columns: id, flag" in text
+        assert text.count("•") == 3
+        assert "Showing top 3 of" in text
+        select = mock_cursor.execute.call_args_list[-1].args[0]
+        assert " id," not in select and "flag" not in select
+        stats_query, params = mock_cursor.execute.call_args_list[1].args
+        assert "s.schemaname = n.nspname" in stats_query and params == ("features",)
+
+
+@pytest.mark.asyncio
+async def test_grouped_multi_column_anomalies(anomaly_tool):
+    mock_cursor = Mock()
+    # grp, a, b, z_0, z_1, group_rows, group_flagged, flagged_0, flagged_1, rank
+    mock_cursor.fetchall.return_value = [
+        ("north", 500, 3, 4.2, 0.1, 1000, 2, 1, 1, 1),
+        ("north", 10, 90, 0.3, 3.5, 1000, 2, 1, 1, 2),
+        ("south", 700, 4, 3.4, 0.2, 800, 1, 1, 0, 30),
+    ]
+
+    with patch.object(anomaly_tool.connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        anomaly_tool.connection_manager.pools = {"test": Mock()}
+
+        result = await anomaly_tool.execute(
+            "test", "sales", columns=["a", "b"], group_by="region", limit=2
+        )
+        text = result[0].text
+        assert "in a, b by region: 3 rows flagged" in text
+        assert "• north: 2 of 1,000 rows (a: 1, b: 1)" in text
+        assert "• south: 1 of 800 rows (a: 1)" in text
+        assert "a=500 (z=4.20)" in text
+        assert "a=700" not in text
+
+        query, params = mock_cursor.execute.call_args.args
+        assert "PARTITION BY region" in query
+        assert query.count("FROM sales") == 1
+        assert params["threshold"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_anomalies_require_a_column(anomaly_tool):
+    with patch.object(
+        anomaly_tool.connection_manager, "is_connected", return_value=True
+    ):
+        with pytest.raises(ValueError):
+            await anomaly_tool.execute("test", "sales")
+
+
+@pytest.fixture
+def distribution_tool(connection_manager, config):
+    return AnalyzeDistributionTool(connection_manager, config)
+
+
+@pytest.mark.asyncio
+async def test_equi_width_distribution(distribution_tool):
+    mock_cursor = Mock()
+    # values 1, 2, 3, 10: mean 4
+    mock_cursor.fetchone.return_value = (5, 4, 1.0, 10.0, 4.0)
+    mock_cursor.fetchall.return_value = [
+        (1, 3, 9 + 4 + 1, -27 - 8 - 1, 81 + 16 + 1),
+        (2, 1, 36, 216, 1296),
+    ]
+
+    with patch.object(
+        distribution_tool.connection_manager, "get_connection"
+    ) as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        distribution_tool.connection_manager.pools = {"test": Mock()}
+
+        result = await distribution_tool.execute("test", "orders", "amount", bins=2)
+
+    text = result[0].text
+    assert "4 values, 1 nulls" in text
+    assert "• [1, 5.5): 3 (75.0%)" in text
+    assert "• [5.5, 10]: 1 (25.0%)" in text
+    values = np.array([1.0, 2.0, 3.0, 10.0])
+    centered = values - values.mean()
+    skew = (centered**3).mean() / (centered**2).mean() ** 1.5
+    assert f"skewness {skew:.3f}" in text
+    query, params = mock_cursor.execute.call_args.args
+    assert "width_bucket(amount::float8, %(lo)s, %(hi)s, %(bins)s)" in query
+    assert params["bins"] == 2
+
+
+@pytest.mark.asyncio
+async def test_equi_depth_distribution_merges_tied_quantiles(distribution_tool):
+    mock_cursor = Mock()
+    mock_cursor.fetchone.return_value = (100, 100, 0.0, 9.0, 2.0, [0.0, 0.0, 1.0, 9.0])
+    mock_cursor.fetchall.return_value = [
+        (1, 60, 60.0, 0.0, 60.0),
+        (2, 40, 90.0, 0.0, 300.0),
+    ]
+
+    with patch.object(
+        distribution_tool.connection_manager, "get_connection"
+    ) as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        distribution_tool.connection_manager.pools = {"test": Mock()}
+
+        result = await distribution_tool.execute(
+            "test", "orders", "items", bins=3, method="equi_depth"
+        )
+
+    text = result[0].text
+    assert "2 equi-depth bins" in text
+    assert "• [0, 1): 60 (60.0%)" in text
+    first_query, first_params = mock_cursor.execute.call_args_list[0].args
+    assert "percentile_cont(%(quantiles)s::float8[])" in first_query
+    query, params = mock_cursor.execute.call_args.args
+    assert params["edges"] == [0.0, 1.0]
@@ -8,6 +8,7 @@ from sqlmagic.tools.basic import (
     AnalyzeDataTool,
     ConnectTool,
     DescribeTableTool,
+    ExecuteQueryTool,
     ExploreTablesTool,
     SampleDataTool,
 )
@@ -48,9 +49,14 @@ def analyze_tool(connection_manager, config):
     return AnalyzeDataTool(connection_manager, config)
 
 
+@pytest.fixture
+def query_tool(connection_manager, config):
+    return ExecuteQueryTool(connection_manager, config)
+
+
 @pytest.mark.asyncio
 async def test_connect_tool_success(connect_tool):
-    with patch("psycopg2.pool.SimpleConnectionPool") as mock_pool:
+    with patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool:
         mock_pool.return_value = Mock()
         result = await connect_tool.execute(
             "test", "localhost", "testdb", "user", "pass"
@@ -61,7 +67,8 @@ async def test_connect_tool_success(connect_tool):
 @pytest.mark.asyncio
 async def test_connect_tool_failure(connect_tool):
     with patch(
-        "psycopg2.pool.SimpleConnectionPool", side_effect=Exception("Connection failed")
+        "psycopg2.pool.ThreadedConnectionPool",
+        side_effect=Exception("Connection failed"),
     ):
         result = await connect_tool.execute(
             "test", "localhost", "testdb", "user", "pass"
@@ -73,12 +80,12 @@ async def test_connect_tool_failure(connect_tool):
 async def test_explore_tables(explore_tool):
     mock_cursor = Mock()
     mock_cursor.fetchall.return_value = [
-        ("users", "BASE TABLE"),
-        ("orders", "BASE TABLE"),
+        ("users", "BASE TABLE", 2),
+        ("orders", "BASE TABLE", 2),
     ]
 
     with patch.object(explore_tool.connection_manager, "get_connection") as mock_conn:
-        mock_conn.return_value.cursor.return_value = mock_cursor
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
         explore_tool.connection_manager.pools = {"test": Mock()}
 
         result = await explore_tool.execute("test")
@@ -86,6 +93,24 @@ async def test_explore_tables(explore_tool):
         assert "orders" in result[0].text
 
 
+@pytest.mark.asyncio
+async def test_explore_tables_paginates(explore_tool):
+    mock_cursor = Mock()
+    mock_cursor.fetchall.return_value = [("events_2024", "BASE TABLE", 250)]
+
+    with patch.object(explore_tool.connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        explore_tool.connection_manager.pools = {"test": Mock()}
+
+        result = await explore_tool.execute(
+            "test", schema="archive", offset=100, limit=1
+        )
+
+    assert mock_cursor.execute.call_args.args[1] == ("archive", 1, 100)
+    assert "Tables in archive (101-101 of 250)" in result[0].text
+    assert "More tables: offset=101" in result[0].text
+
+
 @pytest.mark.asyncio
 async def test_describe_table(describe_tool):
     mock_cursor = Mock()
@@ -95,7 +120,7 @@ async def test_describe_table(describe_tool):
     ]
 
     with patch.object(describe_tool.connection_manager, "get_connection") as mock_conn:
-        mock_conn.return_value.cursor.return_value = mock_cursor
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
         describe_tool.connection_manager.pools = {"test": Mock()}
 
         result = await describe_tool.execute("test", "users")
@@ -106,28 +131,64 @@ async def test_describe_table(describe_tool):
 @pytest.mark.asyncio
 async def test_sample_data(sample_tool):
     mock_cursor = Mock()
-    mock_cursor.fetchall.return_value = [
-        {"id": 1, "name": "John"},
-        {"id": 2, "name": "Jane"},
-    ]
+    mock_cursor.description = [("id", 23), ("name", 1043)]
+    mock_cursor.fetchmany.return_value = [(1, "John"), (2, "Jane")]
 
     with patch.object(sample_tool.connection_manager, "get_connection") as mock_conn:
         mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
         sample_tool.connection_manager.pools = {"test": Mock()}
 
         result = await sample_tool.execute("test", "users")
-        assert "Sample from users" in result[0].text
+        assert "Sample from users (2 rows)" in result[0].text
+        assert "Jane" in result[0].text
 
 
 @pytest.mark.asyncio
 async def test_analyze_data(analyze_tool):
     mock_cursor = Mock()
-    mock_cursor.fetchone.side_effect = [(100,), (5,)]  # count, columns
+    mock_cursor.fetchall.side_effect = [[(100,)], [(5,)]]  # count, columns
 
     with patch.object(analyze_tool.connection_manager, "get_connection") as mock_conn:
-        mock_conn.return_value.cursor.return_value = mock_cursor
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
         analyze_tool.connection_manager.pools = {"test": Mock()}
 
         result = await analyze_tool.execute("test", "users")
         assert "100 rows" in result[0].text
         assert "5 columns" in result[0].text
+
+
+@pytest.mark.asyncio
+async def test_execute_query_runs_read_only(query_tool):
+    mock_cursor = Mock()
+    mock_cursor.description = [("total", 701)]
+    mock_cursor.fetchmany.return_value = [(12.5,)]
+
+    with patch.object(query_tool.connection_manager, "get_connection") as mock_conn:
+        conn = mock_conn.return_value.__enter__.return_value
+        conn.cursor.return_value = mock_cursor
+        query_tool.connection_manager.pools = {"test": Mock()}
+
+        result = await query_tool.execute(
+            "test", "SELECT sum(x) AS total FROM t; -- c", 5
+        )
+
+    statements = [call[0][0] for call in mock_cursor.execute.call_args_list]
+    assert statements == [
+        "SET TRANSACTION READ ONLY",
+        "SET LOCAL statement_timeout = 30000",
+        "SELECT sum(x) AS total FROM t LIMIT 5",
+    ]
+    assert mock_conn.call_args.kwargs["read_only"] is True
+    conn.rollback.assert_called_once()
+    assert "12.5" in result[0].text
+
+
+@pytest.mark.asyncio
+async def test_execute_query_rejects_writes(query_tool):
+    query_tool.connection_manager.pools = {"test": Mock()}
+    with patch.object(query_tool.connection_manager, "get_connection") as mock_conn:
+        result = await query_tool.execute(
+            "test", "WITH x AS (DELETE FROM t RETURNING *) SELECT * FROM x"
+        )
+    assert result[0].text.startswith("Error: DELETE is not allowed")
+    mock_conn.assert_not_called()
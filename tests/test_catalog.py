@@ -0,0 +1,46 @@
+from unittest.mock import Mock
+
+from sqlmagic.core.catalog import (
+    CATALOG_STATEMENTS,
+    execute_catalog,
+    prepare_catalog_statements,
+)
+
+
+def test_prepare_catalog_statements():
+    conn = Mock()
+    prepared = prepare_catalog_statements(conn)
+    assert prepared == set(CATALOG_STATEMENTS)
+    statements = [
+        call.args[0] for call in conn.cursor.return_value.execute.call_args_list
+    ]
+    assert "PREPARE sqlmagic_columns(text) AS SELECT" in statements[1]
+    conn.commit.assert_called_once()
+
+
+def test_prepare_failure_is_skipped():
+    conn = Mock()
+    conn.cursor.return_value.execute.side_effect = [
+        Exception("denied"),
+        None,
+        None,
+        None,
+    ]
+    prepared = prepare_catalog_statements(conn)
+    assert "sqlmagic_tables" not in prepared
+    assert len(prepared) == len(CATALOG_STATEMENTS) - 1
+
+
+def test_execute_prepared_statement():
+    cursor = Mock()
+    cursor.connection.prepared_statements = {"sqlmagic_columns"}
+    execute_catalog(cursor, "sqlmagic_columns", ("users",))
+    cursor.execute.assert_called_once_with("EXECUTE sqlmagic_columns(%s)", ("users",))
+
+
+def test_execute_falls_back_to_plain_sql():
+    cursor = Mock()
+    execute_catalog(cursor, "sqlmagic_columns", ("users",))
+    sql, params = cursor.execute.call_args.args
+    assert "WHERE table_name = %s" in sql
+    assert params == ("users",)
@@ -0,0 +1,114 @@
+import base64
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+from mcp.types import ImageContent, TextContent
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.tools.charts import PlotDistributionTool, PlotSeriesTool, chart_cache
+from sqlmagic.utils.cache import LRUCache
+from sqlmagic.utils.downsample import lttb
+
+
+@pytest.fixture(autouse=True)
+def clear_chart_cache():
+    chart_cache.clear()
+    yield
+    chart_cache.clear()
+
+
+def image(nbytes: int):
+    return [ImageContent(type="image", data="A" * nbytes, mimeType="image/png")]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = LRUCache(ttl=60, max_entries=2, max_bytes=1000)
+    cache.set("a", image(100))
+    cache.set("b", image(100))
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.set("c", image(100))
+    assert cache.get("b") is None and len(cache) == 2
+
+    cache = LRUCache(ttl=60, max_entries=10, max_bytes=1000)
+    cache.set("a", image(100))
+    cache.set("b", image(100))
+    cache.set("c", image(850))
+    assert cache.get("a") is None and cache.get("b") is not None
+    assert cache.size == 950
+    # Too large to cache at all
+    cache.set("d", image(2000))
+    assert cache.get("d") is None and cache.size == 950
+
+    expired = LRUCache(ttl=0)
+    expired.set("a", image(1))
+    assert expired.get("a") is None and expired.size == 0
+
+
+@pytest.fixture
+def config():
+    return Config(chart_width=4, chart_height=3, chart_dpi=50)
+
+
+@pytest.fixture
+def connection_manager():
+    manager = ConnectionManager()
+    manager.pools = {"test": Mock()}
+    return manager
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50.0
+    out_x, out_y = lttb(x, y, 200)
+    assert len(out_x) == 200
+    assert out_x[0] == 0 and out_x[-1] == 9_999
+    assert 4321 in out_x
+    assert np.all(np.diff(out_x) > 0)
+
+
+def test_lttb_returns_short_series_unchanged():
+    x = np.arange(5, dtype=float)
+    out_x, out_y = lttb(x, x, 10)
+    assert out_x is x and out_y is x
+
+
+@pytest.mark.asyncio
+async def test_plot_series_downsamples_and_caches(connection_manager, config):
+    tool = PlotSeriesTool(connection_manager, config)
+    buckets = 200 * PlotSeriesTool.OVERSAMPLE
+    mock_cursor = Mock()
+    mock_cursor.fetchone.return_value = (1_000_000, 0.0, 86400.0 * 365)
+    mock_cursor.fetchall.return_value = [
+        (i * 40_000.0, float(i % 7), float(i % 11)) for i in range(buckets)
+    ]
+
+    with patch.object(connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        result = await tool.execute("test", "events", "created_at", "amount")
+        cached = await tool.execute("test", "events", "created_at", "amount")
+
+    assert isinstance(result[0], ImageContent)
+    assert base64.b64decode(result[0].data).startswith(b"\x89PNG")
+    assert isinstance(result[1], TextContent)
+    assert "200 points plotted" in result[1].text
+    assert "width_bucket" in mock_cursor.execute.call_args_list[1][0][0]
+    assert cached is result
+    assert mock_conn.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_plot_distribution_histogram(connection_manager, config):
+    tool = PlotDistributionTool(connection_manager, config)
+    mock_cursor = Mock()
+    mock_cursor.fetchone.return_value = (100, 0.0, 10.0)
+    mock_cursor.fetchall.return_value = [(1, 40), (5, 60)]
+
+    with patch.object(connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        result = await tool.execute("test", "orders", "amount", bins=5)
+
+    assert isinstance(result[0], ImageContent)
+    assert "100 values in 5 bins" in result[1].text
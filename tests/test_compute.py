@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from sqlmagic.core.compute import (
+    ComputeBackend,
+    correlation_matrix,
+    top_correlations,
+    zscore_outliers,
+)
+
+
+@pytest.fixture
+def offloading_backend():
+    backend = ComputeBackend(workers=2)
+    backend.MIN_OFFLOAD_ELEMENTS = 0
+    yield backend
+    backend.shutdown()
+
+
+def test_inline_backend_uses_plain_arrays():
+    backend = ComputeBackend()
+    with backend.shared_array((4, 2)) as matrix:
+        matrix[:] = [(1, 2), (2, 4), (3, 6), (4, 8)]
+        assert not backend._segments
+        corr = backend.run(correlation_matrix, matrix)
+    assert corr[0, 1] == pytest.approx(1.0)
+
+
+def test_offloaded_correlation_matches_inline(offloading_backend):
+    data = np.random.default_rng(0).normal(size=(500, 3))
+    data[:, 2] = -data[:, 0]
+    with offloading_backend.shared_array(data.shape) as matrix:
+        matrix[:] = data
+        assert id(matrix) in offloading_backend._segments
+        corr = offloading_backend.run(correlation_matrix, matrix)
+    assert not offloading_backend._segments
+    np.testing.assert_allclose(corr, correlation_matrix(data))
+    assert corr[0, 2] == pytest.approx(-1.0)
+
+
+def test_offloaded_zscore_outliers(offloading_backend):
+    with offloading_backend.shared_array((100,)) as values:
+        values[:] = np.r_[np.zeros(99), 50.0]
+        assert offloading_backend.run(zscore_outliers, values, 3.0) == 1
+
+
+def test_zscore_outliers_constant_column():
+    assert zscore_outliers(np.ones(20)) == 0
+
+
+def test_top_correlations_matches_full_matrix():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(400, 40))
+    data[:, 3] = data[:, 30] * 2 + rng.normal(size=400) * 0.1
+    data[:, 10] = -data[:, 11]
+    data[:, 20] = 7.0
+
+    pairs, total = top_correlations(data, k=2, threshold=0.5, block_size=16)
+
+    assert total == 2
+    assert {(i, j) for i, j, _ in pairs} == {(3, 30), (10, 11)}
+    full = correlation_matrix(data)
+    for i, j, r in pairs:
+        assert r == pytest.approx(full[i, j], abs=1e-4)
+
+
+def test_top_correlations_limits_to_k():
+    base = np.random.default_rng(2).normal(size=(200, 1))
+    data = np.hstack([base * (n + 1) for n in range(6)])
+    pairs, total = top_correlations(data, k=3, threshold=0.5, block_size=4)
+    assert len(pairs) == 3
+    assert total == 15
@@ -33,3 +33,26 @@ def test_config_invalid_values():
     with patch.dict(os.environ, {"MAX_CONNECTIONS": "invalid"}):
         with pytest.raises(ValueError):
             Config.from_env()
+
+
+def test_config_profiles_from_file(tmp_path):
+    profiles_file = tmp_path / "profiles.json"
+    profiles_file.write_text(
+        '{"warehouse": {"host": "db", "database": "dw", "username": "agent",'
+        ' "password_env": "DW_PASSWORD", "min_connections": 3,'
+        ' "replicas": ["replica1"]}}'
+    )
+    env_vars = {"PROFILES_FILE": str(profiles_file), "DW_PASSWORD": "secret"}
+    with patch.dict(os.environ, env_vars):
+        config = Config.from_env()
+    profile = config.profiles["warehouse"]
+    assert profile.port == 5432
+    assert profile.min_connections == 3
+    assert profile.replicas == ["replica1"]
+    with patch.dict(os.environ, {"DW_PASSWORD": "secret"}):
+        assert profile.resolve_password() == "secret"
+
+
+def test_config_without_profiles():
+    with patch.dict(os.environ, {}, clear=True):
+        assert Config.from_env().profiles == {}
@@ -1,8 +1,11 @@
+import sys
+import threading
 from unittest.mock import Mock, patch
 
+import psycopg2.extensions
 import pytest
 
-from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.core.connection import ConnectionManager, client_scope
 from sqlmagic.core.exceptions import ConnectionError
 
 
@@ -12,7 +15,7 @@ def connection_manager():
 
 
 def test_connection_manager_connect(connection_manager):
-    with patch("psycopg2.pool.SimpleConnectionPool") as mock_pool:
+    with patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool:
         mock_pool.return_value = Mock()
         connection_manager.connect("test", "localhost", 5432, "db", "user", "pass")
         assert "test" in connection_manager.pools
@@ -20,7 +23,7 @@ def test_connection_manager_connect(connection_manager):
 
 
 def test_connection_manager_disconnect(connection_manager):
-    with patch("psycopg2.pool.SimpleConnectionPool") as mock_pool:
+    with patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool:
         mock_pool.return_value = Mock()
         connection_manager.connect("test", "localhost", 5432, "db", "user", "pass")
         connection_manager.disconnect("test")
@@ -28,7 +31,7 @@ def test_connection_manager_disconnect(connection_manager):
 
 
 def test_connection_manager_get_connection(connection_manager):
-    with patch("psycopg2.pool.SimpleConnectionPool") as mock_pool:
+    with patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool:
         mock_conn = Mock()
         mock_pool.return_value.getconn.return_value = mock_conn
         connection_manager.connect("test", "localhost", 5432, "db", "user", "pass")
@@ -38,12 +41,166 @@ def test_connection_manager_get_connection(connection_manager):
 
 
 def test_invalid_connection_params(connection_manager):
-    with patch("psycopg2.pool.SimpleConnectionPool", side_effect=Exception("Invalid")):
+    with patch(
+        "psycopg2.pool.ThreadedConnectionPool", side_effect=Exception("Invalid")
+    ):
         with pytest.raises(ConnectionError):
             connection_manager.connect("test", "invalid", 5432, "db", "user", "pass")
 
 
+def test_pool_is_safe_across_worker_threads():
+    """Tool bodies run on worker threads, so getconn/putconn race without a lock"""
+    manager = ConnectionManager(max_connections=4)
+
+    def fake_connect(*args, **kwargs):
+        conn = Mock(closed=False)
+        conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        return conn
+
+    with patch("psycopg2.connect", side_effect=fake_connect):
+        manager.connect("test", "localhost", 5432, "db", "user", "pass")
+        start = threading.Barrier(4)
+        errors = []
+
+        def worker():
+            start.wait()
+            try:
+                for _ in range(500):
+                    with manager.get_connection_context("test") as conn:
+                        assert conn is not None
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # interleave the threads as often as possible
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+    pool = manager.pools["test"]
+    assert errors == []
+    assert pool._used == {} and pool._rused == {}
+    assert len(pool._pool) <= 4
+
+
 def test_connection_not_found(connection_manager):
     with pytest.raises(ConnectionError):
         with connection_manager.get_connection("nonexistent"):
             pass
+
+
+def _replica_pool(in_recovery, lag):
+    replica_pool = Mock()
+    cursor = replica_pool.getconn.return_value.cursor.return_value
+    cursor.fetchone.return_value = (in_recovery, lag)
+    return replica_pool
+
+
+def test_read_only_routed_to_least_loaded_replica(connection_manager):
+    primary, busy, idle = Mock(), _replica_pool(True, 0.5), _replica_pool(True, 1.0)
+    with patch(
+        "psycopg2.pool.ThreadedConnectionPool", side_effect=[primary, busy, idle]
+    ):
+        connection_manager.connect(
+            "test", "primary", 5432, "db", "user", "pass", ["r1", "r2:5433"]
+        )
+    assert connection_manager.connection_info["test"]["replicas"] == [
+        "r1:5432",
+        "r2:5433",
+    ]
+    connection_manager.replicas["test"][0].in_use = 1
+
+    with connection_manager.get_connection("test", read_only=True) as conn:
+        assert conn is idle.getconn.return_value
+    with connection_manager.get_connection("test") as conn:
+        assert conn is primary.getconn.return_value
+
+
+def test_lagging_replica_falls_back_to_primary(connection_manager):
+    primary, lagging = Mock(), _replica_pool(True, 60.0)
+    with patch("psycopg2.pool.ThreadedConnectionPool", side_effect=[primary, lagging]):
+        connection_manager.connect(
+            "test", "primary", 5432, "db", "user", "pass", ["r1"]
+        )
+
+    with connection_manager.get_connection("test", read_only=True) as conn:
+        assert conn is primary.getconn.return_value
+
+
+def test_promoted_replica_not_used_for_reads(connection_manager):
+    primary, promoted = Mock(), _replica_pool(False, 0)
+    with patch("psycopg2.pool.ThreadedConnectionPool", side_effect=[primary, promoted]):
+        connection_manager.connect(
+            "test", "primary", 5432, "db", "user", "pass", ["r1"]
+        )
+
+    assert connection_manager.replica_status("test")[0]["is_replica"] is False
+    with connection_manager.get_connection("test", read_only=True) as conn:
+        assert conn is primary.getconn.return_value
+
+
+def test_expired_replica_probed_by_one_caller(connection_manager):
+    primary, replica = Mock(), _replica_pool(True, 0.5)
+    with patch(
+        "psycopg2.pool.ThreadedConnectionPool", side_effect=[primary, replica]
+    ) as mock_pool:
+        connection_manager.connect(
+            "test", "primary", 5432, "db", "user", "pass", ["r1"]
+        )
+    assert "connect_timeout" not in mock_pool.call_args_list[0].kwargs
+    assert mock_pool.call_args_list[1].kwargs["connect_timeout"] > 0
+
+    node = connection_manager.replicas["test"][0]
+    node.checked_at = 0.0
+    probing, release = threading.Event(), threading.Event()
+    cursor = replica.getconn.return_value.cursor.return_value
+
+    def slow_probe(sql):
+        probing.set()
+        release.wait(5)
+
+    cursor.execute.side_effect = slow_probe
+    first = threading.Thread(
+        target=lambda: connection_manager.get_connection("test", True).__enter__()
+    )
+    first.start()
+    assert probing.wait(5)
+    with connection_manager.get_connection("test", read_only=True):
+        pass
+    release.set()
+    first.join(5)
+    assert cursor.execute.call_count == 2  # once at connect, once after expiry
+
+
+def _connect_in_scope(manager, scope, name):
+    token = client_scope.set(scope)
+    try:
+        manager.connect(name, "localhost", 5432, "db", "user", "pass")
+    finally:
+        client_scope.reset(token)
+
+
+def test_client_scopes_isolate_connection_names(connection_manager):
+    with patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool:
+        mock_pool.side_effect = [Mock(), Mock(), Mock()]
+        connection_manager.connect("warehouse", "localhost", 5432, "dw", "user", "pass")
+        _connect_in_scope(connection_manager, "a", "db")
+        _connect_in_scope(connection_manager, "b", "db")
+
+    assert set(connection_manager.pools) == {"warehouse", "a:db", "b:db"}
+    token = client_scope.set("a")
+    try:
+        assert set(connection_manager.list_connections()) == {"warehouse", "db"}
+        assert connection_manager.resolve("db") == "a:db"
+        assert connection_manager.resolve("warehouse") == "warehouse"
+        assert not connection_manager.has_connection("b:db")
+    finally:
+        client_scope.reset(token)
+
+    connection_manager.disconnect_scope("a")
+    assert set(connection_manager.pools) == {"warehouse", "b:db"}
@@ -0,0 +1,82 @@
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from sqlmagic.core import drivers
+from sqlmagic.core.catalog import CATALOG_QUERIES, catalog_statement
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.core.drivers import Psycopg2Driver, Psycopg3Driver, get_driver
+from sqlmagic.core.exceptions import ConnectionError
+
+
+def test_psycopg2_batch_runs_statements_in_order():
+    conn = Mock()
+    cursor = conn.cursor.return_value
+    cursor.fetchall.side_effect = [[(100,)], [(5,)]]
+    results = Psycopg2Driver().run_batch(
+        conn, [("SELECT COUNT(*) FROM t", ()), ("SELECT %s", ("x",))]
+    )
+    assert results == [[(100,)], [(5,)]]
+    assert cursor.execute.call_args_list[1].args == ("SELECT %s", ("x",))
+
+
+def test_psycopg3_batch_sends_everything_before_fetching():
+    events = []
+    conn = MagicMock()
+    conn.pipeline.return_value.__enter__.side_effect = lambda: events.append("pipeline")
+
+    def make_cursor():
+        cursor = Mock()
+        cursor.execute.side_effect = lambda sql, params: events.append(sql)
+        cursor.fetchall.side_effect = lambda: events.append("fetch") or [(len(events),)]
+        return cursor
+
+    conn.cursor.side_effect = make_cursor
+    with patch.object(drivers, "psycopg", Mock()), patch.object(
+        drivers, "psycopg_pool", Mock()
+    ):
+        driver = Psycopg3Driver()
+    results = driver.run_batch(conn, [("SELECT 1", ()), ("SELECT 2", ())])
+    assert events[:3] == ["pipeline", "SELECT 1", "SELECT 2"]
+    assert len(results) == 2
+
+
+def test_batches_take_named_parameters():
+    conn = Mock()
+    cursor = conn.cursor.return_value
+    cursor.fetchall.return_value = []
+    Psycopg2Driver().run_batch(conn, [("SELECT %(x)s", {"x": 1}), ("SELECT 1", ())])
+    assert [call.args for call in cursor.execute.call_args_list] == [
+        ("SELECT %(x)s", {"x": 1}),
+        ("SELECT 1", None),
+    ]
+
+
+def test_unprepared_catalog_statements_are_recognized():
+    # What psycopg 3 connections send, and prepare, for a catalog statement
+    conn = Mock(prepared_statements=set())
+    sql, params = catalog_statement(conn, "sqlmagic_tables", ("public", 10, 0))
+    assert sql in CATALOG_QUERIES and "$1" not in sql
+    assert "SELECT 1" not in CATALOG_QUERIES
+
+
+def test_plain_cursor_bypasses_the_query_log():
+    conn = Mock(spec=drivers.extensions.connection)
+    drivers.plain_cursor(conn)
+    conn.cursor.assert_called_once_with(cursor_factory=drivers.extensions.cursor)
+
+
+def test_get_driver():
+    assert isinstance(get_driver("psycopg2"), Psycopg2Driver)
+    with pytest.raises(ConnectionError):
+        get_driver("mysql")
+    with patch.object(drivers, "psycopg", None), pytest.raises(ConnectionError):
+        get_driver("psycopg")
+
+
+def test_is_connected_makes_no_round_trip():
+    manager = ConnectionManager()
+    manager.pools = {"test": Mock()}
+    assert manager.is_connected("test")
+    assert not manager.is_connected("other")
+    manager.pools["test"].getconn.assert_not_called()
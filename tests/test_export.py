@@ -0,0 +1,148 @@
+import datetime
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.tools import export
+from sqlmagic.tools.export import ExportQueryTool
+
+
+@pytest.fixture
+def export_tool(tmp_path):
+    tool = ExportQueryTool(ConnectionManager(), Config(export_dir=str(tmp_path)))
+    tool.connection_manager.pools = {"test": Mock()}
+    return tool
+
+
+def result_cursor(batches):
+    cursor = Mock()
+    # name, type_code, display_size, internal_size, precision, scale, null_ok
+    cursor.description = [
+        ("id", 23, None, 4, None, None, None),
+        ("amount", 1700, None, None, 10, 2, None),
+        ("at", 1114, None, 8, None, None, None),
+        ("meta", 3802, None, None, None, None, None),
+    ]
+    cursor.fetchmany.side_effect = batches
+    return cursor
+
+
+ROWS = [
+    (1, Decimal("9.50"), datetime.datetime(2024, 1, 1), {"k": 1}),
+    (2, None, datetime.datetime(2024, 1, 2), None),
+    (3, Decimal("1.25"), None, {"k": [2]}),
+]
+
+
+@pytest.mark.asyncio
+async def test_export_streams_batches_to_parquet(export_tool, tmp_path):
+    cursor = result_cursor([ROWS[:2], ROWS[2:], []])
+    with patch.object(export, "EXPORT_BATCH", 2), patch.object(
+        export_tool.connection_manager, "get_connection"
+    ) as mock_conn:
+        conn = mock_conn.return_value.__enter__.return_value
+        conn.cursor.return_value = cursor
+        result = await export_tool.execute(
+            "test", "SELECT * FROM orders;", filename="orders"
+        )
+
+    path = tmp_path / "orders.parquet"
+    assert f"Exported 3 rows to {path}" in result[0].text
+    assert list(tmp_path.iterdir()) == [path]
+    assert "• amount: decimal128(10, 2)" in result[0].text
+    table = pq.read_table(path)
+    assert table.column("id").to_pylist() == [1, 2, 3]
+    assert table.column("amount").to_pylist() == [
+        Decimal("9.50"),
+        None,
+        Decimal("1.25"),
+    ]
+    assert table.column("meta").to_pylist() == ['{"k": 1}', None, '{"k": [2]}']
+    # Two batches of two rows were fetched through the named cursor
+    assert [call.args[0] for call in cursor.fetchmany.call_args_list] == [2, 2]
+    assert conn.cursor.call_args.kwargs == {"name": "sqlmagic_export"}
+    assert [call.args for call in cursor.execute.call_args_list] == [
+        ("SET TRANSACTION READ ONLY",),
+        ("SET LOCAL statement_timeout = 30000",),
+        ("SELECT * FROM orders",),
+    ]
+    conn.rollback.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_export_arrow_with_row_cap(export_tool, tmp_path):
+    cursor = result_cursor([ROWS[:2]])
+    with patch.object(export_tool.connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = cursor
+        await export_tool.execute(
+            "test", "SELECT 1", format="arrow", filename="cap", max_rows=2
+        )
+
+    with pyarrow.ipc.open_file(tmp_path / "cap.arrow") as reader:
+        assert reader.read_all().num_rows == 2
+    cursor.fetchmany.assert_called_once_with(2)
+
+
+def test_numeric_types_stay_exact():
+    assert export.arrow_type(
+        ("n", 1700, None, None, 50, 10, None)
+    ) == pyarrow.decimal256(50, 10)
+    assert export.arrow_type(
+        ("n", 1700, None, None, 12, 0, None)
+    ) == pyarrow.decimal128(12, 0)
+    # Unconstrained numeric has no fixed scale
+    assert (
+        export.arrow_type(("n", 1700, None, None, None, None, None)) == pyarrow.string()
+    )
+    assert export.arrow_type(("x", 701, None, 8, None, None, None)) == pyarrow.float64()
+
+
+@pytest.mark.asyncio
+async def test_export_batches_fit_the_memory_budget(tmp_path):
+    tool = ExportQueryTool(
+        ConnectionManager(), Config(export_dir=str(tmp_path), max_result_bytes=20_000)
+    )
+    tool.connection_manager.pools = {"test": Mock()}
+    rows = [(i, Decimal(i), datetime.datetime(2024, 1, 1), None) for i in range(2000)]
+    cursor = result_cursor(None)
+    cursor.fetchmany.side_effect = lambda size: [
+        rows.pop(0) for _ in range(min(size, len(rows)))
+    ]
+    with patch.object(tool.connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = cursor
+        result = await tool.execute("test", "SELECT 1", filename="big")
+
+    assert result[0].text.startswith("Exported 2,000 rows")
+    sizes = [call.args[0] for call in cursor.fetchmany.call_args_list]
+    assert sizes[0] == export.SIZE_SAMPLE
+    # Later batches are sized to the per-call limit
+    assert 1 < max(sizes[1:]) < 200
+    assert export.memory_budget.used == 0
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_writes_and_paths(export_tool, tmp_path):
+    result = await export_tool.execute("test", "DELETE FROM orders")
+    assert result[0].text.startswith("Error:")
+    with pytest.raises(ValueError):
+        await export_tool.execute("test", "SELECT 1", filename="../escape")
+
+
+@pytest.mark.asyncio
+async def test_failed_export_leaves_no_file(export_tool, tmp_path):
+    cursor = result_cursor(
+        [ROWS[:1], Exception("canceling statement due to statement timeout")]
+    )
+    with patch.object(export, "EXPORT_BATCH", 1), patch.object(
+        export_tool.connection_manager, "get_connection"
+    ) as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = cursor
+        result = await export_tool.execute("test", "SELECT 1", filename="broken")
+
+    assert result[0].text.startswith("Export error: canceling statement")
+    assert list(tmp_path.iterdir()) == []
@@ -30,11 +30,11 @@ def explore_tool(connection_manager, config):
 @pytest.mark.asyncio
 async def test_full_workflow(connect_tool, explore_tool):
     """Test complete workflow: connect -> explore tables"""
-    with patch("psycopg2.pool.SimpleConnectionPool") as mock_pool:
+    with patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool:
         mock_cursor = Mock()
         mock_cursor.fetchall.return_value = [
-            ("users", "BASE TABLE"),
-            ("orders", "BASE TABLE"),
+            ("users", "BASE TABLE", 2),
+            ("orders", "BASE TABLE", 2),
         ]
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
@@ -50,7 +50,9 @@ async def test_full_workflow(connect_tool, explore_tool):
         with patch.object(
             explore_tool.connection_manager, "get_connection"
         ) as mock_get_conn:
-            mock_get_conn.return_value.cursor.return_value = mock_cursor
+            mock_get_conn.return_value.__enter__.return_value.cursor.return_value = (
+                mock_cursor
+            )
             result = await explore_tool.execute("test")
             assert "users" in result[0].text
             assert "orders" in result[0].text
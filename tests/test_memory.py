@@ -0,0 +1,66 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.core.memory import MemoryBudget, estimate_rows_bytes, fetch_within
+from sqlmagic.tools.basic import SampleDataTool
+
+
+def batches(rows, size):
+    cursor = Mock()
+    chunks = [rows[i : i + size] for i in range(0, len(rows), size)] + [[]]
+    cursor.fetchmany.side_effect = chunks
+    return cursor
+
+
+def test_estimate_grows_with_wide_values():
+    narrow = [(i, "x") for i in range(1000)]
+    wide = [(i, "x" * 10_000) for i in range(1000)]
+    assert estimate_rows_bytes(wide) > 10_000_000 > estimate_rows_bytes(narrow)
+    assert estimate_rows_bytes([]) == 0
+
+
+def test_per_call_limit_stops_early():
+    budget = MemoryBudget(capacity=10**9)
+    rows = [(i, "x" * 1000) for i in range(2000)]
+    per_row = estimate_rows_bytes(rows[:500]) // 500
+    with budget.lease(per_row * 700) as lease:
+        fetched, reason = fetch_within(batches(rows, 500), 2000, lease, batch_size=500)
+        assert 500 < len(fetched) <= 700
+        assert "per call" in reason
+        assert budget.used == lease.reserved
+    assert budget.used == 0
+    assert budget.peak > 0
+
+
+def test_server_cap_is_shared_across_calls():
+    rows = [(i, "x" * 1000) for i in range(500)]
+    size = estimate_rows_bytes(rows)
+    budget = MemoryBudget(capacity=int(size * 1.5))
+    with budget.lease(10**9) as first:
+        fetched, reason = fetch_within(batches(rows, 500), 500, first)
+        assert len(fetched) == 500 and reason is None
+        with budget.lease(10**9) as second:
+            fetched, reason = fetch_within(batches(rows, 500), 500, second)
+            assert len(fetched) < 500
+            assert "other calls" in reason
+    assert budget.used == 0
+
+
+@pytest.mark.asyncio
+async def test_sample_data_reports_truncation():
+    tool = SampleDataTool(ConnectionManager(), Config(max_result_bytes=2000))
+    tool.connection_manager.pools = {"test": Mock()}
+    mock_cursor = Mock()
+    mock_cursor.description = [("id", 23), ("body", 25)]
+    mock_cursor.fetchmany.return_value = [(i, "y" * 200) for i in range(10)]
+    with patch.object(tool.connection_manager, "get_connection") as mock_conn:
+        conn = mock_conn.return_value.__enter__.return_value
+        conn.cursor.return_value = mock_cursor
+        result = await tool.execute("test", "documents")
+
+    assert conn.cursor.call_args.kwargs == {"name": "sqlmagic_result"}
+    assert "(truncated: result exceeds" in result[0].text
+    assert "Sample from documents (10 rows)" not in result[0].text
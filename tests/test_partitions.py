@@ -0,0 +1,314 @@
+import asyncio
+import datetime
+from contextlib import contextmanager
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.core.partitions import (
+    Moments,
+    ScanRange,
+    merge_moments,
+    parallel_scan,
+    plan_ranges,
+)
+from sqlmagic.core.scheduler import BULK, INTERACTIVE, LaneScheduler
+from sqlmagic.tools.analytics import (
+    DetectAnomaliesTool,
+    FindCorrelationsTool,
+    TimeSeriesAnalysisTool,
+)
+
+
+def plan_cursor(*rows):
+    cursor = Mock()
+    cursor.fetchone.side_effect = list(rows)
+    return cursor
+
+
+def test_plan_uses_native_partitions():
+    cursor = plan_cursor((160000, 0, 0.0, True, ["events_2023", "events_2024"], None))
+    ranges = plan_ranges(cursor, "events", 4)
+    assert [r.source for r in ranges] == ["events_2023", "events_2024"]
+
+
+def test_plan_keeps_rows_of_an_inheritance_parent():
+    cursor = plan_cursor(
+        (160000, 10, 500.0, False, ["events_2023", "events_2024"], None)
+    )
+    ranges = plan_ranges(cursor, "events", 4)
+    assert [r.source for r in ranges] == ["ONLY events", "events_2023", "events_2024"]
+
+
+def test_plan_splits_pages_by_ctid():
+    cursor = plan_cursor((160000, 1000, 5e6, False, [], "id"))
+    ranges = plan_ranges(cursor, "events", 4)
+    assert len(ranges) == 4
+    assert "ctid >= '(250,0)'::tid AND ctid < '(500,0)'::tid" in ranges[1].source
+    # The last range has no upper bound
+    assert ranges[3].source.endswith("WHERE ctid >= '(750,0)'::tid) AS r")
+
+
+def test_plan_falls_back_to_primary_key_ranges():
+    cursor = plan_cursor((130000, 1000, 5e6, False, [], "id"), (1, 100))
+    ranges = plan_ranges(cursor, "events", 4)
+    assert [r.label for r in ranges] == [
+        "id 1..25",
+        "id 26..50",
+        "id 51..75",
+        "id 76..100",
+    ]
+    assert (
+        plan_ranges(plan_cursor((160000, 10, 500.0, False, [], "id")), "small", 4)[
+            0
+        ].source
+        == "small"
+    )
+    assert plan_ranges(Mock(), "any", 1)[0].label == "whole table"
+
+
+def moments_row(data: np.ndarray):
+    """What moments_select returns for a block of rows"""
+    centered = data - data.mean(axis=0)
+    comoment = centered.T @ centered
+    k = data.shape[1]
+    return (len(data), *data.mean(axis=0), *comoment[np.triu_indices(k)])
+
+
+def test_moments_merge_matches_whole_data():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(1000, 3)) @ [[1, 0.8, 0], [0, 0.6, 0], [0, 0, 1]] + 5
+    parts = [
+        Moments.from_row(moments_row(block), 3) for block in np.array_split(data, 4)
+    ]
+    merged = merge_moments(parts + [Moments(0, np.zeros(3), np.zeros((3, 3)))])
+    assert merged.n == 1000
+    np.testing.assert_allclose(merged.mean, data.mean(axis=0))
+    np.testing.assert_allclose(merged.correlation(), np.corrcoef(data, rowvar=False))
+    np.testing.assert_allclose(merged.std, data.std(axis=0))
+
+
+class FakeCursor:
+    """Answers a scan query with the rows registered for its source"""
+
+    def __init__(self, results):
+        self.results = results
+        self.sql = ""
+        self.params = None
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+        self.params = params
+
+    def fetchall(self):
+        return self.results(self.sql, self.params)
+
+    def fetchone(self):
+        if callable(self.results):
+            return self.results(self.sql)
+        for source, row in self.results.items():
+            if f"FROM {source} " in self.sql:
+                return row
+        raise AssertionError(self.sql)
+
+
+def fake_manager(results, available):
+    manager = Mock()
+    opened = []
+
+    @contextmanager
+    def get_connection(name, read_only=False):
+        if len(opened) >= available:
+            raise Exception("connection pool exhausted")
+        conn = Mock()
+        conn.cursor.side_effect = lambda: FakeCursor(results)
+        opened.append(conn)
+        yield conn
+
+    manager.get_connection.side_effect = get_connection
+    manager.scheduler.return_value.try_acquire_threadsafe.return_value = True
+    return manager, opened
+
+
+def test_parallel_scan_uses_what_the_pool_has():
+    results = {f"part_{i}": (i,) for i in range(6)}
+    manager, opened = fake_manager(results, available=2)
+    caller = Mock()
+    caller.cursor.side_effect = lambda: FakeCursor(results)
+    ranges = [ScanRange(f"part_{i}", str(i)) for i in range(6)]
+
+    def scan(cursor, source):
+        cursor.execute(f"SELECT count(*) FROM {source} ")
+        return cursor.fetchone()[0]
+
+    assert parallel_scan(manager, "db", caller, ranges, scan, workers=4) == list(
+        range(6)
+    )
+    assert len(opened) == 2
+
+    def failing(cursor, source):
+        raise ValueError(source)
+
+    with pytest.raises(ValueError):
+        parallel_scan(manager, "db", caller, ranges, failing, workers=1)
+
+
+@pytest.mark.asyncio
+async def test_parallel_scan_stays_within_bulk_lane():
+    results = {f"part_{i}": (i,) for i in range(6)}
+    manager, opened = fake_manager(results, available=8)
+    # Two slots left for bulk work once the interactive reserve is set aside
+    scheduler = LaneScheduler(capacity=4, reserved_interactive=2)
+    manager.scheduler.return_value = scheduler
+    caller = Mock()
+    caller.cursor.side_effect = lambda: FakeCursor(results)
+    ranges = [ScanRange(f"part_{i}", str(i)) for i in range(6)]
+    seen = []
+
+    def scan(cursor, source):
+        seen.append(dict(scheduler.active))
+        cursor.execute(f"SELECT count(*) FROM {source} ")
+        return cursor.fetchone()[0]
+
+    async with scheduler.slot(BULK):
+        result = await asyncio.to_thread(
+            parallel_scan, manager, "db", caller, ranges, scan, workers=4
+        )
+        assert result == list(range(6))
+        assert len(opened) == 1
+        assert max(active[BULK] for active in seen) == 2
+        assert scheduler.active[BULK] == 1
+    assert scheduler.active == {INTERACTIVE: 0, BULK: 0}
+
+    # Outside a scheduled call there is no slot to widen into
+    opened.clear()
+    assert parallel_scan(manager, "db", caller, ranges, scan, workers=4) == list(
+        range(6)
+    )
+    assert opened == []
+
+
+def tool_connections(tool, results, catalog, catalog_cursors=1):
+    """The call's own connection answers the catalog first, extras only scans"""
+    first = Mock()
+    cursors = iter([catalog] * catalog_cursors)
+    first.cursor.side_effect = lambda: next(cursors, None) or FakeCursor(results)
+    extras, _ = fake_manager(results, available=1)
+    calls = []
+
+    @contextmanager
+    def own(name, read_only=False):
+        yield first
+
+    def get_connection(name, read_only=False):
+        calls.append(name)
+        return own(name) if len(calls) == 1 else extras.get_connection(name)
+
+    tool.connection_manager.pools = {"test": Mock()}
+    tool.connection_manager.get_connection = get_connection
+
+
+@pytest.mark.asyncio
+async def test_correlations_full_scan_merges_ranges():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=2000)
+    data = np.column_stack(
+        [x, 2 * x + rng.normal(scale=0.1, size=2000), rng.normal(size=2000)]
+    )
+    results = {
+        f"part_{i}": moments_row(block)
+        for i, block in enumerate(np.array_split(data, 2))
+    }
+    catalog = Mock()
+    catalog.fetchall.return_value = [("a",), ("b",), ("c",)]
+    catalog.fetchone.return_value = (160000, 0, 0.0, True, ["part_0", "part_1"], None)
+    tool = FindCorrelationsTool(ConnectionManager(), Config(scan_parallelism=2))
+    tool_connections(tool, results, catalog, catalog_cursors=2)
+
+    result = await tool.execute("test", "t", full_scan=True)
+
+    text = result[0].text
+    expected = np.corrcoef(data, rowvar=False)[0, 1]
+    assert f"• a - b: {expected:.3f}" in text
+    assert "c" not in text.split("\n")[1]
+    assert "Exact: 2,000 rows scanned in 2 ranges" in text
+
+
+@pytest.mark.asyncio
+async def test_anomalies_full_scan_two_passes():
+    values = np.append(np.zeros(99), 100.0)
+    blocks = np.array_split(values[:, None], 2)
+    part = lambda sql: 1 if "part_1" in sql else 0  # noqa: E731
+
+    def answer(sql):
+        if "abs(x - %s)" in sql:
+            return (part(sql),)  # only the 100.0 is flagged
+        return moments_row(blocks[part(sql)])
+
+    catalog = Mock()
+    catalog.fetchone.return_value = (160000, 0, 0.0, True, ["part_0", "part_1"], None)
+    tool = DetectAnomaliesTool(ConnectionManager(), Config(scan_parallelism=2))
+    tool_connections(tool, answer, catalog)
+
+    result = await tool.execute("test", "t", "x", full_scan=True)
+
+    assert "Anomalies in x: 1 detected" in result[0].text
+    assert "Exact: 100 rows scanned in 2 ranges" in result[0].text
+
+
+@pytest.mark.asyncio
+async def test_time_series_full_scan_merges_bucket_moments():
+    rng = np.random.default_rng(2)
+    days = [datetime.datetime(2024, 1, d) for d in (1, 2)]
+    # Both ranges hold rows of both days, around a large offset
+    parts = [
+        {day: 1e6 + rng.normal(size=50 + 10 * i) for day in days} for i in range(2)
+    ]
+    merged = {}
+
+    def answer(sql, params):
+        if "unnest" in sql:
+            merged.update(params)
+            points, means = params["points"], params["means"]
+            return [
+                (
+                    day,
+                    mean,
+                    n,
+                    mean,
+                    None,
+                    None,
+                    None,
+                    False,
+                    0,
+                    2,
+                    sum(points),
+                    0.0,
+                    0.0,
+                )
+                for day, n, mean in zip(params["buckets"], points, means)
+            ][::-1]
+        if "isodow" in sql:
+            return []
+        part = parts[1 if "part_1" in sql else 0]
+        return [(day, *moments_row(values[:, None])) for day, values in part.items()]
+
+    catalog = Mock()
+    catalog.fetchone.return_value = (160000, 0, 0.0, True, ["part_0", "part_1"], None)
+    tool = TimeSeriesAnalysisTool(ConnectionManager(), Config(scan_parallelism=2))
+    tool_connections(tool, answer, catalog)
+
+    result = await tool.execute("test", "t", "at", "amount", full_scan=True)
+
+    assert result[0].text.startswith("Time series amount")
+    assert merged["buckets"] == days
+    for i, day in enumerate(days):
+        values = np.concatenate([part[day] for part in parts])
+        assert merged["points"][i] == len(values)
+        np.testing.assert_allclose(merged["means"][i], values.mean())
+        np.testing.assert_allclose(
+            merged["m2"][i], ((values - values.mean()) ** 2).sum()
+        )
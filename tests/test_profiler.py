@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+import pytest
+
+from sqlmagic.tools.base import blocking
+from sqlmagic.utils.profiler import CallProfiler, current_profile
+
+
+def busy_loop(n):
+    return sum(i * i for i in range(n))
+
+
+class SlowTool:
+    @blocking
+    def execute(self, n: int = 200_000):
+        assert current_profile.get() is not None or not self.expect_profile
+        return busy_loop(n)
+
+
+@pytest.fixture
+def tool():
+    tool = SlowTool()
+    tool.expect_profile = False
+    return tool
+
+
+@pytest.mark.asyncio
+async def test_requested_call_is_profiled_and_logged(tool, tmp_path, caplog):
+    profiler = CallProfiler("request", str(tmp_path / "profiles"))
+    tool.expect_profile = True
+    with caplog.at_level(logging.INFO, logger="sqlmagic.utils.profiler"):
+        async with profiler.capture(
+            "find_correlations", {"password": "hunter2"}, requested=True
+        ):
+            await tool.execute()
+
+    (path,) = (tmp_path / "profiles").iterdir()
+    assert path.name.endswith(".prof") and "-find_correlations-" in path.name
+    (record,) = [r.profile for r in caplog.records if hasattr(r, "profile")]
+    assert record["call"].startswith("find_correlations(password)#")
+    assert "hunter2" not in caplog.text
+    assert record["path"] == str(path)
+    functions = [spot["function"] for spot in record["hotspots"]]
+    assert any("busy_loop" in f or "<genexpr>" in f for f in functions)
+    assert len(record["hotspots"]) <= 10
+
+
+@pytest.mark.asyncio
+async def test_unrequested_and_disabled_calls_are_not_profiled(tool, tmp_path):
+    for profiler, requested in (
+        (CallProfiler("request", str(tmp_path)), False),
+        (CallProfiler("off", str(tmp_path)), True),
+    ):
+        async with profiler.capture("detect_anomalies", {}, requested):
+            assert current_profile.get() is None
+            await tool.execute(1000)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_profile_directory_is_bounded(tool, tmp_path):
+    profiler = CallProfiler("all", str(tmp_path), keep=2)
+    for _ in range(4):
+        async with profiler.capture("time_series_analysis", {}):
+            await tool.execute(1000)
+    assert len(list(tmp_path.glob("*.prof"))) == 2
+
+
+@pytest.mark.asyncio
+async def test_overlapping_profiled_calls_do_not_fail(tool, tmp_path):
+    profiler = CallProfiler("all", str(tmp_path))
+
+    async def call():
+        async with profiler.capture("sample_data", {}):
+            return await tool.execute(300_000)
+
+    results = await asyncio.gather(call(), call(), call())
+    assert len(set(results)) == 1
+    assert 1 <= len(list(tmp_path.glob("*.prof"))) <= 3
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError, match="PROFILE_CALLS"):
+        CallProfiler("sometimes")
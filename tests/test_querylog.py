@@ -0,0 +1,76 @@
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.tools.basic import QueryStatsTool
+from sqlmagic.utils.querylog import QueryLog, fingerprint, query_log
+
+
+def test_fingerprint_strips_literals_and_keeps_identifiers():
+    a = fingerprint(
+        "SELECT total FROM orders2 WHERE id IN (1, 2, 3) AND note = 'it''s' LIMIT 100"
+    )
+    b = fingerprint("select total from orders2 where id in (7) and note = 'x' limit 5")
+    assert a == "SELECT total FROM orders2 WHERE id IN (?) AND note = ? LIMIT ?"
+    assert a.lower() == b.lower()
+
+
+def test_fingerprint_handles_comments_dollar_quotes_and_parameters():
+    sql = (
+        "SELECT $tag$ a 'b' $tag$, x -- trailing 42\nFROM t WHERE y = %(y)s AND z = %s;"
+    )
+    assert fingerprint(sql) == "SELECT ?, x FROM t WHERE y = ? AND z = ?"
+
+
+def test_fingerprint_reads_escapes_and_nested_comments_like_postgres():
+    sql = r"SELECT E'it\'s -- not a comment', /* a /* nested */ 'secret' */ y FROM t"
+    assert fingerprint(sql) == "SELECT ?, y FROM t"
+    assert (
+        fingerprint("SELECT * FROM t WHERE id IN ( 1 , 2 )")
+        == "SELECT * FROM t WHERE id IN (?)"
+    )
+    assert fingerprint("SELECT 'unterminated") == "<unparsable statement>"
+
+
+def test_stats_are_aggregated_per_fingerprint():
+    log = QueryLog(slow_threshold=0.5)
+    log.record("SELECT * FROM t WHERE id = 1", 0.1, rows=1)
+    log.record("SELECT * FROM t WHERE id = 2", 0.7, rows=1)
+    log.record("SELECT * FROM t WHERE id = 3", 0.2, error=True)
+    (stats,) = log.top()
+    assert stats.calls == 3
+    assert stats.errors == 1
+    assert stats.rows == 2
+    assert stats.total_time == pytest.approx(1.0)
+    assert stats.max_time == pytest.approx(0.7)
+    (slow,) = log.slow_queries()
+    assert slow.fingerprint == "SELECT * FROM t WHERE id = ?"
+
+
+def test_memory_is_bounded():
+    log = QueryLog(slow_threshold=0.0, max_statements=3, slow_log_size=2)
+    for i, duration in enumerate([0.3, 0.1, 0.2, 0.4]):
+        log.record(f"SELECT c{i} FROM t", duration)
+    assert [s.query for s in log.top()] == [
+        "SELECT c3 FROM t",
+        "SELECT c0 FROM t",
+        "SELECT c2 FROM t",
+    ]
+    assert [q.fingerprint for q in log.slow_queries()] == [
+        "SELECT c3 FROM t",
+        "SELECT c2 FROM t",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_query_stats_tool():
+    query_log.reset()
+    tool = QueryStatsTool(ConnectionManager(), Config())
+    assert "No queries recorded" in (await tool.execute())[0].text
+
+    query_log.record("SELECT count(*) FROM big WHERE x > 10", 2.5, rows=1)
+    text = (await tool.execute(reset=True))[0].text
+    assert "1 calls, total 2500.0ms" in text
+    assert "SELECT count(*) FROM big WHERE x > ?" in text
+    assert "Slow queries (>= 1000ms)" in text
+    assert not query_log.top()
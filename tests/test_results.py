@@ -0,0 +1,56 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from sqlmagic.core.results import ColumnarResult
+
+
+@pytest.fixture
+def cursor():
+    cursor = Mock()
+    cursor.description = [("id", 23), ("score", 701), ("name", 1043), ("parent", 20)]
+    cursor.fetchall.return_value = [
+        (1, 0.5, "a", None),
+        (2, None, "b", 7),
+        (3, 1.5, None, 8),
+    ]
+    return cursor
+
+
+def test_numeric_columns_become_arrays(cursor):
+    result = ColumnarResult.from_cursor(cursor)
+    assert result.columns == ["id", "score", "name", "parent"]
+    assert result.column("id").dtype == np.int64
+    assert np.isnan(result.column("score")[1])
+    assert result.column("name") == ["a", "b", None]
+    # NULLs in an integer column keep the exact Python values
+    assert result.column("parent") == [None, 7, 8]
+
+
+def test_row_view(cursor):
+    result = ColumnarResult.from_cursor(cursor)
+    row = result[-1]
+    assert row["id"] == 3 and isinstance(row["id"], int)
+    assert row[2] is None
+    assert list(result[0]) == [1, 0.5, "a", None]
+    assert row.as_dict()["parent"] == 8
+    assert not hasattr(row, "__dict__")
+    with pytest.raises(IndexError):
+        result[3]
+
+
+def test_empty_result_and_formatting(cursor):
+    cursor.fetchall.return_value = []
+    assert len(ColumnarResult.from_cursor(cursor)) == 0
+
+    result = ColumnarResult.from_rows(["id", "id"], [(1, 2), (3, 4)])
+    assert list(result.to_frame().columns) == ["id", "id"]
+    assert "id" in result.to_text()
+
+
+def test_fill_matrix():
+    result = ColumnarResult.from_rows(["a", "b"], [(1, 2), (3, 4)], ["f", "f"])
+    matrix = np.empty((2, 2))
+    result.fill(matrix)
+    assert matrix.tolist() == [[1.0, 2.0], [3.0, 4.0]]
@@ -0,0 +1,106 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from psycopg2.extensions import QueryCanceledError
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.core.exceptions import QueryError
+from sqlmagic.core.sampling import (
+    approximate,
+    correlation_interval,
+    count_interval,
+    proportion_interval,
+    sample_source,
+)
+from sqlmagic.tools.basic import AnalyzeDataTool
+
+
+def make_conn(reltuples):
+    conn = Mock()
+    conn.cursor.return_value.fetchone.return_value = (reltuples,)
+    return conn
+
+
+def test_escalates_until_target_error():
+    fractions = []
+
+    def measure(cursor, source, fraction):
+        fractions.append(fraction)
+        return fraction, 0.001 / fraction**0.5, False  # error shrinks with sqrt(n)
+
+    estimate = approximate(make_conn(1e7), "events", measure, target_error=0.01)
+    assert fractions[0] == pytest.approx(0.001)
+    assert fractions == sorted(fractions) and len(fractions) > 1
+    assert estimate.met_target and not estimate.exact
+    assert estimate.value == fractions[-1]
+
+
+def test_small_tables_are_scanned_exactly():
+    measure = Mock(return_value=(42, 0.5, False))
+    estimate = approximate(make_conn(500), "small", measure, max_latency_ms=100)
+    assert measure.call_args[0][1:] == ("small", 1.0)
+    assert estimate.exact and estimate.met_target
+    assert "Exact" in estimate.note()
+
+
+def test_unanalyzed_tables_are_sized_from_pages():
+    conn = Mock()
+    conn.cursor.return_value.fetchone.side_effect = [(-1.0,), (100_000.0,)]
+    measure = Mock(return_value=(42, 0.001, False))
+    estimate = approximate(conn, "fresh", measure)
+    assert estimate.rows_estimate == 10_000_000
+    assert measure.call_args[0][2] == pytest.approx(0.001)
+    executed = [c[0][0] for c in conn.cursor.return_value.execute.call_args_list]
+    assert "pg_partition_tree" in executed[1]
+
+
+def test_budget_stops_at_last_completed_round():
+    conn = make_conn(1e8)
+    measure = Mock(side_effect=[(1, 0.5, False), QueryCanceledError()])
+    estimate = approximate(conn, "big", measure, max_latency_ms=60_000)
+    assert estimate.value == 1 and not estimate.met_target
+    assert "not reached" in estimate.note()
+    executed = [c[0][0] for c in conn.cursor.return_value.execute.call_args_list]
+    assert any(sql.startswith("SET LOCAL statement_timeout") for sql in executed)
+    assert conn.rollback.called
+
+    measure = Mock(side_effect=QueryCanceledError())
+    with pytest.raises(QueryError):
+        approximate(make_conn(1e8), "big", measure, max_latency_ms=5)
+
+
+def test_interval_helpers():
+    assert sample_source("t", 1.0) == "t"
+    assert "TABLESAMPLE SYSTEM (2.500000) REPEATABLE" in sample_source("t", 0.025)
+    estimate, low, high, error = count_interval(400, 0.1)
+    assert estimate == 4000 and low < 4000 < high
+    assert error == pytest.approx(1.96 * (400 * 0.9) ** 0.5 / 400)
+    p, low, high = proportion_interval(5, 1000)
+    assert p == 0.005 and 0 < low < p < high
+    low, high = correlation_interval(0.8, 1003)
+    assert low < 0.8 < high and high - low < 0.05
+
+
+@pytest.mark.asyncio
+async def test_analyze_data_reports_estimate():
+    tool = AnalyzeDataTool(ConnectionManager(), Config())
+    tool.connection_manager.pools = {"test": Mock()}
+    mock_cursor = Mock()
+    mock_cursor.fetchone.side_effect = [(1_000_000,), (120,), (7,)]
+    with patch.object(tool.connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        result = await tool.execute(
+            "test", "events", max_latency_ms=5000, target_error=0.5
+        )
+
+    text = result[0].text
+    assert "~12,000 rows (95% CI" in text
+    assert "7 columns" in text
+    assert "1.00% of table sampled" in text
+    sampled = [
+        c[0][0] for c in mock_cursor.execute.call_args_list if "TABLESAMPLE" in c[0][0]
+    ]
+    assert sampled == [
+        "SELECT COUNT(*) FROM events TABLESAMPLE SYSTEM (1.000000) REPEATABLE (1)"
+    ]
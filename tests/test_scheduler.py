@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from unittest.mock import Mock
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+from mcp.types import TextContent
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.scheduler import BULK, INTERACTIVE, LaneScheduler
+from sqlmagic.server import PostgreSQLMCPServer
+from sqlmagic.tools.base import blocking
+
+
+async def _hold(scheduler, lane, release, started=None):
+    async with scheduler.slot(lane):
+        if started is not None:
+            started.append(lane)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_bulk_concurrency_limit():
+    scheduler = LaneScheduler(capacity=4, reserved_interactive=1, bulk_limit=2)
+    release = asyncio.Event()
+    started = []
+    tasks = [
+        asyncio.create_task(_hold(scheduler, BULK, release, started)) for _ in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    assert started == [BULK, BULK]
+    assert scheduler.snapshot()[BULK]["queued"] == 1
+    release.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.snapshot()[BULK]["admitted"] == 3
+    assert scheduler.snapshot()[BULK]["max_queue"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_interactive_uses_reserved_capacity():
+    scheduler = LaneScheduler(capacity=3, reserved_interactive=1, bulk_limit=5)
+    release = asyncio.Event()
+    bulk = [asyncio.create_task(_hold(scheduler, BULK, release)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert scheduler.active[BULK] == 2
+
+    async with scheduler.slot(INTERACTIVE):
+        assert scheduler.active[INTERACTIVE] == 1
+    release.set()
+    await asyncio.gather(*bulk)
+
+
+@pytest.mark.asyncio
+async def test_interactive_admitted_before_queued_bulk():
+    scheduler = LaneScheduler(capacity=1, reserved_interactive=0, bulk_limit=1)
+    release = asyncio.Event()
+    order = []
+    holder = asyncio.create_task(_hold(scheduler, BULK, release))
+    await asyncio.sleep(0.01)
+    queued_bulk = asyncio.create_task(_hold(scheduler, BULK, asyncio.Event(), order))
+    await asyncio.sleep(0.01)
+    interactive = asyncio.create_task(_hold(scheduler, INTERACTIVE, release, order))
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(holder, interactive)
+    await asyncio.sleep(0.01)
+    assert order == [INTERACTIVE, BULK]
+    queued_bulk.cancel()
+
+
+def test_unknown_lane():
+    scheduler = LaneScheduler(capacity=2)
+
+    async def use():
+        async with scheduler.slot("batch"):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(use())
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_on_one_session_overlap():
+    """A metadata call finishes while a bulk call on the same session still runs"""
+    server = PostgreSQLMCPServer(Config(max_connections=4))
+    server.connection_manager.pools = {"db": Mock()}
+    scan_running, release = threading.Event(), threading.Event()
+
+    @blocking
+    def slow_scan(**kwargs):
+        scan_running.set()
+        release.wait(5)
+        return [TextContent(type="text", text="scan done")]
+
+    @blocking
+    def describe(**kwargs):
+        return [TextContent(type="text", text="described")]
+
+    server.tools["find_correlations"].execute = slow_scan
+    server.tools["describe_table"].execute = describe
+
+    async with create_connected_server_and_client_session(server.server) as client:
+        scan = asyncio.create_task(
+            client.call_tool(
+                "find_correlations", {"connection_name": "db", "table_name": "t"}
+            )
+        )
+        await asyncio.to_thread(scan_running.wait, 5)
+        try:
+            described = await asyncio.wait_for(
+                client.call_tool(
+                    "describe_table", {"connection_name": "db", "table_name": "t"}
+                ),
+                timeout=2,
+            )
+            assert described.content[0].text == "described"
+            assert not scan.done()
+        finally:
+            release.set()
+        assert (await scan).content[0].text == "scan done"
+    scheduler = server.connection_manager.scheduler("db")
+    assert scheduler.snapshot()[BULK]["admitted"] == 1
+    assert scheduler.snapshot()[INTERACTIVE]["admitted"] == 1
@@ -0,0 +1,131 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.tools.schema import (
+    DiscoverRelationshipsTool,
+    SearchSchemaTool,
+    parse_pg_array,
+    schema_indexes,
+    singular,
+)
+
+
+@pytest.fixture
+def relationships_tool():
+    tool = DiscoverRelationshipsTool(ConnectionManager(), Config())
+    tool.connection_manager.pools = {"test": Mock()}
+    return tool
+
+
+def test_catalog_helpers():
+    assert parse_pg_array('{1,2,"a b","x\\"y"}') == ["1", "2", "a b", 'x"y']
+    assert parse_pg_array(None) == []
+    assert [singular(t) for t in ("customers", "categories", "boxes", "address")] == [
+        "customer",
+        "category",
+        "box",
+        "address",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_relationships_from_catalog(relationships_tool):
+    foreign_keys = [("orders_customer_fk", "orders", "customer_id", "customers", "id")]
+    # table, column, type, reltuples, unique, null_frac, n_distinct, mcv, histogram
+    columns = [
+        ("customers", "id", "integer", 1000.0, True, 0.0, -1.0, None, "{1,500,1000}"),
+        ("orders", "id", "bigint", 50000.0, True, 0.0, -1.0, None, None),
+        (
+            "orders",
+            "customer_id",
+            "integer",
+            50000.0,
+            False,
+            0.0,
+            1000.0,
+            "{3,7,12}",
+            None,
+        ),
+        (
+            "orders",
+            "product_id",
+            "integer",
+            50000.0,
+            False,
+            0.1,
+            200.0,
+            "{5,9000}",
+            None,
+        ),
+        ("products", "id", "integer", 200.0, True, 0.0, -1.0, None, "{1,100,200}"),
+        ("order_items", "order_id", "bigint", 90000.0, False, 0.0, 40000.0, None, None),
+        (
+            "order_items",
+            "sku",
+            "character varying(32)",
+            90000.0,
+            False,
+            0.0,
+            150.0,
+            "{A,B}",
+            None,
+        ),
+        ("inventory", "sku", "text", 150.0, True, 0.0, -1.0, None, None),
+        ("events", "created_at", "timestamp", 10.0, True, 0.0, -1.0, None, None),
+    ]
+    mock_cursor = Mock()
+    mock_cursor.fetchall.side_effect = [foreign_keys, columns]
+
+    manager = relationships_tool.connection_manager
+    with patch.object(manager, "get_connection") as mock_conn, patch.object(
+        manager, "run_batch", wraps=manager.run_batch
+    ) as run_batch:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        result = await relationships_tool.execute("test")
+
+    # Both catalog queries go out as one batch (one round trip on psycopg 3)
+    assert len(run_batch.call_args.args[1]) == 2
+    lines = result[0].text.splitlines()
+    assert lines[0] == "Relationships (4 candidates, from catalog only):"
+    assert lines[1].startswith(
+        "• orders.customer_id → customers.id [foreign key] many-to-one, ~50,000 joined rows"
+    )
+    assert any(
+        "order_items.order_id → orders.id [naming convention]" in line for line in lines
+    )
+    assert any("order_items.sku → inventory.sku [same name]" in line for line in lines)
+    product = next(line for line in lines if "orders.product_id" in line)
+    assert "values overlap 50%" in product and "~45,000 joined rows" in product
+    assert "orders.id → customers.id" not in result[0].text
+    statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+    assert all("pg_" in sql for sql in statements)
+
+
+@pytest.mark.asyncio
+async def test_search_schema_builds_index_once():
+    tool = SearchSchemaTool(ConnectionManager(), Config())
+    tool.connection_manager.pools = {"test": Mock()}
+    schema_indexes.clear()
+    mock_cursor = Mock()
+    mock_cursor.fetchall.return_value = [
+        ("sales", "orders", "r", "Customer orders", 50000.0, "id", None),
+        ("sales", "orders", "r", "Customer orders", 50000.0, "customer_id", None),
+        ("public", "users", "r", None, 10.0, "id", None),
+    ]
+
+    with patch.object(tool.connection_manager, "get_connection") as mock_conn:
+        mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+        result = await tool.execute("test", "customer")
+        again = await tool.execute("test", "user", schema="public")
+
+    assert "sales.orders (table, ~50,000 rows) columns: customer_id" in result[0].text
+    assert "public.users" in again[0].text
+    mock_cursor.execute.assert_called_once()
+    assert schema_indexes.get("test") is not None
+
+    tool.connection_manager.connection_info = {"test": {}}
+    tool.connection_manager.disconnect("test")
+    assert schema_indexes.get("test") is None
@@ -0,0 +1,84 @@
+from sqlmagic.core.schema_index import (
+    SchemaIndex,
+    TableEntry,
+    load_tables,
+    tokenize_name,
+)
+
+
+def make_index():
+    return SchemaIndex(
+        [
+            TableEntry(
+                "public", "customer_accounts", "table", 1000.0, None, ["id", "email"]
+            ),
+            TableEntry(
+                "billing",
+                "invoices",
+                "table",
+                5000.0,
+                "Issued customer invoices",
+                ["id", "accountId", "total"],
+            ),
+            TableEntry(
+                "billing",
+                "payments",
+                "table",
+                8000.0,
+                None,
+                ["id", "invoice_id", "amount"],
+            ),
+            TableEntry(
+                "audit",
+                "events",
+                "view",
+                0.0,
+                None,
+                ["payload"],
+                {"payload": "raw invoice JSON"},
+            ),
+        ]
+    )
+
+
+def test_tokenize_name():
+    assert tokenize_name("customerAccounts_v2") == ["customer", "accounts", "v", "2"]
+    assert tokenize_name(None) == []
+
+
+def test_load_tables_folds_columns():
+    rows = [
+        ("public", "users", "r", "People", 10.0, "id", None),
+        ("public", "users", "r", "People", 10.0, "email", "Login address"),
+        ("public", "empty_view", "v", None, 0.0, None, None),
+    ]
+    users, view = load_tables(rows)
+    assert users.columns == ["id", "email"]
+    assert users.column_comments == {"email": "Login address"}
+    assert view.kind == "view" and view.columns == []
+
+
+def test_search_ranks_name_above_column_and_comment():
+    total, page = make_index().search("invoice")
+    assert total == 3
+    names = [table.qualified_name for table, _, _ in page]
+    # Table name (prefix) beats column name beats comment
+    assert names == ["billing.invoices", "billing.payments", "audit.events"]
+    assert page[1][2] == ["invoice_id"]
+
+
+def test_search_requires_every_term_and_filters_schema():
+    index = make_index()
+    total, page = index.search("invoice amount")
+    assert [table.name for table, _, _ in page] == ["payments"]
+    total, page = index.search("invoice", schema="audit")
+    assert total == 1 and page[0][0].name == "events"
+
+
+def test_search_tolerates_typos_and_paginates():
+    index = make_index()
+    total, page = index.search("custmer")
+    assert {table.name for table, _, _ in page} == {"customer_accounts", "invoices"}
+    total, page = index.search("id", limit=1, offset=1)
+    assert total == 3 and len(page) == 1
+    assert index.search("zzz") == (0, [])
@@ -0,0 +1,335 @@
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from sqlmagic.core.config import Config
+from sqlmagic.core.connection import ConnectionManager
+from sqlmagic.core.snapshot import (
+    Snapshot,
+    complete_columns,
+    load_snapshot,
+    open_snapshot,
+    prune_snapshots,
+    write_snapshot,
+)
+from sqlmagic.tools.analytics import (
+    DetectAnomaliesTool,
+    FindCorrelationsTool,
+    TimeSeriesAnalysisTool,
+)
+from sqlmagic.tools.snapshot import SnapshotTableTool
+
+UTC = datetime.timezone.utc
+CEST = datetime.timezone(datetime.timedelta(hours=2))
+
+
+class BatchCursor:
+    """Named-cursor stand-in returning fixed rows through fetchmany"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+@pytest.fixture
+def config(tmp_path):
+    return Config(snapshot_dir=str(tmp_path), snapshot_ttl=60)
+
+
+def take(config, table, columns, rows, connection="test", sid="a1b2c3", scales=None):
+    snapshot = Snapshot(
+        sid, connection, table, columns, 0, time.time(), scales=scales or {}
+    )
+    return write_snapshot(BatchCursor(rows), config.snapshot_dir, snapshot, batch=2)
+
+
+def mock_connection(tool, version=([16384], 10, True, "0/3000060"), rows=()):
+    meta = Mock()
+    meta.fetchone.return_value = version
+    # name, type_code, display_size, internal_size, precision, scale, null_ok
+    meta.description = [
+        ("id", 23, None, 4, None, None, None),
+        ("label", 25, None, None, None, None, None),
+        ("amount", 1700, None, None, 12, 2, None),
+        ("at", 1184, None, 8, None, None, None),
+        ("score", 701, None, 8, None, None, None),
+        ("ratio", 1700, None, None, None, None, None),
+    ]
+    stream = Mock()
+    stream.fetchmany.side_effect = BatchCursor(rows).fetchmany
+    conn = Mock()
+    conn.cursor.side_effect = lambda name=None: stream if name else meta
+    patcher = patch.object(tool.connection_manager, "get_connection")
+    get_connection = patcher.start()
+    get_connection.return_value.__enter__.return_value = conn
+    return patcher, stream
+
+
+def test_write_and_load_round_trip(config):
+    big = 2**53 + 1  # not representable as float64
+    rows = [
+        (big, Decimal("2.50"), datetime.datetime(2024, 3, 1, 12, tzinfo=UTC)),
+        (2, None, None),
+        (3, Decimal("-1"), datetime.datetime(2024, 3, 1, 14, tzinfo=CEST)),
+    ]
+    columns = [("id", "integer"), ("amount", "decimal"), ("at", "temporal")]
+    take(config, "orders", columns, rows, scales={"amount": 2})
+
+    snapshot = load_snapshot(config.snapshot_dir, "a1b2c3", config.snapshot_ttl)
+    assert snapshot.rows == 3
+    assert isinstance(snapshot.column("id"), np.memmap)
+    # Integers and numeric(p, s) are stored exactly
+    assert snapshot.column("id").tolist() == [big, 2, 3]
+    assert snapshot.column("amount")[[0, 2]].tolist() == [250, -100]
+    np.testing.assert_array_equal(snapshot.values("amount"), [2.5, np.nan, -1.0])
+    at = snapshot.column("at")
+    assert at[0] == np.datetime64("2024-03-01T12:00")
+    assert np.isnat(at[1])
+    # Aware values are stored in UTC
+    assert at[2] == np.datetime64("2024-03-01T12:00")
+    # Only rows complete in every requested column remain
+    (amount,) = complete_columns(snapshot, ["amount"])
+    assert amount.tolist() == [2.5, -1.0]
+    with pytest.raises(ValueError):
+        complete_columns(snapshot, ["at"])
+    with pytest.raises(ValueError, match="cannot be stored exactly"):
+        take(
+            config, "orders", [("x", "decimal")], [(Decimal("0.125"),)], scales={"x": 2}
+        )
+
+
+def test_concurrent_writes_of_one_snapshot_do_not_clash(config, tmp_path):
+    started = threading.Barrier(2)
+
+    class SlowCursor(BatchCursor):
+        def fetchmany(self, size):
+            if not hasattr(self, "waited"):
+                self.waited = started.wait(timeout=5)
+            return super().fetchmany(size)
+
+    def write(value):
+        snapshot = Snapshot(
+            "a1b2c3", "test", "orders", [("id", "integer")], 0, time.time()
+        )
+        write_snapshot(
+            SlowCursor([(value,)] * 3), config.snapshot_dir, snapshot, batch=2
+        )
+
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(write, (1, 2)))
+
+    snapshot = load_snapshot(config.snapshot_dir, "a1b2c3", config.snapshot_ttl)
+    assert snapshot.column("id").tolist() in ([1] * 3, [2] * 3)
+    assert [p.name for p in tmp_path.iterdir()] == ["a1b2c3"]
+
+
+def test_expired_or_truncated_snapshots_are_invalid(config, tmp_path):
+    snapshot = take(config, "orders", [("id", "integer")], [(1,), (2,)])
+    assert load_snapshot(config.snapshot_dir, "a1b2c3", ttl=0) is None
+    with open(tmp_path / "a1b2c3" / "0.bin", "r+b") as f:
+        f.truncate(8)
+    assert load_snapshot(config.snapshot_dir, "a1b2c3", config.snapshot_ttl) is None
+    assert snapshot.path == str(tmp_path / "a1b2c3")
+
+
+def test_open_snapshot_checks_scope_and_table(config):
+    take(config, "orders", [("id", "integer")], [(1,)])
+    args = (config.snapshot_dir, "a1b2c3", config.snapshot_ttl)
+    assert open_snapshot(*args, "test", "orders").rows == 1
+    with pytest.raises(ValueError, match="not found or expired"):
+        open_snapshot(*args, "client-2:test", "orders")
+    with pytest.raises(ValueError, match="is of orders"):
+        open_snapshot(*args, "test", "users")
+    with pytest.raises(ValueError, match="Invalid snapshot id"):
+        open_snapshot(config.snapshot_dir, "../a1b2c3", 60, "test", "orders")
+
+
+def test_prune_removes_expired_snapshots(config, tmp_path):
+    take(config, "orders", [("id", "integer")], [(1,)])
+    (tmp_path / "dead.partial").mkdir()
+    old = time.time() - 3600
+    for name in ("a1b2c3", "dead.partial"):
+        os.utime(tmp_path / name, (old, old))
+    assert prune_snapshots(config.snapshot_dir, ttl=config.snapshot_ttl) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["a1b2c3"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_table_streams_supported_columns(config):
+    tool = SnapshotTableTool(ConnectionManager(), config)
+    tool.connection_manager.pools = {"test": Mock()}
+    rows = [
+        (i, Decimal(i) / 2, datetime.datetime(2024, 1, 1, tzinfo=UTC), float(i))
+        for i in range(5)
+    ]
+    patcher, stream = mock_connection(tool, rows=rows)
+    try:
+        result = await tool.execute("test", "orders")
+        sid = result[0].text.split()[1].rstrip(":")
+        assert "5 rows × 4 columns of orders" in result[0].text
+        sql, params = stream.execute.call_args.args
+        assert sql == "SELECT id, amount, at, score FROM orders LIMIT %s"
+        assert params == (config.snapshot_max_rows,)
+
+        # Same table version: the snapshot is reused without reading rows
+        again = await tool.execute("test", "orders")
+        assert "has not changed since, reusing it" in again[0].text
+        assert stream.execute.call_count == 1
+    finally:
+        patcher.stop()
+
+    snapshot = load_snapshot(config.snapshot_dir, sid, config.snapshot_ttl)
+    assert snapshot.columns == [
+        ("id", "integer"),
+        ("amount", "decimal"),
+        ("at", "temporal"),
+        ("score", "float"),
+    ]
+    assert snapshot.scales == {"amount": 2}
+    assert snapshot.column("amount").tolist() == [0, 50, 100, 150, 200]
+    assert snapshot.version == [[16384], 10, "0/3000060"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_table_retakes_changed_tables_and_samples(config):
+    tool = SnapshotTableTool(ConnectionManager(), config)
+    tool.connection_manager.pools = {"test": Mock()}
+    patcher, stream = mock_connection(tool, rows=[(1, Decimal(1), None, 2.0)])
+    try:
+        await tool.execute("test", "orders")
+    finally:
+        patcher.stop()
+    patcher, stream = mock_connection(
+        tool,
+        version=([16384], 11, True, "0/3000060"),
+        rows=[(1, Decimal(1), None, 2.0)],
+    )
+    try:
+        result = await tool.execute("test", "orders")
+        assert "reusing" not in result[0].text
+        stream.execute.assert_called_once()
+
+        await tool.execute("test", "orders", sample_percent=5, max_rows=100)
+        sql, params = stream.execute.call_args.args
+        assert "TABLESAMPLE SYSTEM (5.000000)" in sql
+        assert params == (100,)
+    finally:
+        patcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reuse_needs_an_unchanged_tracked_version(config):
+    tool = SnapshotTableTool(ConnectionManager(), config)
+    tool.connection_manager.pools = {"test": Mock()}
+    rows = [(1, Decimal(1), None, 2.0)]
+    versions = [
+        # Counters lag or stay put (standby) while the WAL position moves
+        (([16384], 0, True, "0/3000060"), False),
+        (([16384], 0, True, "0/3000060"), True),
+        (([16384], 0, True, "0/3000148"), False),
+        # A partition was rewritten
+        (([16384, 16390], 0, True, "0/3000148"), False),
+        (([16384, 16390], 0, True, "0/3000148"), True),
+        # A relation without statistics (e.g. a view) is never taken as unchanged
+        (([0], 0, None, "0/3000148"), False),
+        (([0], 0, None, "0/3000148"), False),
+    ]
+    for version, reused in versions:
+        patcher, _ = mock_connection(tool, version=version, rows=rows)
+        try:
+            result = await tool.execute("test", "orders")
+        finally:
+            patcher.stop()
+        assert ("reusing" in result[0].text) is reused
+
+
+@pytest.mark.asyncio
+async def test_snapshot_table_rejects_unsupported_columns(config):
+    tool = SnapshotTableTool(ConnectionManager(), config)
+    tool.connection_manager.pools = {"test": Mock()}
+    patcher, _ = mock_connection(tool)
+    try:
+        with pytest.raises(ValueError, match="date/time columns only: label, ratio"):
+            await tool.execute("test", "orders", columns=["label", "ratio"])
+        with pytest.raises(ValueError, match="sample_percent"):
+            await tool.execute("test", "orders", sample_percent=0)
+    finally:
+        patcher.stop()
+
+
+def analytics_tool(cls, config):
+    tool = cls(ConnectionManager(), config)
+    tool.connection_manager.pools = {"test": Mock()}
+    # Snapshot analysis must not touch the database
+    tool.connection_manager.get_connection = Mock(side_effect=AssertionError("queried"))
+    return tool
+
+
+@pytest.mark.asyncio
+async def test_correlations_and_anomalies_from_snapshot(config):
+    rng = np.random.default_rng(7)
+    x = rng.normal(size=200)
+    rows = [
+        (float(a), float(2 * a + 1), float(b)) for a, b in zip(x, rng.normal(size=200))
+    ]
+    rows[10] = (rows[10][0], None, 50.0)
+    take(config, "metrics", [("x", "float"), ("y", "float"), ("z", "float")], rows)
+
+    tool = analytics_tool(FindCorrelationsTool, config)
+    result = await tool.execute("test", "metrics", snapshot="a1b2c3")
+    assert "• x - y: 1.000" in result[0].text
+    assert "Snapshot a1b2c3 of metrics: 200 rows" in result[0].text
+    assert "(199 complete rows)" in result[0].text
+    with pytest.raises(ValueError, match="cannot be combined"):
+        await tool.execute("test", "metrics", snapshot="a1b2c3", full_scan=True)
+
+    tool = analytics_tool(DetectAnomaliesTool, config)
+    result = await tool.execute("test", "metrics", column_name="z", snapshot="a1b2c3")
+    assert result[0].text.startswith("Anomalies in z: 1 detected")
+    with pytest.raises(ValueError, match="single-column"):
+        await tool.execute("test", "metrics", columns=["x", "z"], snapshot="a1b2c3")
+
+
+@pytest.mark.asyncio
+async def test_time_series_from_snapshot(config):
+    start = datetime.datetime(2024, 1, 1)  # a Monday
+    rows = []
+    for day, values in enumerate([[1.0, 3.0], [4.0], [], [8.0], [0.0, 10.0]]):
+        for hour, value in enumerate(values):
+            rows.append((start + datetime.timedelta(days=day, hours=hour), value))
+    rows.append((None, 5.0))
+    take(config, "events", [("at", "temporal"), ("amount", "float")], rows)
+
+    tool = analytics_tool(TimeSeriesAnalysisTool, config)
+    series, profile = tool._snapshot_series(
+        load_snapshot(config.snapshot_dir, "a1b2c3", 60), "at", "amount", "day", 2
+    )
+    buckets = [row[0] for row in series]
+    assert buckets == [start + datetime.timedelta(days=d) for d in (0, 1, 3, 4)]
+    assert [row[1] for row in series] == [2.0, 4.0, 8.0, 5.0]
+    assert [row[2] for row in series] == [2, 1, 1, 2]
+    assert [row[3] for row in series] == [2.0, 3.0, 6.0, 6.5]
+    assert series[0][4] is None and series[0][5] is None
+    assert series[1][5] == 2.0 and series[1][6] == 1.0
+    assert [row[7] for row in series] == [False, False, True, False]
+    # gaps, buckets, points, sum, sum of squares
+    assert series[-1][8:] == (1, 4, 6, 26.0, 190.0)
+    assert (1, None, 2.0, 2) in profile
+    assert (None, 1, 6.5, 2) in profile
+
+    result = await tool.execute(
+        "test", "events", date_column="at", value_column="amount", snapshot="a1b2c3"
+    )
+    assert result[0].text.startswith("Time series amount: 6 points")
+    assert "Buckets: 4 by day, 1 gaps" in result[0].text
+    assert "Snapshot a1b2c3 of events: 7 rows" in result[0].text
@@ -45,3 +45,48 @@ def test_sanitize_sql_identifier():
 
     with pytest.raises(ValueError):
         sanitize_sql_identifier("user;drop")
+
+
+def test_lexer_skips_strings_comments_and_dollar_quotes():
+    allowed = [
+        "SELECT 'DELETE FROM users' AS note",
+        "SELECT $$ DROP TABLE x $$, $fn$ it's $fn$",
+        'SELECT "update" FROM audit',
+        "SELECT 1 /* outer /* DELETE */ still comment */",
+        "SELECT E'\\' DELETE' FROM t;",
+        "-- DROP TABLE users\nSELECT 1",
+        "WITH recent AS (SELECT * FROM orders) SELECT * FROM recent",
+    ]
+    for query in allowed:
+        assert QueryValidator.is_safe_query(query), query
+
+
+def test_hidden_writes_are_rejected():
+    rejected = [
+        "WITH gone AS (DELETE FROM users RETURNING *) SELECT * FROM gone",
+        "SELECT * INTO backup FROM users",
+        "SELECT 1; DROP TABLE users",
+        "SELECT/**/1;/**/DELETE FROM users",
+        "EXPLAIN ANALYZE UPDATE users SET admin = true",
+        "SELECT * FROM users FOR UPDATE",
+        "SELECT pg_terminate_backend(42)",
+        "SELECT pg_sleep(3600)",
+        "SELECT 1 FROM pg_catalog.pg_sleep_for('1 hour')",
+        "SELECT 'unterminated",
+        "",
+    ]
+    for query in rejected:
+        assert not QueryValidator.is_safe_query(query), query
+
+
+def test_classify_reports_limit_and_end_and_is_cached():
+    QueryValidator.classify.cache_clear()
+    query = "SELECT * FROM t WHERE id IN (SELECT id FROM u LIMIT 5);  -- note"
+    verdict = QueryValidator.classify(query)
+    assert verdict.allowed and verdict.command == "SELECT"
+    assert not verdict.has_limit
+    assert query[: verdict.end].endswith("LIMIT 5)")
+    assert QueryValidator.classify("SELECT 1 FETCH FIRST 3 ROWS ONLY").has_limit
+
+    assert QueryValidator.classify(query) is verdict
+    assert QueryValidator.classify.cache_info().hits == 1
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+
+from sqlmagic.utils.watchdog import LoopWatchdog, call_fingerprint
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+def test_call_fingerprint_hides_values():
+    fingerprint = call_fingerprint(
+        "connect_database", {"password": "hunter2", "host": "db"}
+    )
+    assert fingerprint.startswith("connect_database(host, password)#")
+    assert "hunter2" not in fingerprint
+    assert fingerprint == call_fingerprint(
+        "connect_database", {"host": "db", "password": "hunter2"}
+    )
+    assert fingerprint == call_fingerprint(
+        "connect_database", {"host": "db", "password": "other"}
+    )
+    assert fingerprint != call_fingerprint(
+        "connect_database", {"host": "db2", "password": "hunter2"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_the_blocking_call():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        with watchdog.track(
+            "execute_query", {"connection_name": "db", "query": "SELECT 1"}
+        ):
+            blocking_call()
+        await asyncio.sleep(0.05)
+    finally:
+        watchdog.stop()
+
+    snapshot = watchdog.snapshot()
+    (stall,) = snapshot["stalls"]
+    assert stall.call.startswith("execute_query(connection_name, query)#")
+    assert "blocking_call" in stall.stack
+    assert stall.duration >= 0.25
+    assert snapshot["max_lag"] >= 0.25
+    assert sum(snapshot["histogram"][5:]) == 1  # one beat above 100ms
+    assert not watchdog.enabled
+
+
+@pytest.mark.asyncio
+async def test_disabled_watchdog_does_not_track():
+    watchdog = LoopWatchdog()
+    with watchdog.track("explore_tables", {}):
+        pass
+    assert not watchdog._calls